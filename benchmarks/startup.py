@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark de inicialização do comando `pm`.
+
+Mede a mediana de várias execuções de comandos leves (`pm --help`,
+`pm search` com o catálogo já compilado, `pm dep`) e compara o tempo que
+o PM adiciona ao interpretador vazio (`python -c pass`) com o orçamento.
+Também verifica que `pm --help` não importa dependências pesadas.
+Os comandos rodam com um config.yaml temporário ($PM_CONFIG) cujo
+recipes_dir tem as receitas de recipe/ e as dependências do gcc, sem
+daemon ($PM_SOCKET inexistente). O custo de catálogos grandes é medido
+em benchmarks/synthetic.py.
+
+Uso: python benchmarks/startup.py [-n 20] [--budget-ms 50]
+Sai com código 1 se algum comando passar do orçamento.
+"""
+import os
+import sys
+import time
+import json
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PM = os.path.join(ROOT, "pm")
+HEAVY_MODULES = ("requests", "yaml", "colorama")
+
+COMMANDS = {
+    "pm --help": ["--help"],
+    "pm search": ["search", "gcc"],
+    "pm dep": ["dep", "gcc"],
+}
+
+
+def prepare(work_dir):
+    """
+    Monta recipes_dir e o config.yaml em work_dir; retorna o ambiente dos comandos.
+    """
+    sys.path.insert(0, os.path.join(ROOT, "core"))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from catalog import parse_recipe
+    from solver import DEPENDENCY_KEYS
+    from synthetic import write_recipes
+
+    recipes_dir = os.path.join(work_dir, "recipes")
+    os.makedirs(recipes_dir)
+    stubs = {}
+    for name in sorted(os.listdir(os.path.join(ROOT, "recipe"))):
+        path = os.path.join(ROOT, "recipe", name)
+        shutil.copy(path, recipes_dir)
+        recipe = parse_recipe(path)
+        for key, _ in DEPENDENCY_KEYS:
+            for dep in recipe.get(key) or []:
+                stubs[dep] = {'name': dep, 'version': '1.0', 'description': f"dependência de {recipe['name']}"}
+    write_recipes(stubs, recipes_dir)
+
+    config = os.path.join(work_dir, "config.yaml")
+    with open(config, 'w') as f:
+        # JSON é YAML válido
+        json.dump({'directories': {'recipes_dir': recipes_dir, 'db_dir': os.path.join(work_dir, "db")}}, f)
+    return dict(os.environ, PM_CONFIG=config, PM_SOCKET=os.path.join(work_dir, "pm.sock"))
+
+
+def measure(cmd, runs, env=None):
+    """
+    Mediana (em ms) do tempo de parede de cmd.
+    """
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def heavy_imports(args):
+    """
+    Módulos pesados carregados ao executar `pm <args>`.
+    """
+    code = ("import sys; sys.path.insert(0, %r); sys.argv = ['pm'] + %r\n"
+            "import main\n"
+            "try:\n    main.main()\nexcept SystemExit:\n    pass\n"
+            "print(','.join(m for m in %r if m in sys.modules), file=sys.stderr)"
+            % (ROOT, args, HEAVY_MODULES))
+    result = subprocess.run([sys.executable, "-c", code], stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True)
+    lines = result.stderr.strip().splitlines()
+    return [m for m in (lines[-1].split(",") if lines else []) if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de inicialização do pm")
+    parser.add_argument("-n", "--runs", type=int, default=20, help="Execuções por comando")
+    parser.add_argument("--budget-ms", type=float, default=50.0,
+                        help="Tempo máximo que o PM pode somar ao interpretador (ms)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="pm_startup_")
+    try:
+        env = prepare(work_dir)
+        # Compila o catálogo antes, para medir a busca "quente"
+        for name, cmd_args in COMMANDS.items():
+            result = subprocess.run([sys.executable, PM] + cmd_args, capture_output=True, text=True, env=env)
+            if result.returncode != 0:
+                print(f"{name} falhou:\n{result.stderr}", file=sys.stderr)
+                return 1
+
+        baseline = measure([sys.executable, "-c", "pass"], args.runs)
+        print(f"{'python -c pass':<16} {baseline:7.1f} ms")
+        failed = False
+        for name, cmd_args in COMMANDS.items():
+            total = measure([sys.executable, PM] + cmd_args, args.runs, env)
+            overhead = total - baseline
+            ok = overhead <= args.budget_ms
+            failed |= not ok
+            print(f"{name:<16} {total:7.1f} ms  (+{overhead:.1f} ms)  {'ok' if ok else 'ACIMA DO ORÇAMENTO'}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    heavy = heavy_imports(["--help"])
+    if heavy:
+        failed = True
+        print(f"pm --help importa módulos pesados: {', '.join(heavy)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Benchmarks do PM sobre repositórios sintéticos.
+
+Gera conjuntos de receitas de vários tamanhos e formatos de grafo:
+    chain   - cadeias profundas (cada pacote depende do anterior)
+    fanout  - poucos pacotes com muitas dependências (leque largo)
+    diamond - camadas em que cada pacote depende de dois da camada anterior
+todos com grupos e flags USE, e mede resolve, resolve_with_use, revdep,
+packages_in_group, remove_orphans, o planejamento de grupo do
+GroupManager, a compilação do catálogo de receitas e a busca (o catálogo grava um
+arquivo por receita, então por padrão só é medido até 10k pacotes).
+
+Os resultados vão para JSON (--output). Com --baseline, cada medição é
+comparada com a de referência e o script sai com código 1 se alguma
+ficar mais lenta que --threshold vezes o valor de referência.
+
+A referência benchmarks/baseline.json depende da máquina: ela guarda
+arquitetura, modelo e número de CPUs e versão do Python, e numa máquina
+diferente a comparação é pulada com um aviso. Para gravá-la de novo (na
+máquina onde as comparações vão rodar):
+    python benchmarks/synthetic.py --sizes 1000,10000 -o benchmarks/baseline.json
+
+Uso:
+    python benchmarks/synthetic.py --sizes 1000,10000 -o resultado.json
+    python benchmarks/synthetic.py --sizes 1000,10000 --baseline benchmarks/baseline.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "core"))
+
+from dependency import DependencyResolver  # noqa: E402
+from remove import Remover  # noqa: E402
+from groups import GroupManager  # noqa: E402
+from catalog import RecipeCatalog  # noqa: E402
+from search import find  # noqa: E402
+
+SHAPES = ["chain", "fanout", "diamond"]
+DEFAULT_SIZES = [1000, 10000, 50000]
+GROUPS = 20
+USE_FLAGS = ["python", "gtk", "qt", "ssl", "doc"]
+
+
+def generate(size, shape, seed=0):
+    """
+    Gera um db sintético {nome: receita} com size pacotes.
+    """
+    rng = random.Random(seed)
+    names = [f"pkg{i:06d}" for i in range(size)]
+    flags = [f"use-{flag}" for flag in USE_FLAGS]
+    db = {}
+    for flag in flags:
+        db[flag] = {'name': flag, 'version': '1.0', 'dependencies': [], 'use': [],
+                    'group': 'use', 'description': f"biblioteca opcional {flag}"}
+
+    for i, name in enumerate(names):
+        if shape == "chain":
+            # Cadeias de até 1000 pacotes
+            deps = [names[i - 1]] if i % 1000 else []
+        elif shape == "fanout":
+            # A cada 100 pacotes, um depende de todos os 99 seguintes
+            deps = names[i + 1:i + 100] if i % 100 == 0 else []
+        else:
+            layer = 50
+            if i < layer:
+                deps = []
+            else:
+                base = (i // layer - 1) * layer
+                deps = sorted({names[base + rng.randrange(layer)], names[base + rng.randrange(layer)]})
+        db[name] = {
+            'name': name,
+            'version': f"{i % 7}.{i % 13}",
+            'dependencies': deps,
+            'use': rng.sample(flags, 2) if i % 10 == 0 else [],
+            'group': f"group{i % GROUPS:02d}",
+            'description': f"pacote sintético {shape} número {i}",
+        }
+    return db
+
+
+def timed(fn, runs):
+    """
+    Executa fn runs vezes; retorna mediana e mínimo em ms.
+    """
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {'median_ms': statistics.median(samples), 'min_ms': min(samples), 'runs': runs}
+
+
+def write_recipes(db, recipes_dir):
+    os.makedirs(recipes_dir, exist_ok=True)
+    for name, recipe in db.items():
+        with open(os.path.join(recipes_dir, f"{name}.yaml"), 'w') as f:
+            # JSON é YAML válido e muito mais rápido de gerar
+            json.dump(recipe, f)
+
+
+def bench_shape(size, shape, runs, work_dir, with_catalog):
+    db = generate(size, shape)
+    names = [name for name in db if name.startswith("pkg")]
+    leaves = names[-10:] if shape != "fanout" else names[:1000:100]
+    results = {}
+
+    def case(name, fn, case_runs=runs):
+        key = f"{name}/{shape}/{size}"
+        results[key] = timed(fn, case_runs)
+        print(f"  {key:<40} {results[key]['median_ms']:10.2f} ms")
+
+    # Resolver novo a cada execução: mede também a construção do grafo
+    case("resolve", lambda: DependencyResolver(db).resolve(leaves))
+    resolver = DependencyResolver(db)
+    resolver.resolve(leaves)
+    case("resolve_warm", lambda: resolver.resolve(leaves))
+    case("resolve_with_use", lambda: DependencyResolver(db).resolve_with_use(leaves, ["use-python", "use-ssl"]))
+    case("revdep", lambda: [resolver.revdep(name) for name in names[:100]])
+    case("packages_in_group", lambda: [resolver.packages_in_group(f"group{g:02d}") for g in range(GROUPS)])
+
+    world = set(names[::10])
+
+    def orphans():
+        install_root = os.path.join(work_dir, "root")
+        Remover(dict(db), install_root=install_root).remove_orphans(world)
+
+    case("remove_orphans", orphans, max(1, runs // 3))
+
+    def plan_group():
+        # Mesmo plano que GroupManager.install_group monta antes de construir
+        manager = GroupManager(db)
+        manager.installer.plan(manager.list_group("group00"))
+
+    case("group_plan", plan_group, max(1, runs // 3))
+
+    if with_catalog:
+        recipes_dir = os.path.join(work_dir, f"recipes-{shape}-{size}")
+        write_recipes(db, recipes_dir)
+
+        def compile_catalog():
+            catalog_path = os.path.join(work_dir, f"catalog-{shape}-{size}.db")
+            if os.path.exists(catalog_path):
+                os.remove(catalog_path)
+            catalog = RecipeCatalog(recipes_dir, catalog_path)
+            catalog.refresh()
+            catalog.close()
+
+        case("catalog_compile", compile_catalog, 1)
+        catalog = RecipeCatalog(recipes_dir, os.path.join(work_dir, f"catalog-{shape}-{size}.db"))
+
+        def catalog_warm():
+            catalog.invalidate()
+            catalog.refresh()
+
+        case("catalog_refresh", catalog_warm)
+        queries = ("número 42", "pkg0001", "pkg00010", "sintetco", "inexistente")
+        case("search", lambda: [find(catalog, query) for query in queries])
+        catalog.close()
+    return results
+
+
+# Campos de meta que precisam coincidir para comparar com a referência
+MACHINE_KEYS = ('machine', 'cpu_model', 'cpus', 'python')
+
+
+def machine_info():
+    """
+    Identificação da máquina gravada junto com os resultados.
+    """
+    model = platform.processor()
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    model = line.split(':', 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_model': model,
+        'cpus': os.cpu_count(),
+    }
+
+
+def machine_differences(baseline_meta, meta):
+    """
+    Diferenças entre a máquina da referência e a atual; campos que a
+    referência não gravou não são comparados.
+    """
+    return [f"{key} {baseline_meta[key]} x {meta.get(key)}" for key in MACHINE_KEYS
+            if key in baseline_meta and baseline_meta[key] != meta.get(key)]
+
+
+def compare(results, baseline, threshold):
+    """
+    Retorna [(caso, atual, referência, razão)] dos casos acima do limite.
+    """
+    regressions = []
+    for key, value in results.items():
+        base = baseline.get('results', {}).get(key)
+        if not base or not base['median_ms']:
+            continue
+        ratio = value['median_ms'] / base['median_ms']
+        # Medições muito curtas variam demais para comparar por razão
+        if ratio > threshold and value['median_ms'] - base['median_ms'] > 1.0:
+            regressions.append((key, value['median_ms'], base['median_ms'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do PM em repositórios sintéticos")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Tamanhos separados por vírgula")
+    parser.add_argument("--shapes", default=",".join(SHAPES), help="Formatos de grafo: chain, fanout, diamond")
+    parser.add_argument("-n", "--runs", type=int, default=5, help="Execuções por caso")
+    parser.add_argument("--catalog-max", type=int, default=10000,
+                        help="Maior tamanho em que catálogo e busca são medidos (0 = nunca)")
+    parser.add_argument("-o", "--output", help="Arquivo JSON com os resultados")
+    parser.add_argument("--baseline", help="JSON de referência para detectar regressões")
+    parser.add_argument("--threshold", type=float, default=1.5, help="Razão máxima atual/referência")
+    args = parser.parse_args()
+
+    # Falha antes dos benchmarks, que levam minutos
+    baseline = None
+    machine = machine_info()
+    differences = []
+    if args.baseline:
+        if not os.path.exists(args.baseline):
+            parser.error(f"referência {args.baseline} não encontrada; grave-a com "
+                         f"--sizes 1000,10000 -o {args.baseline}")
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        differences = machine_differences(baseline.get('meta') or {}, machine)
+        if differences:
+            print(f"AVISO: {args.baseline} foi gravada em outra máquina ({', '.join(differences)}); "
+                  f"a comparação será pulada")
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    shapes = [shape for shape in args.shapes.split(",") if shape]
+    work_dir = tempfile.mkdtemp(prefix="pm_bench_")
+    results = {}
+    try:
+        for size in sizes:
+            for shape in shapes:
+                print(f"{shape} com {size} pacotes:")
+                results.update(bench_shape(size, shape, args.runs, work_dir, size <= args.catalog_max))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'meta': dict(machine, date=time.strftime("%Y-%m-%dT%H:%M:%S"), runs=args.runs),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Resultados gravados em {args.output}")
+
+    if differences:
+        print(f"Comparação com {args.baseline} pulada: máquina diferente ({', '.join(differences)}); "
+              f"grave uma referência nesta máquina com --sizes 1000,10000 -o {args.baseline}")
+    elif baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for key, current, base, ratio in regressions:
+            print(f"REGRESSÃO {key}: {current:.2f} ms (referência {base:.2f} ms, {ratio:.1f}x)")
+        if regressions:
+            return 1
+        print(f"Sem regressões acima de {args.threshold}x em relação a {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
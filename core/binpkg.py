@@ -0,0 +1,233 @@
+import io
+import os
+import json
+import time
+import shutil
+import platform
+import tarfile
+import threading
+import subprocess
+from logger import Logger
+from cache import file_sha256
+from extract import Extractor
+from solver import dependency_names, effective_flags
+
+PKGINFO = '.PKGINFO'
+DATA_DIR = 'data'
+EXTENSION = '.pmpkg'
+DEFAULT_REPO_DIR = "/opt/pm/binrepo"
+
+
+class PackageVerifyError(Exception):
+    """
+    Pacote binário corrompido: sha256 do arquivo ou de um arquivo instalado não confere.
+    """
+
+
+def package_filename(name, version):
+    return f"{name}-{version or '0'}{EXTENSION}"
+
+
+def _scan(destdir):
+    """
+    Manifesto do DESTDIR: [[caminho relativo, tipo, tamanho, sha256 ou alvo do link]].
+    """
+    files = []
+    for dirpath, dirnames, filenames in os.walk(destdir):
+        names = filenames + [d for d in dirnames if os.path.islink(os.path.join(dirpath, d))]
+        for name in sorted(names):
+            path = os.path.join(dirpath, name)
+            rel = os.path.relpath(path, destdir)
+            if os.path.islink(path):
+                files.append([rel, 'link', 0, os.readlink(path)])
+            else:
+                files.append([rel, 'file', os.path.getsize(path), file_sha256(path)])
+    return files
+
+
+def create_package(recipe, destdir, out_dir, stage=None, use_flags=None):
+    """
+    Gera <nome>-<versão>.pmpkg a partir de um DESTDIR: um tar.xz com
+    .PKGINFO (metadados, dependências e manifesto com sha256 de cada
+    arquivo) seguido do conteúdo em data/. Retorna o caminho do pacote.
+    """
+    info = {
+        'name': recipe['name'],
+        'version': None if recipe.get('version') is None else str(recipe.get('version')),
+        'description': recipe.get('description'),
+        # Flags do formato antigo não viram dependências sem o repositório de receitas
+        'dependencies': dependency_names(recipe, effective_flags(recipe, use_flags or ()), known=()),
+        'stage': stage,
+        'use_flags': sorted(use_flags or []),
+        'arch': platform.machine(),
+        'built': time.time(),
+        'files': _scan(destdir),
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, package_filename(info['name'], info['version']))
+    tmp = path + f'.{os.getpid()}.{threading.get_ident()}.tmp'
+    payload = json.dumps(info, indent=2, sort_keys=True).encode()
+
+    def write(tar):
+        member = tarfile.TarInfo(PKGINFO)
+        member.size = len(payload)
+        member.mtime = int(info['built'])
+        tar.addfile(member, io.BytesIO(payload))
+        tar.add(destdir, arcname=DATA_DIR)
+
+    # xz multi-thread quando disponível; senão o lzma do Python
+    if shutil.which('xz'):
+        with open(tmp, 'wb') as out:
+            proc = subprocess.Popen(['xz', '-T0', '-c'], stdin=subprocess.PIPE, stdout=out)
+            try:
+                with tarfile.open(fileobj=proc.stdin, mode='w|') as tar:
+                    write(tar)
+            finally:
+                proc.stdin.close()
+            if proc.wait() != 0:
+                os.remove(tmp)
+                raise subprocess.CalledProcessError(proc.returncode, 'xz')
+    else:
+        with tarfile.open(tmp, 'w:xz') as tar:
+            write(tar)
+    os.replace(tmp, path)
+    return path
+
+
+def read_info(path):
+    """
+    Lê o .PKGINFO de um pacote (primeiro membro, sem descompactar o resto).
+    """
+    with tarfile.open(path, 'r|xz') as tar:
+        for member in tar:
+            if member.name == PKGINFO:
+                return json.load(tar.extractfile(member))
+            break
+    raise PackageVerifyError(f"{path} não é um pacote binário do PM (sem {PKGINFO})")
+
+
+class BinaryRepo:
+    """
+    Repositório local de pacotes binários: um diretório com os .pmpkg e
+    um único index.json com versão, dependências, tamanho e sha256 de
+    cada pacote.
+    """
+
+    INDEX = 'index.json'
+
+    def __init__(self, repo_dir=DEFAULT_REPO_DIR, logger: Logger = None):
+        self.repo_dir = repo_dir
+        self.logger = logger
+        self.index_file = os.path.join(repo_dir, self.INDEX)
+        self._lock = threading.Lock()
+        self._index = None
+
+    @classmethod
+    def from_config(cls, config, logger: Logger = None):
+        """
+        Cria o repositório a partir da seção 'binary' do config.yaml.
+        """
+        return cls((config or {}).get('repo_dir', DEFAULT_REPO_DIR), logger=logger)
+
+    @property
+    def index(self):
+        if self._index is None:
+            try:
+                with open(self.index_file, 'r') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {'packages': {}}
+        return self._index
+
+    def _save_index(self):
+        os.makedirs(self.repo_dir, exist_ok=True)
+        tmp = self.index_file + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.index, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.index_file)
+
+    def packages(self):
+        """
+        {nome: entrada do índice}; serve de db para o DependencyResolver.
+        """
+        return self.index['packages']
+
+    def get(self, name):
+        return self.index['packages'].get(name)
+
+    def add(self, package_path):
+        """
+        Copia um .pmpkg para o repositório e atualiza o índice.
+        """
+        info = read_info(package_path)
+        filename = os.path.basename(package_path)
+        target = os.path.join(self.repo_dir, filename)
+        os.makedirs(self.repo_dir, exist_ok=True)
+        if os.path.abspath(package_path) != os.path.abspath(target):
+            shutil.copy2(package_path, target)
+        entry = {
+            'version': info['version'],
+            'file': filename,
+            'sha256': file_sha256(target),
+            'size': os.path.getsize(target),
+            'dependencies': info['dependencies'],
+            'description': info.get('description'),
+            'stage': info.get('stage'),
+            'use_flags': info.get('use_flags', []),
+            'arch': info.get('arch'),
+            'built': info.get('built'),
+        }
+        with self._lock:
+            self.index['packages'][info['name']] = entry
+            self._save_index()
+        if self.logger:
+            self.logger.info(f"Pacote binário {filename} adicionado ao repositório {self.repo_dir}")
+        return entry
+
+    def reindex(self):
+        """
+        Reconstrói o índice a partir dos .pmpkg do diretório.
+        """
+        with self._lock:
+            self._index = {'packages': {}}
+        for filename in sorted(os.listdir(self.repo_dir)):
+            if filename.endswith(EXTENSION):
+                self.add(os.path.join(self.repo_dir, filename))
+
+    def unpack(self, name, staging_dir):
+        """
+        Verifica o sha256 do pacote contra o índice, descompacta o conteúdo
+        em staging_dir e confere cada arquivo com o manifesto do .PKGINFO.
+        Retorna o .PKGINFO.
+        """
+        entry = self.get(name)
+        if entry is None:
+            raise KeyError(f"Pacote binário {name} não está no repositório")
+        path = os.path.join(self.repo_dir, entry['file'])
+        digest = file_sha256(path)
+        if digest != entry['sha256']:
+            raise PackageVerifyError(f"sha256 de {entry['file']} não confere: "
+                                     f"esperado {entry['sha256']}, obtido {digest}")
+
+        unpack_dir = staging_dir + '.unpack'
+        shutil.rmtree(unpack_dir, ignore_errors=True)
+        Extractor(logger=self.logger).extract(path, unpack_dir)
+        with open(os.path.join(unpack_dir, PKGINFO), 'r') as f:
+            info = json.load(f)
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        data = os.path.join(unpack_dir, DATA_DIR)
+        if os.path.isdir(data):
+            os.replace(data, staging_dir)
+        else:
+            os.makedirs(staging_dir)
+        shutil.rmtree(unpack_dir, ignore_errors=True)
+
+        for rel, kind, size, expected in info['files']:
+            target = os.path.join(staging_dir, rel)
+            if kind == 'link':
+                ok = os.path.islink(target) and os.readlink(target) == expected
+            else:
+                ok = os.path.isfile(target) and file_sha256(target) == expected
+            if not ok:
+                raise PackageVerifyError(f"{rel} de {name} não confere com o manifesto do pacote")
+        return info
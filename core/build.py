@@ -1,31 +1,170 @@
 import os
+import re
+import time
+import threading
 import subprocess
 import shutil
+from collections import deque
+from contextlib import contextmanager
 from sandbox import Sandbox
 from hooks import Hooks
 from logger import Logger
+from cache import BuildCache
+from fetch import Fetcher
+from manifest import ManifestDB
+from stats import BuildStats
+from checkpoint import Checkpoints, phase_keys, stage_keys
+from extract import Extractor
+from binpkg import BinaryRepo, create_package
+from scheduler import BuildScheduler
+from jobserver import JobServer
+
+_PREFIX = re.compile(r"--prefix[= ](\S+)")
 
 class Builder:
     """
     Gerencia o processo de build de pacotes.
     """
 
-    def __init__(self, recipe, logger: Logger = None, hooks: Hooks = None, sandbox_config=None):
+    def __init__(self, recipe, logger: Logger = None, hooks: Hooks = None, sandbox_config=None,
+                 cache: BuildCache = None, fetcher: Fetcher = None, manifest: ManifestDB = None,
+                 stats: BuildStats = None, binrepo: BinaryRepo = None, jobserver: JobServer = None):
         self.recipe = recipe
         self.logger = logger
         self.hooks = hooks
+        self.cache = cache
+        self.fetcher = fetcher
+        self.manifest = manifest
+        self.stats = stats
+        self.binrepo = binrepo
+        self.jobserver = jobserver
+        self.timings = {}
+        # Fase atual por thread: stages independentes rodam em paralelo
+        self._local = threading.local()
+        self._checkpoints = None
+        self._keys = {}
+        self.restored = False
         self.sandbox_config = sandbox_config or {}
         self.sandbox = Sandbox(sandbox_config)
 
-    def prepare_sandbox(self):
+    def prepare_sandbox(self, fresh=False):
         """
         Cria e retorna o sandbox para a construção.
+        Com 'work_dir' no sandbox_config, o diretório é persistente por
+        pacote/versão; fresh descarta o progresso de builds anteriores.
         """
-        path = self.sandbox.create()
+        name = f"{self.recipe['name']}-{self.recipe.get('version', '0')}"
+        path = self.sandbox.create(name, fresh=fresh, size_mb=self.estimate_size_mb())
         if self.logger:
-            self.logger.info(f"Sandbox criado em {path}")
+            where = "tmpfs" if self.sandbox.on_tmpfs else "disco"
+            self.logger.info(f"Sandbox criado em {path} ({where})")
         return path
 
+    def estimate_size_mb(self):
+        """
+        Estima o espaço do build: 'build_size_mb' da receita ou o tamanho
+        do tarball multiplicado por sandbox_config['size_factor'] (e pelo
+        número de stages, cada um com seu build_dir).
+        """
+        if self.recipe.get('build_size_mb'):
+            return float(self.recipe['build_size_mb'])
+        tarball = self.fetcher.local_path(self.recipe) if self.fetcher else None
+        tarball = tarball or self.recipe.get('tarball')
+        if tarball and os.path.isfile(tarball):
+            factor = self.sandbox_config.get('size_factor', 6) * max(1, len(self.recipe.get('stages') or ()))
+            return os.path.getsize(tarball) * factor / (1024 * 1024)
+        return None
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Mede o tempo de parede de uma fase do build; o uso de recursos dos
+        comandos executados dentro dela é somado por run_cmd.
+        """
+        previous = getattr(self._local, 'phase', None)
+        self._local.phase = name
+        entry = self.timings.setdefault(name, dict.fromkeys(BuildStats.FIELDS, 0))
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            entry['wall'] += time.monotonic() - start
+            self._local.phase = previous
+
+    def _account(self, usage):
+        """
+        Soma o rusage de um processo filho na fase atual.
+        """
+        phase = getattr(self._local, 'phase', None)
+        if phase is None:
+            return
+        entry = self.timings[phase]
+        entry['utime'] += usage.ru_utime
+        entry['stime'] += usage.ru_stime
+        entry['maxrss_kb'] = max(entry['maxrss_kb'], usage.ru_maxrss)
+        entry['inblock'] += usage.ru_inblock
+        entry['oublock'] += usage.ru_oublock
+
+    def _wait(self, proc):
+        """
+        Aguarda o processo com wait4, obtendo o rusage apenas deste filho
+        (e dos seus descendentes), mesmo com vários builds em paralelo.
+        """
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        self._account(usage)
+        return proc.returncode
+
+    def run_cmd(self, cmd, cwd=None, env=None):
+        """
+        Executa um comando de build. Com logger, stdout/stderr passam por um
+        pipe para o log de build do pacote; no terminal aparecem só as
+        últimas linhas, e apenas se o comando falhar.
+        Com jobserver, o comando segura uma ficha enquanto roda e o make
+        usa o jobserver no lugar do -j da receita.
+        """
+        if self.jobserver:
+            cmd = self.jobserver.command(cmd)
+            env = self.jobserver.environ(os.environ if env is None else env)
+            with self.jobserver.slot():
+                return self._run_cmd(cmd, cwd, env, self.jobserver.fds)
+        return self._run_cmd(cmd, cwd, env)
+
+    def _run_cmd(self, cmd, cwd, env, pass_fds=()):
+        if not self.logger:
+            proc = subprocess.Popen(cmd, shell=True, cwd=cwd, env=env, pass_fds=pass_fds)
+            if self._wait(proc) != 0:
+                raise subprocess.CalledProcessError(proc.returncode, cmd)
+            return
+
+        log_path = self.logger.build_log(self.recipe['name'])
+        tail = deque(maxlen=self.logger.tail_lines)
+        with open(log_path, 'ab') as log:
+            log.write(f"$ {cmd}\n".encode())
+            proc = subprocess.Popen(cmd, shell=True, cwd=cwd, env=env, pass_fds=pass_fds,
+                                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            for line in proc.stdout:
+                log.write(line)
+                tail.append(line)
+            proc.stdout.close()
+            returncode = self._wait(proc)
+
+        if returncode != 0:
+            output = b"".join(tail).decode(errors='replace').rstrip()
+            self.logger.error(f"Comando falhou ({returncode}): {cmd}\n{output}\nLog completo: {log_path}")
+            raise subprocess.CalledProcessError(returncode, cmd)
+
+    def source_tarball(self):
+        """
+        Caminho local do tarball: baixado pelo Fetcher quando a receita
+        traz urls.tarball, senão o campo 'tarball' da receita.
+        """
+        if self.fetcher:
+            path = self.fetcher.fetch(self.recipe)
+            if path:
+                return path
+        return self.recipe.get('tarball')
+
     def apply_patches(self, build_path):
         """
         Aplica patches listados na receita.
@@ -35,68 +174,451 @@ class Builder:
             cmd = f"patch -p{patch.get('strip', 1)} < {patch_file}"
             if self.logger:
                 self.logger.info(f"Aplicando patch: {patch_file}")
-            subprocess.run(cmd, shell=True, cwd=build_path, check=True)
+            self.run_cmd(cmd, cwd=build_path)
 
-    def build(self, stage='build', use_fakeroot=False, destdir=None):
+    def build_env(self, jobs=None):
+        """
+        Ambiente dos comandos de build. Com jobs definido, limita o make
+        via MAKEFLAGS ao número de jobs reservado para este pacote.
+        """
+        env = os.environ.copy()
+        if jobs:
+            env['MAKEFLAGS'] = f"-j{jobs}"
+        return env
+
+    def build(self, stage='build', use_fakeroot=False, destdir=None, jobs=None, use_flags=None, clean=False):
         """
         Executa o build completo:
         - Pre-hooks
-        - Build (autotools, make, etc.)
+        - Build (autotools, make, etc.), em stages se a receita tiver 'stages'
         - Post-hooks
+        jobs: número de jobs de compilação reservado para este pacote
+        use_flags: flags USE habilitadas (fazem parte da chave do cache)
+        Com cache, manifesto ou binrepo, o pacote é instalado num DESTDIR
+        próprio do sandbox e depois copiado para destdir (ou /); um build
+        idêntico já feito é apenas descompactado do cache. Com binrepo, o
+        DESTDIR também é exportado como pacote binário.
+        Tempo e uso de recursos de cada fase ficam em self.timings e, com
+        stats, no histórico de builds.
+        Com diretório de trabalho persistente, um build que falhou é
+        retomado na primeira fase incompleta; clean força o build completo.
+        As etapas também podem ser chamadas separadamente (prepare, compile,
+        finish), como faz o pipeline de instalação.
         """
-        sandbox_path = self.prepare_sandbox()
-        build_path = os.path.join(sandbox_path, 'build')
-        os.makedirs(build_path, exist_ok=True)
+        self.prepare(stage, destdir=destdir, use_flags=use_flags, clean=clean)
+        self.compile(jobs=jobs, use_fakeroot=use_fakeroot)
+        self.finish()
+
+    @contextmanager
+    def _step(self):
+        """
+        Em caso de erro numa etapa, registra o build como falho.
+        """
+        try:
+            yield
+        except BaseException:
+            self._record('failed')
+            raise
+
+    def _record(self, status):
+        # Build que falhou mantém o diretório, mas devolve a reserva do tmpfs
+        self.sandbox.release()
+        if self.stats:
+            self.stats.record(self.recipe['name'], self.recipe.get('version'), self.stage,
+                              self.started, time.time() - self.started, status, self.timings)
+
+    def prepare(self, stage='build', destdir=None, use_flags=None, clean=False, tarball=None):
+        """
+        Primeira etapa: pre-hooks, sandbox, cache e fontes baixados e extraídos.
+        tarball: fontes já baixados (senão usa source_tarball)
+        """
+        self.timings = {}
+        self.started = time.time()
+        self.stage = stage
+        self.destdir = destdir
+        self.use_flags = use_flags
+        with self._step():
+            self._prepare(clean, tarball)
+
+    def _prepare(self, clean, tarball):
+        if self.logger:
+            # Cada build começa com um log de build novo
+            open(self.logger.build_log(self.recipe['name']), 'w').close()
 
         # Pre-build hook
         if self.hooks:
-            self.hooks.run(f"pre_{stage}", self.recipe['name'])
+            with self.phase('pre_hooks'):
+                self.hooks.run(f"pre_{self.stage}", self.recipe['name'])
 
-        # Extrair fontes
-        src_tarball = self.recipe.get('tarball')
-        if src_tarball:
-            cmd_extract = f"tar xf {src_tarball} -C {build_path}"
-            if self.logger:
-                self.logger.info(f"Extraindo fontes: {src_tarball}")
-            subprocess.run(cmd_extract, shell=True, check=True)
+        sandbox_path = self.prepare_sandbox(fresh=clean)
+        self.staged = any(c is not None for c in (self.cache, self.manifest, self.binrepo))
+        self.install_dest = self.sandbox.destdir_path('destdir') if self.staged else self.destdir
 
-        # Aplicar patches
-        self.apply_patches(build_path)
+        # Cache de artefatos
+        self.cache_key = None
+        self.restored = False
+        if self.cache:
+            with self.phase('cache'):
+                self.cache_key = self.cache.key(self.recipe, self.stage, self.use_flags)
+                self.restored = self.cache.restore(self.cache_key, self.install_dest)
 
-        # Configuração do build (exemplo: ./configure ou mozconfig)
-        config_cmd = self.recipe.get('config_cmd')
-        if config_cmd:
-            full_cmd = f"{config_cmd}"
-            if use_fakeroot:
-                full_cmd = f"fakeroot {full_cmd}"
-            if self.logger:
-                self.logger.info(f"Configurando build: {full_cmd}")
-            subprocess.run(full_cmd, shell=True, cwd=build_path, check=True)
+        if not self.restored:
+            self.build_path = os.path.join(sandbox_path, 'build')
+            os.makedirs(self.build_path, exist_ok=True)
+            self.extract_sources(self.build_path, tarball)
 
-        # Compilação
-        build_cmd = self.recipe.get('build_cmd', 'make -j$(nproc)')
-        if use_fakeroot:
-            build_cmd = f"fakeroot {build_cmd}"
-        if self.logger:
-            self.logger.info(f"Compilando: {build_cmd}")
-        subprocess.run(build_cmd, shell=True, cwd=build_path, check=True)
+    def compile(self, jobs=None, use_fakeroot=False):
+        """
+        Segunda etapa: patches, configure, compilação e instalação no DESTDIR.
+        Nada a fazer se o build veio do cache.
+        """
+        if self.restored:
+            return
+        with self._step():
+            self.run_phases(self.build_path, self.install_dest, self.build_env(jobs), use_fakeroot, jobs)
+            if self.cache_key:
+                with self.phase('cache'):
+                    self.cache.store(self.cache_key, self.install_dest, package=self.recipe['name'])
 
-        # Instalação (DESTDIR)
-        if destdir:
-            install_cmd = f"{self.recipe.get('install_cmd', 'make install')} DESTDIR={destdir}"
-        else:
-            install_cmd = self.recipe.get('install_cmd', 'make install')
-        if use_fakeroot:
-            install_cmd = f"fakeroot {install_cmd}"
-        if self.logger:
-            self.logger.info(f"Instalando: {install_cmd}")
-        subprocess.run(install_cmd, shell=True, cwd=build_path, check=True)
+    def finish(self):
+        """
+        Última etapa: cópia para o sistema, post-hooks e limpeza do sandbox.
+        Retorna True se o build veio do cache.
+        """
+        with self._step():
+            self._finish()
+        self._record('cached' if self.restored else 'ok')
+        return self.restored
+
+    def _finish(self):
+        if self.binrepo:
+            with self.phase('package'):
+                self.export(self.install_dest)
+
+        if self.staged:
+            with self.phase('merge'):
+                self.merge(self.install_dest, self.destdir or '/')
 
         # Post-build hook
         if self.hooks:
-            self.hooks.run(f"post_{stage}", self.recipe['name'])
+            with self.phase('post_hooks'):
+                self.hooks.run(f"post_{self.stage}", self.recipe['name'])
 
         # Limpeza do sandbox
+        estimate = self.sandbox.reserved_mb
+        if estimate and self.logger:
+            used = self.sandbox.usage_mb()
+            if used > estimate:
+                self.logger.warning(f"Build de {self.recipe['name']} usou {used:.0f} MB no tmpfs "
+                                    f"(estimativa: {estimate:.0f} MB); ajuste build_size_mb na receita")
         self.sandbox.clean()
         if self.logger:
             self.logger.info("Sandbox limpo após build")
+
+    def abort(self):
+        """
+        Descarta um build preparado que não chegou a ser compilado.
+        Um diretório de trabalho persistente é mantido (com a extração já feita).
+        """
+        if self.sandbox.persistent:
+            self.sandbox.release()
+        else:
+            self.sandbox.clean()
+
+    def _skip(self, phase):
+        return self._checkpoints is not None and self._checkpoints.done(phase, self._keys[phase])
+
+    def _done(self, phase):
+        if self._checkpoints is not None:
+            self._checkpoints.mark(phase, self._keys[phase])
+
+    def extract_sources(self, build_path, tarball=None):
+        """
+        Baixa (se preciso) e extrai os fontes em build_path.
+        Em diretório de trabalho persistente, prepara os stamps das fases
+        e pula a extração se ela já foi feita.
+        """
+        with self.phase('fetch'):
+            src_tarball = tarball or self.source_tarball()
+
+        self._checkpoints = None
+        self._keys = {}
+        if self.sandbox.persistent:
+            self._checkpoints = Checkpoints(self.sandbox.base_path)
+            self._keys = phase_keys(self.recipe, src_tarball, self.install_dest, self.use_flags)
+            pending = self._checkpoints.first_pending(self._keys)
+            if pending is not None:
+                self._checkpoints.invalidate_from(pending)
+            if pending != 'extract' and self.logger:
+                self.logger.info(f"Retomando build de {self.recipe['name']} na fase '{pending or 'merge'}'")
+
+        # Extrair fontes
+        if not self._skip('extract'):
+            if self._checkpoints is not None:
+                shutil.rmtree(build_path, ignore_errors=True)
+                os.makedirs(build_path, exist_ok=True)
+            if src_tarball:
+                if self.logger:
+                    self.logger.info(f"Extraindo fontes: {src_tarball}")
+                with self.phase('extract'):
+                    Extractor(logger=self.logger).extract(src_tarball, build_path)
+            self._done('extract')
+
+    def run_phases(self, build_path, install_dest, env, use_fakeroot=False, jobs=None):
+        """
+        Aplica patches, configura, compila e instala em install_dest.
+        Os comandos rodam na raiz dos fontes (ver source_path).
+        Em diretório de trabalho persistente, fases com stamp válido são puladas.
+        """
+        build_path = self.source_path(build_path)
+
+        # Aplicar patches
+        if not self._skip('patch'):
+            with self.phase('patch'):
+                self.apply_patches(build_path)
+            self._done('patch')
+
+        if self.recipe.get('stages'):
+            # Os stages têm stamps próprios; os do pacote marcam o conjunto
+            if not self._skip('install'):
+                self.run_stages(build_path, install_dest, use_fakeroot, jobs)
+                for phase in Checkpoints.STAGE_PHASES:
+                    self._done(phase)
+            return
+
+        self.run_steps(self.recipe, build_path, install_dest, env, use_fakeroot, jobs,
+                       self._checkpoints, self._keys)
+
+    def run_steps(self, cmds, cwd, install_dest, env, use_fakeroot=False, jobs=None,
+                  checkpoints=None, keys=None, label=''):
+        """
+        Configura, compila e instala em install_dest com os comandos de cmds
+        (a receita ou um stage). label prefixa os nomes das fases.
+        """
+        def skip(phase):
+            return checkpoints is not None and checkpoints.done(phase, keys[phase])
+
+        def done(phase):
+            if checkpoints is not None:
+                checkpoints.mark(phase, keys[phase])
+
+        # Configuração do build (exemplo: ./configure ou mozconfig)
+        config_cmd = cmds.get('config_cmd')
+        if not skip('configure'):
+            if config_cmd:
+                full_cmd = f"{config_cmd}"
+                if use_fakeroot:
+                    full_cmd = f"fakeroot {full_cmd}"
+                if self.logger:
+                    self.logger.info(f"Configurando build: {full_cmd}")
+                with self.phase(f"{label}configure"):
+                    self.run_cmd(full_cmd, cwd=cwd, env=env)
+            done('configure')
+
+        # Compilação
+        if not skip('compile'):
+            default_build_cmd = f"make -j{jobs}" if jobs else 'make -j$(nproc)'
+            build_cmd = cmds.get('build_cmd', default_build_cmd)
+            if use_fakeroot:
+                build_cmd = f"fakeroot {build_cmd}"
+            if self.logger:
+                self.logger.info(f"Compilando: {build_cmd}")
+            with self.phase(f"{label}compile"):
+                self.run_cmd(build_cmd, cwd=cwd, env=env)
+            done('compile')
+
+        # Instalação (DESTDIR)
+        if not skip('install'):
+            if install_dest and install_dest.startswith(self.sandbox.base_path + os.sep):
+                # DESTDIR do sandbox: descarta restos de uma instalação interrompida
+                shutil.rmtree(install_dest, ignore_errors=True)
+                os.makedirs(install_dest, exist_ok=True)
+            if install_dest:
+                install_cmd = f"{cmds.get('install_cmd', 'make install')} DESTDIR={install_dest}"
+            else:
+                install_cmd = cmds.get('install_cmd', 'make install')
+            if use_fakeroot:
+                install_cmd = f"fakeroot {install_cmd}"
+            if self.logger:
+                self.logger.info(f"Instalando: {install_cmd}")
+            with self.phase(f"{label}install"):
+                self.run_cmd(install_cmd, cwd=cwd, env=env)
+            done('install')
+
+    def source_path(self, build_path):
+        """
+        Raiz da árvore de fontes extraída em build_path: 'source_dir' da
+        receita (relativo a build_path), o único diretório de topo do
+        tarball (ex.: gcc-13.2.0/) ou o próprio build_path.
+        """
+        if self.recipe.get('source_dir'):
+            return os.path.join(build_path, self.recipe['source_dir'])
+        entries = os.listdir(build_path)
+        if len(entries) == 1 and os.path.isdir(os.path.join(build_path, entries[0])):
+            return os.path.join(build_path, entries[0])
+        return build_path
+
+    def stage_graph(self):
+        """
+        Stages da receita na ordem declarada: {stage: [stages de que depende]}.
+        Sem 'after', um stage depende do anterior (bootstrap encadeado);
+        'after' lista só stages declarados antes, e stages sem relação entre
+        si podem rodar em paralelo.
+        """
+        graph = {}
+        previous = None
+        for name, stage in (self.recipe.get('stages') or {}).items():
+            after = (stage or {}).get('after')
+            if after is None:
+                after = [previous] if previous else []
+            unknown = [dep for dep in after if dep not in graph]
+            if unknown:
+                raise ValueError(f"Stage {name} de {self.recipe['name']} depende de stages "
+                                 f"não declarados antes dele: {unknown}")
+            graph[name] = list(after)
+            previous = name
+        return graph
+
+    def stage_prefix(self, stage):
+        """
+        Prefixo de instalação de um stage: 'prefix' ou o --prefix do config_cmd.
+        """
+        if stage.get('prefix'):
+            return stage['prefix']
+        found = _PREFIX.search(stage.get('config_cmd') or '')
+        return found.group(1) if found else None
+
+    def run_stages(self, build_path, install_dest, use_fakeroot=False, jobs=None):
+        """
+        Build em stages (bootstrap) sobre uma única árvore de fontes
+        (build_path, já a raiz dos fontes) extraída e com patches: cada stage configura fora da árvore, no seu
+        build_dir ("./configure" passa a apontar para os fontes). Os stages
+        intermediários instalam num diretório próprio do sandbox, e o bin do
+        prefixo deles entra no PATH dos stages que dependem deles; só o
+        último stage declarado é instalado em install_dest. Stages
+        independentes rodam em paralelo, dividindo os jobs.
+        """
+        stages = self.recipe['stages']
+        graph = self.stage_graph()
+        final = list(stages)[-1]
+        base = self.sandbox.base_path
+        roots, ancestors, keys = {}, {}, {}
+        for name, after in graph.items():
+            stage = stages[name] or {}
+            roots[name] = install_dest if name == final else os.path.join(base, 'stage-root', name)
+            lineage = []
+            for dep in after:
+                for parent in [dep] + ancestors[dep]:
+                    if parent not in lineage:
+                        lineage.append(parent)
+            ancestors[name] = lineage
+            if self._checkpoints is not None:
+                previous = "".join([self._keys['patch']] + [keys[dep]['install'] for dep in after])
+                keys[name] = stage_keys(stage, previous, roots[name], self.use_flags)
+
+        def build_one(name, share):
+            stage = stages[name] or {}
+            stage_dir = os.path.join(base, 'stage-build', stage.get('build_dir') or name)
+            checkpoints = None
+            pending = 'configure'
+            if self._checkpoints is not None:
+                checkpoints = Checkpoints(base, stage=name)
+                pending = checkpoints.first_pending(keys[name])
+                if pending is not None:
+                    checkpoints.invalidate_from(pending)
+            if pending == 'configure':
+                # Configure refeito: o build_dir começa vazio
+                shutil.rmtree(stage_dir, ignore_errors=True)
+            os.makedirs(stage_dir, exist_ok=True)
+
+            env = self.build_env(share if jobs else None)
+            paths = []
+            for dep in ancestors[name]:
+                prefix = self.stage_prefix(stages[dep] or {})
+                if prefix:
+                    paths.append(os.path.join(roots[dep], prefix.lstrip('/'), 'bin'))
+            env['PATH'] = os.pathsep.join(paths + [env.get('PATH', os.defpath)])
+
+            cmds = dict(stage)
+            config_cmd = stage.get('config_cmd')
+            if config_cmd and config_cmd.startswith('./'):
+                cmds['config_cmd'] = os.path.join(os.path.relpath(build_path, stage_dir), config_cmd[2:])
+            if self.logger:
+                self.logger.info(f"Stage {name} de {self.recipe['name']} em {stage_dir}")
+            self.run_steps(cmds, stage_dir, roots[name], env, use_fakeroot, share if jobs else None,
+                           checkpoints, keys.get(name), label=f"{name}/")
+
+        BuildScheduler(graph, jobs=jobs or len(graph), logger=self.logger).run(build_one)
+
+    def export(self, staging):
+        """
+        Gera o pacote binário do DESTDIR e o adiciona ao repositório.
+        """
+        path = create_package(self.recipe, staging, self.binrepo.repo_dir,
+                              stage=self.stage, use_flags=self.use_flags)
+        self.binrepo.add(path)
+        return path
+
+    def merge(self, staging, root):
+        """
+        Copia o DESTDIR do sandbox para root. Com manifesto, verifica
+        conflitos de arquivos antes e registra o que foi instalado.
+        """
+        if self.manifest:
+            self.manifest.install(self.recipe['name'], staging, root=root, version=self.recipe.get('version'))
+        else:
+            shutil.copytree(staging, root, symlinks=True, dirs_exist_ok=True)
+
+
+def build(package=None, jobs=None, clean=False, export=False, config_path=None):
+    """
+    Comando `pm build`: compila o pacote (ou todas as receitas, em ordem de
+    dependências) sem instalar. O resultado fica em <packages_dir>/built/
+    <nome>-<versão>; export também o grava no repositório binário.
+    jobs: total de jobs de compilação (padrão: build.jobs_default, ou um por
+    CPU), dividido pelo jobserver como no `pm install`
+    Retorna a lista de pacotes compilados.
+    """
+    from components import load_config, make_logger, load_db, make_hooks, db_dir
+    from cache import BuildCache
+    from fetch import Fetcher
+    from stats import BuildStats
+    from sandbox import sandbox_config
+    from dependency import DependencyResolver
+    config = load_config(config_path)
+    logger = make_logger(config)
+    db = load_db(config, logger)
+    if package is None:
+        packages = DependencyResolver(db).resolve(list(db))
+    elif package in db:
+        packages = [package]
+    else:
+        raise KeyError(f"Receita de {package} não encontrada")
+    hooks = make_hooks(config, logger)
+    cache = BuildCache.from_config(config.get('cache'), logger=logger)
+    fetcher = Fetcher.from_config(config, logger=logger)
+    sandbox = sandbox_config(config)
+    binrepo = BinaryRepo.from_config(config.get('binary'), logger=logger) if export else None
+    built_dir = os.path.join((config.get('directories') or {}).get('packages_dir', '/opt/pm/packages'), 'built')
+    build_config = config.get('build') or {}
+    jobs = jobs or build_config.get('jobs_default') or os.cpu_count() or 1
+    jobserver = None
+    if build_config.get('jobserver', True):
+        jobserver = JobServer(jobs, max_load=build_config.get('max_load'),
+                              min_free_mb=build_config.get('min_free_mb'), logger=logger)
+    stats = BuildStats(os.path.join(db_dir(config), 'stats.db'))
+    built = []
+    try:
+        for name in packages:
+            recipe = db[name]
+            builder = Builder(recipe, logger=logger, hooks=hooks, sandbox_config=sandbox, cache=cache,
+                              fetcher=fetcher, stats=stats, binrepo=binrepo, jobserver=jobserver)
+            builder.build(destdir=os.path.join(built_dir, f"{name}-{recipe.get('version', '0')}"),
+                          jobs=jobs, clean=clean)
+            built.append(name)
+    finally:
+        if jobserver:
+            jobserver.close()
+        stats.close()
+    print(f"Pacotes compilados: {built}")
+    return built
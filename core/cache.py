@@ -0,0 +1,196 @@
+import os
+import re
+import json
+import time
+import hashlib
+import tarfile
+import threading
+from logger import Logger
+
+
+# Python >= 3.12 (e 3.11.4) aceita filtros de extração
+EXTRACT_KWARGS = {'filter': 'tar'} if hasattr(tarfile, 'tar_filter') else {}
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """
+    Calcula o sha256 de um arquivo em blocos.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """
+    Cache local de artefatos de build endereçado por conteúdo.
+    A chave é o hash da receita, do sha256 do tarball, dos patches,
+    das flags USE e do stage; o valor é o DESTDIR compactado.
+    """
+
+    INDEX = 'index.json'
+
+    def __init__(self, cache_dir, max_size_mb=10240, logger: Logger = None):
+        """
+        cache_dir: diretório onde ficam os artefatos e o índice
+        max_size_mb: tamanho máximo do cache; acima disso remove os menos usados (LRU)
+        """
+        self.cache_dir = cache_dir
+        self.max_size = int(max_size_mb) * 1024 * 1024
+        self.logger = logger
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index_file = os.path.join(cache_dir, self.INDEX)
+        self.index = self._load_index()
+
+    @classmethod
+    def from_config(cls, config, logger: Logger = None):
+        """
+        Cria o cache a partir da seção 'cache' do config.yaml.
+        Retorna None se o cache estiver desabilitado.
+        """
+        config = config or {}
+        if not config.get('enable', False):
+            return None
+        return cls(config.get('dir', '/opt/pm/cache'), config.get('max_size_mb', 10240), logger=logger)
+
+    def _load_index(self):
+        if not os.path.exists(self.index_file):
+            return {'entries': {}, 'hits': 0, 'misses': 0}
+        try:
+            with open(self.index_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'entries': {}, 'hits': 0, 'misses': 0}
+
+    def _save_index(self):
+        tmp = self.index_file + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.index, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.index_file)
+
+    def _archive_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.tar.gz")
+
+    def key(self, recipe, stage='build', use_flags=None):
+        """
+        Calcula a chave de cache de um build.
+        """
+        digest = hashlib.sha256()
+        digest.update(json.dumps(recipe, sort_keys=True, default=str).encode())
+
+        tarball_hash = recipe.get('sha256', '')
+        if not re.fullmatch(r'[0-9a-fA-F]{64}', str(tarball_hash)):
+            tarball = recipe.get('tarball')
+            tarball_hash = file_sha256(tarball) if tarball and os.path.isfile(tarball) else ''
+        digest.update(str(tarball_hash).lower().encode())
+
+        for patch in recipe.get('patches', []):
+            patch_file = patch['file']
+            if os.path.isfile(patch_file):
+                digest.update(file_sha256(patch_file).encode())
+            else:
+                digest.update(patch_file.encode())
+
+        digest.update(','.join(sorted(use_flags or [])).encode())
+        digest.update(stage.encode())
+        return digest.hexdigest()
+
+    def contains(self, key):
+        """
+        Verifica se o artefato existe no cache, sem contabilizar hit/miss.
+        """
+        with self._lock:
+            return key in self.index['entries'] and os.path.exists(self._archive_path(key))
+
+    def lookup(self, key):
+        """
+        Retorna o caminho do artefato se existir no cache e contabiliza hit/miss.
+        """
+        with self._lock:
+            entry = self.index['entries'].get(key)
+            path = self._archive_path(key)
+            if entry and os.path.exists(path):
+                entry['last_used'] = time.time()
+                self.index['hits'] += 1
+                self._save_index()
+                return path
+            if entry:
+                del self.index['entries'][key]
+            self.index['misses'] += 1
+            self._save_index()
+            return None
+
+    def restore(self, key, destdir):
+        """
+        Descompacta o artefato no destdir. Retorna True em caso de hit.
+        """
+        path = self.lookup(key)
+        if not path:
+            return False
+        os.makedirs(destdir, exist_ok=True)
+        with tarfile.open(path, 'r:gz') as tar:
+            tar.extractall(destdir, **EXTRACT_KWARGS)
+        if self.logger:
+            self.logger.info(f"Cache hit ({key[:12]}): artefato restaurado em {destdir}")
+        return True
+
+    def store(self, key, destdir, package=None):
+        """
+        Compacta o conteúdo do destdir e registra no cache.
+        """
+        path = self._archive_path(key)
+        tmp = path + f'.{os.getpid()}.{threading.get_ident()}.tmp'
+        with tarfile.open(tmp, 'w:gz') as tar:
+            for entry in sorted(os.listdir(destdir)):
+                tar.add(os.path.join(destdir, entry), arcname=entry)
+        os.replace(tmp, path)
+
+        with self._lock:
+            self.index['entries'][key] = {
+                'package': package,
+                'size': os.path.getsize(path),
+                'created': time.time(),
+                'last_used': time.time(),
+            }
+            self._evict()
+            self._save_index()
+        if self.logger:
+            self.logger.info(f"Artefato de {package} armazenado no cache ({key[:12]})")
+
+    def _evict(self):
+        """
+        Remove os artefatos menos usados até o cache caber em max_size.
+        """
+        entries = self.index['entries']
+        total = sum(e['size'] for e in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]['last_used']):
+            if total <= self.max_size:
+                break
+            total -= entries[key]['size']
+            del entries[key]
+            try:
+                os.remove(self._archive_path(key))
+            except FileNotFoundError:
+                pass
+            if self.logger:
+                self.logger.debug(f"Artefato {key[:12]} removido do cache (LRU)")
+
+    def stats(self):
+        """
+        Retorna estatísticas do cache.
+        """
+        with self._lock:
+            hits = self.index['hits']
+            misses = self.index['misses']
+            entries = self.index['entries']
+            return {
+                'entries': len(entries),
+                'size': sum(e['size'] for e in entries.values()),
+                'max_size': self.max_size,
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            }
@@ -0,0 +1,248 @@
+import os
+import re
+import json
+import sqlite3
+import hashlib
+import threading
+from functools import lru_cache
+from logger import Logger
+
+DEFAULT_RECIPES_DIR = "/opt/pm/recipes"
+DEFAULT_CATALOG_PATH = "/opt/pm/db/catalog.db"
+
+_WORDS = re.compile(r"\w+")
+
+
+def words(text):
+    return _WORDS.findall((text or '').lower())
+
+
+@lru_cache(maxsize=65536)
+def word_trigrams(word):
+    """
+    Trigramas de uma palavra, com as bordas marcadas por espaços
+    ("gcc" -> "  g", " gc", "gcc", "cc "), como no pg_trgm.
+    """
+    padded = f"  {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def trigrams(text):
+    """
+    Trigramas de todas as palavras de um texto.
+    """
+    grams = set()
+    for word in words(text):
+        grams |= word_trigrams(word)
+    return grams
+
+
+def parse_recipe(path):
+    """
+    Lê uma receita YAML. O PyYAML só é importado quando alguma receita
+    realmente precisa ser (re)compilada.
+    """
+    import yaml
+    with open(path, 'r') as f:
+        return yaml.safe_load(f) or {}
+
+
+class RecipeCatalog:
+    """
+    Catálogo compilado das receitas (SQLite).
+    Cada receita é guardada como JSON junto com mtime, tamanho e sha256
+    do arquivo YAML; só receitas alteradas são lidas novamente.
+    Nome e descrição também são indexados por trigramas para o `pm search`.
+    """
+
+    VERSION = 1
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS recipes (
+            name TEXT PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            version TEXT,
+            description TEXT,
+            grp TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS recipes_grp ON recipes (grp);
+        CREATE TABLE IF NOT EXISTS trigrams (
+            gram TEXT NOT NULL,
+            name TEXT NOT NULL,
+            PRIMARY KEY (gram, name)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS trigrams_name ON trigrams (name);
+    """
+
+    def __init__(self, recipes_dir=DEFAULT_RECIPES_DIR, catalog_path=DEFAULT_CATALOG_PATH, logger: Logger = None):
+        self.recipes_dir = recipes_dir
+        self.catalog_path = catalog_path
+        self.logger = logger
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(catalog_path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(catalog_path, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+        self._fresh = False
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < self.VERSION:
+            self._reindex()
+
+    def _reindex(self):
+        """
+        Monta o índice de trigramas de catálogos criados antes dele.
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM trigrams")
+            for name, description in self.conn.execute("SELECT name, description FROM recipes").fetchall():
+                self._index(name, description)
+            self.conn.execute(f"PRAGMA user_version = {self.VERSION}")
+
+    def _index(self, name, description):
+        self.conn.executemany("INSERT OR IGNORE INTO trigrams (gram, name) VALUES (?, ?)",
+                              [(gram, name) for gram in trigrams(f"{name} {description or ''}")])
+
+    def close(self):
+        self.conn.close()
+
+    def _recipe_files(self):
+        """
+        Lista os arquivos *.yaml do diretório de receitas com seus stats.
+        """
+        files = {}
+        if not os.path.isdir(self.recipes_dir):
+            return files
+        for entry in os.scandir(self.recipes_dir):
+            if entry.is_file() and entry.name.endswith(('.yaml', '.yml')):
+                files[entry.path] = entry.stat()
+        return files
+
+    def invalidate(self):
+        """
+        Faz a próxima consulta verificar de novo o diretório de receitas
+        (incremental: só receitas alteradas são relidas).
+        """
+        with self._lock:
+            self._fresh = False
+
+    def refresh(self, force=False):
+        """
+        Atualiza o catálogo de forma incremental.
+        Retorna o número de receitas recompiladas.
+        """
+        with self._lock:
+            if self._fresh and not force:
+                return 0
+            files = self._recipe_files()
+            known = {row[0]: row[1:] for row in
+                     self.conn.execute("SELECT path, mtime_ns, size, sha256, name FROM recipes")}
+            compiled = 0
+
+            with self.conn:
+                for path in set(known) - set(files):
+                    self.conn.execute("DELETE FROM recipes WHERE path = ?", (path,))
+                    self.conn.execute("DELETE FROM trigrams WHERE name = ?", (known[path][3],))
+
+                for path, st in files.items():
+                    old = known.get(path)
+                    if old and not force and old[0] == st.st_mtime_ns and old[1] == st.st_size:
+                        continue
+                    with open(path, 'rb') as f:
+                        digest = hashlib.sha256(f.read()).hexdigest()
+                    if old and not force and old[2] == digest:
+                        # Só o mtime mudou (ex.: git checkout)
+                        self.conn.execute("UPDATE recipes SET mtime_ns = ? WHERE path = ?", (st.st_mtime_ns, path))
+                        continue
+                    try:
+                        recipe = parse_recipe(path)
+                    except Exception as e:
+                        if self.logger:
+                            self.logger.error(f"Receita inválida {path}: {e}")
+                        continue
+                    name = recipe.get('name') or os.path.splitext(os.path.basename(path))[0]
+                    self.conn.execute("DELETE FROM trigrams WHERE name IN (?, ?)", (name, old[3] if old else name))
+                    self.conn.execute("DELETE FROM recipes WHERE path = ? OR name = ?", (path, name))
+                    self.conn.execute(
+                        "INSERT INTO recipes (name, path, mtime_ns, size, sha256, version, description, grp, data) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (name, path, st.st_mtime_ns, st.st_size, digest,
+                         str(recipe.get('version', '')), recipe.get('description', ''),
+                         recipe.get('group'), json.dumps(recipe, default=str)))
+                    self._index(name, recipe.get('description', ''))
+                    compiled += 1
+
+            self._fresh = True
+            if compiled and self.logger:
+                self.logger.debug(f"Catálogo de receitas atualizado: {compiled} receita(s) recompilada(s)")
+            return compiled
+
+    def get(self, name):
+        """
+        Retorna a receita de um pacote ou None.
+        """
+        self.refresh()
+        row = self.conn.execute("SELECT data FROM recipes WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def names(self):
+        self.refresh()
+        return [row[0] for row in self.conn.execute("SELECT name FROM recipes ORDER BY name")]
+
+    def entries(self):
+        """
+        Retorna (nome, versão, descrição, grupo) de todas as receitas, sem desserializar o JSON.
+        """
+        self.refresh()
+        return self.conn.execute("SELECT name, version, description, grp FROM recipes ORDER BY name").fetchall()
+
+    def candidates(self, grams, min_hits=1, group=None):
+        """
+        Entradas (nome, versão, descrição, grupo) que têm pelo menos
+        min_hits dos trigramas dados, consultando só o índice.
+        """
+        self.refresh()
+        grams = list(grams)
+        if not grams:
+            return []
+        marks = ",".join("?" * len(grams))
+        sql = (f"SELECT r.name, r.version, r.description, r.grp FROM recipes r JOIN "
+               f"(SELECT name FROM trigrams WHERE gram IN ({marks}) GROUP BY name HAVING COUNT(*) >= ?) t "
+               f"ON r.name = t.name")
+        params = grams + [min_hits]
+        if group:
+            sql += " WHERE r.grp = ?"
+            params.append(group)
+        return self.conn.execute(sql, params).fetchall()
+
+    def group(self, group_name):
+        self.refresh()
+        return [row[0] for row in
+                self.conn.execute("SELECT name FROM recipes WHERE grp = ? ORDER BY name", (group_name,))]
+
+    def as_db(self):
+        """
+        Retorna o catálogo inteiro como dicionário {nome: receita},
+        no formato esperado por DependencyResolver, Installer etc.
+        """
+        self.refresh()
+        return {name: json.loads(data) for name, data in
+                self.conn.execute("SELECT name, data FROM recipes")}
+
+
+def find_recipe(name, recipes_dir=None, catalog_path=None, config_path=None):
+    """
+    Procura uma receita pelo nome usando o catálogo compilado.
+    Caminhos não informados vêm da seção directories do config.
+    """
+    if recipes_dir is None or catalog_path is None:
+        from components import load_config, paths
+        found = paths(load_config(config_path))
+        recipes_dir = recipes_dir or found['recipes_dir']
+        catalog_path = catalog_path or found['catalog_path']
+    catalog = RecipeCatalog(recipes_dir, catalog_path)
+    try:
+        return catalog.get(name)
+    finally:
+        catalog.close()
@@ -0,0 +1,114 @@
+import os
+import json
+import hashlib
+from cache import file_sha256
+from fetch import recipe_source
+
+
+class Checkpoints:
+    """
+    Stamps de fases concluídas num diretório de trabalho persistente.
+    Cada stamp guarda o hash das entradas da fase (encadeado com o da
+    fase anterior); se as entradas mudarem, a fase e as seguintes são refeitas.
+    """
+
+    PHASES = ['extract', 'patch', 'configure', 'compile', 'install']
+    STAGE_PHASES = ['configure', 'compile', 'install']
+    STAMPS = {
+        'extract': 'extracted',
+        'patch': 'patched',
+        'configure': 'configured',
+        'compile': 'compiled',
+        'install': 'installed',
+    }
+
+    def __init__(self, work_dir, stage=None):
+        """
+        stage: stamps de um stage da receita (só configure, compile e install)
+        """
+        self.stamp_dir = os.path.join(work_dir, '.pm-stamps')
+        self.prefix = f"{stage}." if stage else ''
+        self.phases = self.STAGE_PHASES if stage else self.PHASES
+        os.makedirs(self.stamp_dir, exist_ok=True)
+
+    def _stamp(self, phase):
+        return os.path.join(self.stamp_dir, self.prefix + self.STAMPS[phase])
+
+    def done(self, phase, key):
+        """
+        Verifica se a fase já foi concluída com as mesmas entradas.
+        """
+        try:
+            with open(self._stamp(phase), 'r') as f:
+                return f.read().strip() == key
+        except FileNotFoundError:
+            return False
+
+    def mark(self, phase, key):
+        with open(self._stamp(phase), 'w') as f:
+            f.write(key + "\n")
+
+    def invalidate_from(self, phase):
+        """
+        Remove o stamp da fase e de todas as fases seguintes.
+        """
+        for later in self.phases[self.phases.index(phase):]:
+            try:
+                os.remove(self._stamp(later))
+            except FileNotFoundError:
+                pass
+
+    def first_pending(self, keys):
+        """
+        Retorna a primeira fase sem stamp válido (ou None se todas estiverem concluídas).
+        """
+        for phase in self.phases:
+            if not self.done(phase, keys[phase]):
+                return phase
+        return None
+
+
+def phase_keys(recipe, tarball, install_dest, use_flags=None):
+    """
+    Calcula as chaves encadeadas de cada fase a partir das entradas que a afetam.
+    """
+    patches = []
+    for patch in recipe.get('patches', []):
+        patch_file = patch['file']
+        patches.append([patch_file, patch.get('strip', 1),
+                        file_sha256(patch_file) if os.path.isfile(patch_file) else None])
+
+    tarball_hash = recipe_source(recipe)[1]
+    if not tarball_hash and tarball and os.path.isfile(tarball):
+        tarball_hash = file_sha256(tarball)
+
+    inputs = {
+        'extract': [recipe.get('name'), recipe.get('version'), tarball, tarball_hash],
+        'patch': patches,
+        'configure': [recipe.get('config_cmd'), recipe.get('stages'), sorted(use_flags or [])],
+        'compile': [recipe.get('build_cmd')],
+        'install': [recipe.get('install_cmd'), install_dest],
+    }
+    return _chain('', Checkpoints.PHASES, inputs)
+
+
+def stage_keys(stage, previous, install_dest, use_flags=None):
+    """
+    Chaves das fases de um stage, encadeadas com previous (chave do patch
+    e as dos stages de que ele depende).
+    """
+    inputs = {
+        'configure': [stage.get('config_cmd'), stage.get('build_dir'), sorted(use_flags or [])],
+        'compile': [stage.get('build_cmd')],
+        'install': [stage.get('install_cmd'), install_dest],
+    }
+    return _chain(previous, Checkpoints.STAGE_PHASES, inputs)
+
+
+def _chain(previous, phases, inputs):
+    keys = {}
+    for phase in phases:
+        digest = hashlib.sha256(previous.encode())
+        digest.update(json.dumps(inputs[phase], sort_keys=True, default=str).encode())
+        previous = keys[phase] = digest.hexdigest()
+    return keys
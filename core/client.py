@@ -0,0 +1,47 @@
+import os
+import json
+import socket
+
+DEFAULT_SOCKET = "/opt/pm/run/pm.sock"
+
+
+class DaemonError(Exception):
+    """
+    O `pm daemon` recebeu o comando mas não conseguiu executá-lo.
+    """
+
+
+def socket_path():
+    """
+    Socket do daemon: $PM_SOCKET ou o caminho padrão.
+    """
+    return os.environ.get('PM_SOCKET', DEFAULT_SOCKET)
+
+
+def request(cmd, path=None, timeout=None, **args):
+    """
+    Envia um comando ao `pm daemon` e retorna a resposta
+    ({'ok', 'result', 'output', 'elapsed_ms'}).
+    Retorna None se o daemon não estiver rodando.
+    Módulo propositalmente leve: é o único que o CLI importa quando há daemon.
+    """
+    path = path or socket_path()
+    if not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        sock.close()
+        return None
+    with sock, sock.makefile('rwb') as stream:
+        stream.write(json.dumps({'cmd': cmd, 'args': args}).encode() + b"\n")
+        stream.flush()
+        line = stream.readline()
+    if not line:
+        raise DaemonError(f"Conexão com o daemon encerrada sem resposta ({cmd})")
+    response = json.loads(line)
+    if not response.get('ok'):
+        raise DaemonError(response.get('error') or f"Falha ao executar {cmd} no daemon")
+    return response
@@ -0,0 +1,148 @@
+import os
+import json
+from logger import Logger
+from catalog import RecipeCatalog, DEFAULT_RECIPES_DIR
+
+# config.yaml ao lado do main.py (o mesmo padrão de `pm daemon -c`)
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.yaml")
+
+
+def config_path(path=None):
+    """
+    Caminho do config.yaml: path, $PM_CONFIG ou o padrão.
+    """
+    return path or os.environ.get('PM_CONFIG') or DEFAULT_CONFIG_PATH
+
+
+def _config_cache(path):
+    cache_dir = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'pm')
+    return os.path.join(cache_dir, "config" + path.replace(os.sep, '%') + ".json")
+
+
+def load_config(path=None):
+    """
+    Lê o config.yaml completo (vazio se não existir).
+    Como o catálogo de receitas, o resultado é guardado em JSON (em
+    ~/.cache/pm, pelo mtime e tamanho do arquivo): comandos leves como
+    pm search e pm dep não pagam pelo import e parse do PyYAML.
+    """
+    path = os.path.abspath(config_path(path))
+    try:
+        st = os.stat(path)
+    except OSError:
+        return {}
+    key = [st.st_mtime_ns, st.st_size]
+    cache = _config_cache(path)
+    try:
+        with open(cache, 'r') as f:
+            cached = json.load(f)
+        if cached.get('key') == key:
+            return cached['config']
+    except (OSError, ValueError):
+        pass
+    import yaml
+    with open(path, 'r') as f:
+        config = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader)) or {}
+    try:
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        tmp = f"{cache}.{os.getpid()}"
+        with open(tmp, 'w') as f:
+            json.dump({'key': key, 'config': config}, f)
+        os.replace(tmp, cache)
+    except (OSError, TypeError, ValueError):
+        # Cache é só otimização (ex.: HOME sem escrita ou valores fora do JSON)
+        pass
+    return config
+
+
+def db_dir(config):
+    return (config.get('directories') or {}).get('db_dir', '/opt/pm/db')
+
+
+def paths(config):
+    """
+    Caminhos locais derivados da seção directories do config.
+    """
+    return {
+        'recipes_dir': (config.get('directories') or {}).get('recipes_dir', DEFAULT_RECIPES_DIR),
+        'catalog_path': os.path.join(db_dir(config), 'catalog.db'),
+        'manifest_path': os.path.join(db_dir(config), 'manifest.db'),
+        'world_path': os.path.join(db_dir(config), 'world'),
+    }
+
+
+def make_logger(config):
+    """
+    Logger a partir da seção logs do config.
+    """
+    logs = config.get('logs') or {}
+    return Logger((config.get('directories') or {}).get('logs_dir', '/opt/pm/logs'),
+                  level=logs.get('level', 'info'), fmt=logs.get('format', 'text'), color=logs.get('color', True),
+                  flush_interval=logs.get('flush_interval', 0.5), tail_lines=logs.get('tail_lines', 20))
+
+
+def open_catalog(config, logger: Logger = None):
+    found = paths(config)
+    return RecipeCatalog(found['recipes_dir'], found['catalog_path'], logger=logger)
+
+
+def load_db(config, logger: Logger = None):
+    """
+    Receitas do catálogo compilado {nome: receita}, atualizado a partir de recipes_dir.
+    """
+    catalog = open_catalog(config, logger)
+    try:
+        return catalog.as_db()
+    finally:
+        catalog.close()
+
+
+def installed_packages(config):
+    """
+    Pacotes instalados segundo o manifesto (sem criar o banco se não existir).
+    """
+    from search import installed_packages as installed
+    return installed(paths(config)['manifest_path'])
+
+
+def make_hooks(config, logger: Logger = None):
+    from hooks import Hooks
+    hooks_config = config.get('hooks') or {}
+    return Hooks(hooks_config, logger=logger, max_parallel=hooks_config.get('max_parallel'))
+
+
+def open_manifest(config, logger: Logger = None):
+    from manifest import ManifestDB
+    return ManifestDB(paths(config)['manifest_path'], logger=logger)
+
+
+def open_world(config, manifest=None):
+    """
+    World do db_dir; sem arquivo world, começa com os pacotes do manifesto.
+    """
+    from world import World
+    return World(paths(config)['world_path'], installed=manifest.packages() if manifest else None)
+
+
+def components(config, logger: Logger = None):
+    """
+    Componentes de instalação/remoção montados a partir do config
+    (argumentos nomeados do Installer), usados pelo daemon e pelo CLI.
+    """
+    from cache import BuildCache
+    from fetch import Fetcher
+    from stats import BuildStats
+    from sandbox import sandbox_config
+    manifest = open_manifest(config, logger)
+    return {
+        'logger': logger,
+        'hooks': make_hooks(config, logger),
+        'cache': BuildCache.from_config(config.get('cache'), logger=logger),
+        'fetcher': Fetcher.from_config(config, logger=logger),
+        'manifest': manifest,
+        'world': open_world(config, manifest),
+        'stats': BuildStats(os.path.join(db_dir(config), 'stats.db')),
+        'sandbox_config': sandbox_config(config),
+        'pipeline_config': config.get('pipeline'),
+        'build_config': config.get('build'),
+    }
@@ -0,0 +1,312 @@
+import os
+import json
+import time
+import threading
+import socketserver
+from logger import Logger
+from catalog import RecipeCatalog, DEFAULT_RECIPES_DIR
+from dependency import DependencyResolver
+from manifest import ManifestDB
+from world import World
+from search import find, format_results
+from client import DEFAULT_SOCKET
+from components import load_config, make_logger, components
+
+
+class _State:
+    """
+    Índices em memória do daemon. Um novo _State é montado a cada recarga
+    e trocado de uma vez, então consultas nunca veem um estado pela metade.
+    """
+
+    def __init__(self, db, entries, installed, world):
+        self.db = db
+        self.entries = entries
+        self.installed = installed
+        self.world = world
+        self.resolver = DependencyResolver(db)
+        # Monta o grafo já na recarga, não na primeira consulta
+        self.resolver.graph()
+        self.groups = {}
+        for name, version, description, grp in entries:
+            if grp:
+                self.groups.setdefault(grp, []).append(name)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """
+    Uma requisição JSON por linha, uma resposta JSON por linha.
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                response = {'ok': False, 'error': "Requisição inválida"}
+            else:
+                response = self.server.pm_daemon.handle(request.get('cmd'), request.get('args') or {})
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+            self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class PMDaemon:
+    """
+    Processo residente (`pm daemon`): mantém em memória o catálogo de
+    receitas, os pacotes instalados e o grafo de dependências, observa
+    recipes_dir e os bancos locais e atende o CLI por um socket Unix.
+    Consultas (search, dep, revdep, groups, owns) são respondidas a partir
+    da memória; comandos que alteram o sistema (install, remove) são
+    executados um por vez.
+    """
+
+    QUERIES = ['ping', 'status', 'search', 'dep', 'revdep', 'groups', 'owns']
+    MUTATIONS = ['install', 'remove']
+
+    def __init__(self, config=None, socket_path=None, logger: Logger = None, poll_interval=None):
+        """
+        config: config.yaml completo (directories, daemon, cache, sandbox...)
+        socket_path: socket Unix (padrão: daemon.socket do config)
+        poll_interval: intervalo em segundos entre verificações de mudanças
+        """
+        self.config = config or {}
+        daemon_config = self.config.get('daemon') or {}
+        directories = self.config.get('directories') or {}
+        self.logger = logger
+        self.socket_path = socket_path or daemon_config.get('socket', DEFAULT_SOCKET)
+        self.poll_interval = poll_interval or daemon_config.get('poll_interval', 2)
+        self.recipes_dir = directories.get('recipes_dir', DEFAULT_RECIPES_DIR)
+        self.db_dir = directories.get('db_dir', '/opt/pm/db')
+        self.manifest_path = os.path.join(self.db_dir, 'manifest.db')
+        self.world_path = os.path.join(self.db_dir, 'world')
+        self.catalog = RecipeCatalog(self.recipes_dir, os.path.join(self.db_dir, 'catalog.db'), logger=logger)
+        self._mutate_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._signature = None
+        self.started = time.time()
+        self.reloads = 0
+        self.state = None
+        self.server = None
+        self.reload()
+
+    def _mtime(self, path):
+        try:
+            st = os.stat(path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def signature(self):
+        """
+        Resumo barato do que está em disco: stats das receitas e dos bancos.
+        """
+        recipes = []
+        if os.path.isdir(self.recipes_dir):
+            for entry in os.scandir(self.recipes_dir):
+                if entry.is_file() and entry.name.endswith(('.yaml', '.yml')):
+                    st = entry.stat()
+                    recipes.append((entry.name, st.st_mtime_ns, st.st_size))
+        return (tuple(sorted(recipes)), self._mtime(self.manifest_path), self._mtime(self.world_path))
+
+    def reload(self):
+        """
+        Recarrega catálogo, pacotes instalados e grafo, e troca o estado.
+        """
+        with self._reload_lock:
+            signature = self.signature()
+            self.catalog.invalidate()
+            self.catalog.refresh()
+            db = self.catalog.as_db()
+            entries = [tuple(row) for row in self.catalog.entries()]
+            installed = set()
+            if os.path.exists(self.manifest_path):
+                manifest = ManifestDB(self.manifest_path)
+                try:
+                    installed = set(manifest.packages())
+                finally:
+                    manifest.close()
+            self.state = _State(db, entries, installed, set(World(self.world_path, installed=installed)))
+            self._signature = signature
+            self.reloads += 1
+        if self.logger:
+            self.logger.debug(f"Daemon: {len(db)} receita(s), {len(installed)} pacote(s) instalado(s) em memória")
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                if self.signature() != self._signature:
+                    self.reload()
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"Daemon: falha ao recarregar índices: {e}")
+
+    def handle(self, cmd, args):
+        """
+        Executa um comando e monta a resposta {'ok', 'result', 'output', 'elapsed_ms'}.
+        """
+        start = time.perf_counter()
+        handler = getattr(self, f"_cmd_{cmd}", None) if cmd in self.QUERIES + self.MUTATIONS else None
+        if handler is None:
+            return {'ok': False, 'error': f"Comando desconhecido: {cmd}"}
+        try:
+            if cmd in self.MUTATIONS:
+                # Alterações são serializadas e o estado é recarregado em seguida
+                with self._mutate_lock:
+                    try:
+                        result, output = handler(**args)
+                    finally:
+                        self.reload()
+            else:
+                result, output = handler(**args)
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"Daemon: {cmd} falhou: {e}")
+            return {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+        return {'ok': True, 'result': result, 'output': output,
+                'elapsed_ms': (time.perf_counter() - start) * 1000}
+
+    # ----------------- Consultas -----------------
+
+    def _cmd_ping(self):
+        return 'pong', None
+
+    def _cmd_status(self):
+        state = self.state
+        status = {
+            'pid': os.getpid(),
+            'uptime': time.time() - self.started,
+            'recipes': len(state.db),
+            'installed': len(state.installed),
+            'reloads': self.reloads,
+        }
+        output = "\n".join(f"{key}: {value}" for key, value in status.items())
+        return status, output
+
+    def _cmd_search(self, query='', group=None, names_only=False):
+        results = find(self.catalog, query, group)
+        names = [entry[0] for entry in results]
+        return names, "\n".join(names) if names_only else format_results(results, self.state.installed)
+
+    def _cmd_dep(self, packages):
+        order = self.state.resolver.resolve(packages)
+        return order, f"Ordem de build: {order}"
+
+    def _cmd_revdep(self, package):
+        dependents = self.state.resolver.revdep(package, self.state.installed)
+        return dependents, f"Pacotes que dependem de {package}: {dependents}"
+
+    def _cmd_groups(self, group=None):
+        groups = self.state.groups
+        if group:
+            packages = groups.get(group, [])
+            return packages, f"{group}: {' '.join(packages)}"
+        return groups, "\n".join(f"{name}: {' '.join(pkgs)}" for name, pkgs in sorted(groups.items()))
+
+    def _cmd_owns(self, path):
+        manifest = ManifestDB(self.manifest_path)
+        try:
+            owner = manifest.owner(path)
+        finally:
+            manifest.close()
+        if owner:
+            return owner, f"{path} pertence a {owner}"
+        return None, f"{path} não pertence a nenhum pacote"
+
+    # ----------------- Alterações -----------------
+
+    def _components(self):
+        """
+        Monta os componentes de instalação/remoção a partir do config.
+        """
+        return components(self.config, self.logger)
+
+    def _cmd_install(self, package, jobs=None, binary=False, group=False, pretend=False):
+        from install import Installer
+        db = dict(self.state.db)
+        components = self._components()
+        if binary:
+            from binpkg import BinaryRepo
+            components['binrepo'] = BinaryRepo.from_config(self.config.get('binary'), logger=self.logger)
+        installer = Installer(db, **components)
+        if binary:
+            built = installer.install_binary(package)
+        elif group:
+            built = installer.install_group(package, jobs=jobs, pretend=pretend)
+        else:
+            recipe = db.get(package)
+            if recipe is None:
+                raise KeyError(f"Receita de {package} não encontrada")
+            built = installer.install_package(recipe, jobs=jobs, pretend=pretend)
+        if pretend:
+            return built, installer.describe_plan(built)
+        return built, f"Pacotes instalados: {built}"
+
+    def _cmd_remove(self, package, orphans=False):
+        from remove import Remover
+        components = self._components()
+        remover = Remover(dict(self.state.db), logger=self.logger, hooks=components['hooks'],
+                          world=components['world'], manifest=components['manifest'],
+                          installed=self.state.installed)
+        removed = remover.remove_package(package)
+        output = f"{package} removido" if removed else f"{package} não removido (ainda é requerido)"
+        if orphans:
+            removed_orphans = remover.remove_orphans()
+            output += f"\nÓrfãos removidos: {removed_orphans}"
+        return removed, output
+
+    # ----------------- Servidor -----------------
+
+    def serve_forever(self):
+        """
+        Abre o socket e atende clientes até receber SIGINT/SIGTERM.
+        """
+        os.makedirs(os.path.dirname(self.socket_path) or '.', exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self.server = _Server(self.socket_path, _Handler)
+        self.server.pm_daemon = self
+        os.chmod(self.socket_path, 0o660)
+        watcher = threading.Thread(target=self._watch, name="pm-daemon-watch", daemon=True)
+        watcher.start()
+        if self.logger:
+            self.logger.info(f"pm daemon ouvindo em {self.socket_path}")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        self._stop.set()
+        if self.server:
+            self.server.server_close()
+            self.server = None
+            try:
+                os.remove(self.socket_path)
+            except FileNotFoundError:
+                pass
+        self.catalog.close()
+
+
+def run(config_path=None, socket_path=None, logger: Logger = None):
+    """
+    Inicia o daemon (comando `pm daemon`).
+    """
+    import signal
+    config = load_config(config_path)
+    if logger is None:
+        logger = make_logger(config)
+    daemon = PMDaemon(config, socket_path=socket_path, logger=logger)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -1,4 +1,5 @@
-from collections import deque
+from graph import DependencyGraph, CycleError
+from solver import Solver, dependency_names, effective_flags
 
 class DependencyResolver:
     """
@@ -6,75 +7,181 @@ class DependencyResolver:
     suporte a revdep, grupos e flags USE.
     """
 
-    def __init__(self, db):
+    def __init__(self, db, installed=None):
         """
         db: dicionário simulando o banco de dados de pacotes
         Exemplo:
         db = {
-            'gcc': {'dependencies': ['mpfr', 'gmp'], 'use': [], 'group': 'base'},
-            'vim': {'dependencies': ['ncurses'], 'use': ['python'], 'group': 'editor'},
+            'gcc': {'dependencias_build': ['mpfr>=4.1', 'gmp'], 'dependencias_runtime': ['libc'],
+                    'flags_USE': ['+lto', 'nls'], 'group': 'base'},
+            'vim': {'dependencies': ['ncurses', 'python? python>=3'], 'flags_USE': ['python'], 'group': 'editor'},
             ...
         }
+        installed: {pacote: versão instalada}, preferida pelo Solver quando compatível
         """
         self.db = db
+        self._reverse = None
+        self._graphs = {}
+        self.solver = Solver(db, installed)
+
+    def _dependencies(self, data, enabled=()):
+        """
+        Dependências (build e runtime) de uma receita com as flags efetivas.
+        """
+        return dependency_names(data, effective_flags(data, enabled), self.db)
+
+    def graph(self, enabled_use_flags=None):
+        """
+        Retorna o DependencyGraph do db para um conjunto de flags USE.
+        Construído uma vez por conjunto de flags e reaproveitado entre resoluções.
+        Só estrutura: restrições de versão e alternativas ficam com o Solver.
+        """
+        key = frozenset(enabled_use_flags or ())
+        graph = self._graphs.get(key)
+        if graph is None:
+            graph = DependencyGraph()
+            for pkg, data in self.db.items():
+                graph.set_dependencies(pkg, self._dependencies(data, key))
+            self._graphs[key] = graph
+        return graph
+
+    def _reverse_index(self):
+        """
+        Índice inverso {dependência: {pacotes que dependem dela}}.
+        Construído uma vez e mantido por add_package/remove_package.
+        """
+        if self._reverse is None:
+            reverse = {}
+            for pkg, data in self.db.items():
+                for dep in self._dependencies(data):
+                    reverse.setdefault(dep, set()).add(pkg)
+            self._reverse = reverse
+        return self._reverse
+
+    def _unindex(self, pkg, data):
+        if self._reverse is None:
+            return
+        for dep in self._dependencies(data):
+            dependents = self._reverse.get(dep)
+            if dependents:
+                dependents.discard(pkg)
+                if not dependents:
+                    del self._reverse[dep]
+
+    def add_package(self, name, data):
+        """
+        Adiciona (ou substitui) um pacote no db, atualizando o índice inverso.
+        """
+        old = self.db.get(name)
+        if old is not None:
+            self._unindex(name, old)
+        self.db[name] = data
+        self._graphs.clear()
+        self.solver.clear()
+        if self._reverse is not None:
+            for dep in self._dependencies(data):
+                self._reverse.setdefault(dep, set()).add(name)
+
+    def remove_package(self, name):
+        """
+        Remove um pacote do db, atualizando o índice inverso.
+        """
+        data = self.db.pop(name, None)
+        if data is not None:
+            self._unindex(name, data)
+            self._graphs.clear()
+            self.solver.clear()
+        return data
 
     def resolve(self, packages):
         """
         Retorna uma lista de pacotes ordenados topologicamente para instalação.
+        Levanta CycleError se houver ciclo de dependências.
         """
-        resolved = []
-        visited = set()
+        return self.graph().order(packages)
 
-        def visit(pkg):
-            if pkg in visited:
-                return
-            for dep in self.db.get(pkg, {}).get('dependencies', []):
-                visit(dep)
-            resolved.append(pkg)
-            visited.add(pkg)
+    def revdep(self, package, installed=None):
+        """
+        Retorna uma lista de pacotes que dependem do pacote fornecido.
+        installed: se dado, só os dependentes instalados contam
+        """
+        dependents = self._reverse_index().get(package, ())
+        if installed is not None:
+            dependents = [pkg for pkg in dependents if pkg in installed]
+        return sorted(dependents)
 
-        for p in packages:
-            visit(p)
-        return resolved
+    def reachable(self, roots):
+        """
+        Retorna o conjunto de pacotes alcançáveis a partir de roots
+        seguindo as dependências (fase "mark" do mark-and-sweep).
+        """
+        graph = self.graph()
+        marked = set()
+        for pkg in roots:
+            if pkg in self.db and pkg not in marked:
+                marked |= graph.closure(pkg)
+        return {pkg for pkg in marked if pkg in self.db}
 
-    def revdep(self, package):
+    def orphans(self, world, installed=None):
         """
-        Retorna uma lista de pacotes que dependem do pacote fornecido.
+        Retorna os pacotes que não são alcançáveis a partir do conjunto
+        "world" (pacotes pedidos explicitamente pelo usuário), em ordem
+        segura de remoção: dependentes antes das suas dependências.
+        installed: se dado, só pacotes instalados podem ser órfãos
         """
-        reverse = []
-        for pkg, data in self.db.items():
-            if package in data.get('dependencies', []):
-                reverse.append(pkg)
-        return reverse
+        marked = self.reachable(world)
+        unmarked = [pkg for pkg in self.db if pkg not in marked and (installed is None or pkg in installed)]
+        unmarked_set = set(unmarked)
+        try:
+            order = [pkg for pkg in self.resolve(unmarked) if pkg in unmarked_set]
+        except CycleError:
+            # Órfãos em ciclo: não há ordem segura, mantém a ordem do db
+            return unmarked
+        return list(reversed(order))
+
+    def solve(self, packages, enabled_use_flags=None):
+        """
+        Solução completa (versões, flags e arestas de build/runtime por
+        pacote). Levanta ResolutionError explicando conflitos.
+        """
+        return self.solver.solve(packages, enabled_use_flags)
 
     def resolve_with_use(self, packages, enabled_use_flags):
         """
-        Resolve dependências considerando flags USE habilitadas.
-        """
-        resolved = []
-        visited = set()
-
-        def visit(pkg):
-            if pkg in visited:
-                return
-            pkg_data = self.db.get(pkg, {})
-            # Adiciona dependências de USE habilitadas
-            for use_flag in pkg_data.get('use', []):
-                if use_flag in enabled_use_flags:
-                    dep_pkg = use_flag  # Assumindo que o nome do pacote é igual à flag
-                    visit(dep_pkg)
-            # Adiciona dependências normais
-            for dep in pkg_data.get('dependencies', []):
-                visit(dep)
-            resolved.append(pkg)
-            visited.add(pkg)
-
-        for p in packages:
-            visit(p)
-        return resolved
+        Resolve dependências considerando flags USE habilitadas
+        (dependências condicionais das receitas e restrições de versão).
+        """
+        return list(self.solve(packages, enabled_use_flags).order)
+
+    def build_graph(self, packages, enabled_use_flags=None):
+        """
+        Retorna o grafo de dependências dos pacotes resolvidos:
+        {pacote: [dependências]} na ordem topológica de resolve_with_use.
+        """
+        return self.solve(packages, enabled_use_flags).graph
 
     def packages_in_group(self, group_name):
         """
         Retorna todos os pacotes pertencentes a um grupo específico.
         """
         return [pkg for pkg, data in self.db.items() if data.get('group') == group_name]
+
+
+def topological_sort(packages, db=None, config_path=None):
+    """
+    Ordem de build topológica (comando `pm dep`).
+    Sem db, usa o catálogo compilado de receitas do config.
+    """
+    if db is None:
+        from components import load_config, load_db
+        db = load_db(load_config(config_path))
+    return DependencyResolver(db).resolve(packages)
+
+
+def revdep(package, config_path=None):
+    """
+    Pacotes instalados que dependem de package (comando `pm revdep`).
+    """
+    from components import load_config, load_db, installed_packages
+    config = load_config(config_path)
+    return DependencyResolver(load_db(config)).revdep(package, installed_packages(config))
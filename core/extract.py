@@ -0,0 +1,218 @@
+import os
+import bz2
+import gzip
+import lzma
+import shutil
+import tarfile
+import threading
+import subprocess
+from logger import Logger
+from cache import EXTRACT_KWARGS
+
+CHUNK_SIZE = 1024 * 1024
+
+MAGIC = [
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x1f\x8b', 'gz'),
+    (b'BZh', 'bz2'),
+    (b'\x28\xb5\x2f\xfd', 'zst'),
+]
+
+# Descompressores externos multi-thread, em ordem de preferência
+THREADED_TOOLS = {
+    'xz': [['xz', '-dc', '-T0']],
+    'gz': [['pigz', '-dc']],
+    'bz2': [['lbzip2', '-dc'], ['pbzip2', '-dc']],
+    'zst': [['zstd', '-dc', '-T0'], ['zstd', '-dc']],
+}
+
+# Descompressores em Python (fallback, uma thread)
+PYTHON_DECOMPRESSORS = {
+    'xz': lzma.open,
+    'gz': gzip.open,
+    'bz2': bz2.open,
+}
+
+
+class UnsafeArchiveError(ValueError):
+    """
+    Membro do arquivo tentaria escrever fora do diretório de destino.
+    """
+
+
+def detect_compression(head):
+    """
+    Detecta a compressão pelos primeiros bytes ('xz', 'gz', 'bz2', 'zst' ou None).
+    """
+    for magic, name in MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+class _CountingReader:
+    """
+    Envolve um arquivo e conta os bytes lidos (progresso).
+    """
+
+    def __init__(self, fileobj, on_read=None):
+        self.fileobj = fileobj
+        self.on_read = on_read
+        self.count = 0
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.count += len(data)
+        if self.on_read:
+            self.on_read(self.count)
+        return data
+
+
+class _PrefixedReader:
+    """
+    Devolve primeiro os bytes já lidos para detecção e depois o resto do fluxo.
+    """
+
+    def __init__(self, prefix, fileobj):
+        self.prefix = prefix
+        self.fileobj = fileobj
+
+    def read(self, size=-1):
+        if self.prefix:
+            if size is None or size < 0:
+                data, self.prefix = self.prefix + self.fileobj.read(), b''
+                return data
+            data, self.prefix = self.prefix[:size], self.prefix[size:]
+            if len(data) < size:
+                data += self.fileobj.read(size - len(data))
+            return data
+        return self.fileobj.read(size)
+
+
+class Extractor:
+    """
+    Extrai tarballs dentro do processo: detecta a compressão, usa
+    descompressores multi-thread quando disponíveis (xz -T0, pigz,
+    lbzip2/pbzip2, zstd -T0), lê o tar em fluxo, informa bytes e entradas
+    processados e recusa membros com path traversal.
+    """
+
+    def __init__(self, logger: Logger = None, threaded=True, progress=None):
+        """
+        threaded: usa descompressores externos multi-thread se existirem
+        progress: função progress(bytes, entradas) chamada durante a extração
+        """
+        self.logger = logger
+        self.threaded = threaded
+        self.progress = progress
+
+    def _tool(self, compression):
+        if not self.threaded:
+            return None
+        for cmd in THREADED_TOOLS.get(compression, []):
+            if shutil.which(cmd[0]):
+                return cmd
+        return None
+
+    def extract(self, source, dest):
+        """
+        Extrai source (caminho ou objeto de arquivo, ex.: fluxo de download) em dest.
+        Retorna {'entries', 'bytes', 'compression', 'decompressor'}.
+        """
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as f:
+                return self.extract_fileobj(f, dest, path=os.fspath(source))
+        return self.extract_fileobj(source, dest)
+
+    def extract_fileobj(self, fileobj, dest, path=None):
+        head = fileobj.read(6)
+        compression = detect_compression(head)
+        stream = _PrefixedReader(head, fileobj)
+        tool = self._tool(compression)
+
+        if tool:
+            return self._extract_with_tool(tool, stream, dest, compression, path)
+        if compression is None:
+            return self._extract_tar(stream, dest, compression, 'tar')
+        if compression in PYTHON_DECOMPRESSORS:
+            with PYTHON_DECOMPRESSORS[compression](stream, 'rb') as decompressed:
+                return self._extract_tar(decompressed, dest, compression, f"python:{compression}")
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("Arquivo zstd: instale o utilitário zstd ou o módulo Python zstandard")
+        with zstandard.ZstdDecompressor().stream_reader(stream) as decompressed:
+            return self._extract_tar(decompressed, dest, compression, "python:zstd")
+
+    def _extract_with_tool(self, tool, stream, dest, compression, path):
+        """
+        Descomprime com um processo externo e lê o tar da saída dele.
+        """
+        feeder = None
+        if path:
+            proc = subprocess.Popen(tool + [path], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        else:
+            proc = subprocess.Popen(tool, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+            def feed():
+                try:
+                    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                        proc.stdin.write(chunk)
+                except BrokenPipeError:
+                    pass
+                finally:
+                    proc.stdin.close()
+
+            feeder = threading.Thread(target=feed, daemon=True)
+            feeder.start()
+
+        try:
+            result = self._extract_tar(proc.stdout, dest, compression, tool[0])
+        finally:
+            proc.stdout.close()
+            stderr = proc.stderr.read().decode(errors='replace')
+            proc.stderr.close()
+            returncode = proc.wait()
+            if feeder:
+                feeder.join()
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, tool, stderr=stderr)
+        return result
+
+    def _check_member(self, member, dest):
+        """
+        Recusa caminhos absolutos, '..' e links que apontam para fora de dest.
+        """
+        name = member.name
+        target = os.path.realpath(os.path.join(dest, name))
+        if os.path.isabs(name) or os.path.commonpath([dest, target]) != dest:
+            raise UnsafeArchiveError(f"Membro fora do diretório de destino: {name}")
+        if member.issym():
+            link = os.path.normpath(os.path.join(os.path.dirname(target), member.linkname))
+            if os.path.isabs(member.linkname) or os.path.commonpath([dest, link]) != dest:
+                raise UnsafeArchiveError(f"Link simbólico para fora do destino: {name} -> {member.linkname}")
+        elif member.islnk():
+            link = os.path.realpath(os.path.join(dest, member.linkname))
+            if os.path.commonpath([dest, link]) != dest:
+                raise UnsafeArchiveError(f"Hard link para fora do destino: {name} -> {member.linkname}")
+
+    def _extract_tar(self, fileobj, dest, compression, decompressor):
+        dest = os.path.realpath(dest)
+        os.makedirs(dest, exist_ok=True)
+        counter = _CountingReader(fileobj)
+        entries = 0
+        with tarfile.open(fileobj=counter, mode='r|') as tar:
+            for member in tar:
+                if member.isdev():
+                    continue
+                self._check_member(member, dest)
+                tar.extract(member, dest, **EXTRACT_KWARGS)
+                entries += 1
+                if self.progress:
+                    self.progress(counter.count, entries)
+
+        if self.logger:
+            self.logger.info(f"{entries} entradas extraídas ({counter.count / (1024 * 1024):.1f} MB, "
+                             f"{compression or 'sem compressão'} via {decompressor})")
+        return {'entries': entries, 'bytes': counter.count,
+                'compression': compression, 'decompressor': decompressor}
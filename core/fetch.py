@@ -0,0 +1,199 @@
+import os
+import re
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from logger import Logger
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class ChecksumError(Exception):
+    """
+    sha256 do arquivo baixado não confere com o da receita.
+    """
+
+
+def recipe_source(recipe):
+    """
+    Retorna (url, sha256 esperado) do tarball de uma receita.
+    sha256 é None quando a receita não traz um hash válido.
+    """
+    url = (recipe.get('urls') or {}).get('tarball') or recipe.get('tarball')
+    if not url or not urlsplit(url).scheme:
+        url = None
+    sha = str(recipe.get('sha256') or '').lower()
+    return url, sha if re.fullmatch(r'[0-9a-f]{64}', sha) else None
+
+
+class Fetcher:
+    """
+    Baixa fontes para o diretório distfiles compartilhado.
+    Downloads rodam em paralelo, retomam arquivos parciais (HTTP Range)
+    e o sha256 é calculado enquanto os bytes chegam. Arquivos são
+    guardados por hash em distfiles/by-hash, então tarballs idênticos
+    existem uma única vez.
+    """
+
+    def __init__(self, distfiles_dir, logger: Logger = None, verify_sha256=True, max_workers=4, timeout=30):
+        self.distfiles_dir = distfiles_dir
+        self.by_hash_dir = os.path.join(distfiles_dir, 'by-hash')
+        self.logger = logger
+        self.verify_sha256 = verify_sha256
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._session = None
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(self.by_hash_dir, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config, logger: Logger = None):
+        """
+        Cria o Fetcher a partir do config.yaml completo.
+        """
+        packages_dir = config.get('directories', {}).get('packages_dir', '/opt/pm/packages')
+        fetch_config = config.get('fetch', {})
+        return cls(os.path.join(packages_dir, 'distfiles'), logger=logger,
+                   verify_sha256=config.get('security', {}).get('verify_sha256', True),
+                   max_workers=fetch_config.get('max_parallel', 4),
+                   timeout=fetch_config.get('timeout', 30))
+
+    @property
+    def session(self):
+        """
+        Sessão HTTP, criada (e o requests importado) no primeiro download.
+        """
+        with self._locks_guard:
+            if self._session is None:
+                import requests
+                self._session = requests.Session()
+            return self._session
+
+    def _lock_for(self, key):
+        with self._locks_guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def _link(self, blob, filename):
+        """
+        Cria distfiles/<arquivo> apontando para o blob por hash.
+        """
+        path = os.path.join(self.distfiles_dir, filename)
+        if os.path.lexists(path):
+            if os.path.exists(path) and os.path.samefile(path, blob):
+                return path
+            os.remove(path)
+        try:
+            os.link(blob, path)
+        except OSError:
+            os.symlink(os.path.relpath(blob, self.distfiles_dir), path)
+        return path
+
+    def _hash_file(self, path, digest):
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest
+
+    def _download(self, url, part):
+        """
+        Baixa url para part, retomando se part já existir.
+        Retorna o sha256 do arquivo completo.
+        """
+        digest = hashlib.sha256()
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = {'Range': f"bytes={offset}-"} if offset else {}
+
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as resp:
+            if offset and resp.status_code == 416:
+                # O parcial já contém o arquivo inteiro
+                return self._hash_file(part, digest).hexdigest()
+            if offset and resp.status_code == 206:
+                if self.logger:
+                    self.logger.info(f"Retomando download de {url} a partir de {offset} bytes")
+                self._hash_file(part, digest)
+                mode = 'ab'
+            else:
+                resp.raise_for_status()
+                mode = 'wb'
+            with open(part, mode) as f:
+                for chunk in resp.iter_content(CHUNK_SIZE):
+                    digest.update(chunk)
+                    f.write(chunk)
+        return digest.hexdigest()
+
+    def local_path(self, recipe):
+        """
+        Caminho do tarball em distfiles, se já tiver sido baixado.
+        """
+        url, _ = recipe_source(recipe)
+        if not url:
+            return None
+        path = os.path.join(self.distfiles_dir, os.path.basename(urlsplit(url).path) or recipe['name'])
+        return path if os.path.exists(path) else None
+
+    def fetch(self, recipe):
+        """
+        Garante que o tarball da receita está em distfiles e retorna o caminho.
+        Retorna None se a receita não tiver URL de tarball.
+        Sem sha256 válido na receita, levanta ChecksumError se a verificação
+        estiver habilitada; senão avisa e reaproveita o distfile já baixado.
+        """
+        url, expected = recipe_source(recipe)
+        if not url:
+            return None
+        filename = os.path.basename(urlsplit(url).path) or recipe['name']
+
+        if not expected:
+            if self.verify_sha256:
+                raise ChecksumError(f"Receita de {recipe['name']} sem sha256 válido para {filename} "
+                                    f"(security.verify_sha256 está habilitado)")
+            if self.logger:
+                self.logger.warning(f"Receita de {recipe['name']} sem sha256: {filename} não será verificado")
+
+        with self._lock_for(expected or url), self._lock_for('file:' + filename):
+            if expected:
+                blob = os.path.join(self.by_hash_dir, expected)
+                if os.path.exists(blob):
+                    return self._link(blob, filename)
+            else:
+                # Nada com que comparar: o distfile completo já baixado serve
+                path = os.path.join(self.distfiles_dir, filename)
+                if os.path.exists(path):
+                    return path
+
+            part = os.path.join(self.distfiles_dir, filename + '.part')
+            if self.logger:
+                self.logger.info(f"Baixando {url}")
+            actual = self._download(url, part)
+
+            if expected and actual != expected:
+                if self.verify_sha256:
+                    os.remove(part)
+                    raise ChecksumError(f"sha256 de {filename} não confere: esperado {expected}, obtido {actual}")
+                if self.logger:
+                    self.logger.warning(f"sha256 de {filename} não confere (verificação desabilitada)")
+
+            blob = os.path.join(self.by_hash_dir, actual)
+            if os.path.exists(blob):
+                os.remove(part)
+            else:
+                os.replace(part, blob)
+            return self._link(blob, filename)
+
+    def fetch_all(self, recipes):
+        """
+        Baixa em paralelo os fontes de várias receitas.
+        Retorna {nome: caminho}. Levanta o primeiro erro encontrado.
+        """
+        recipes = [r for r in recipes if recipe_source(r)[0]]
+        if not recipes:
+            return {}
+        workers = max(1, min(self.max_workers, len(recipes)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {r['name']: pool.submit(self.fetch, r) for r in recipes}
+            return {name: future.result() for name, future in futures.items()}
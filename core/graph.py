@@ -0,0 +1,143 @@
+from array import array
+
+
+class CycleError(ValueError):
+    """
+    Ciclo de dependências. cycle contém o ciclo completo,
+    ex.: ['a', 'b', 'c', 'a'].
+    """
+
+    def __init__(self, cycle):
+        super().__init__("Ciclo de dependências: " + " -> ".join(cycle))
+        self.cycle = cycle
+
+
+class DependencyGraph:
+    """
+    Grafo de dependências compacto: nomes de pacotes são internados em
+    ids inteiros e as arestas ficam em arrays de inteiros por nó.
+    Ordenação iterativa (sem recursão), com detecção de ciclos e cache
+    da ordem/fecho transitivo de cada raiz.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._names = []
+        self._edges = []
+        self._order_cache = {}
+        self._closure_cache = {}
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def intern(self, name):
+        """
+        Retorna o id inteiro de um pacote, criando o nó se necessário.
+        """
+        node = self._ids.get(name)
+        if node is None:
+            node = len(self._names)
+            self._ids[name] = node
+            self._names.append(name)
+            self._edges.append(array('I'))
+        return node
+
+    def set_dependencies(self, name, deps):
+        """
+        Define as dependências diretas de um pacote (ordem preservada).
+        """
+        ids = self._ids
+        node = self.intern(name)
+        edges = array('I')
+        for dep in deps:
+            dep_id = ids.get(dep)
+            if dep_id is None:
+                dep_id = self.intern(dep)
+            if dep_id != node and dep_id not in edges:
+                edges.append(dep_id)
+        self._edges[node] = edges
+        if self._order_cache or self._closure_cache:
+            self._order_cache.clear()
+            self._closure_cache.clear()
+
+    def dependencies(self, name):
+        node = self._ids.get(name)
+        if node is None:
+            return []
+        return [self._names[dep] for dep in self._edges[node]]
+
+    def _postorder(self, root):
+        """
+        DFS iterativa a partir de root; retorna os ids em pós-ordem
+        (dependências antes dos dependentes). Levanta CycleError.
+        """
+        cached = self._order_cache.get(root)
+        if cached is not None:
+            return cached
+
+        order = []
+        state = {root: 1}  # 1 = em visita, 2 = concluído
+        stack = [(root, iter(self._edges[root]))]
+        while stack:
+            node, deps = stack[-1]
+            for dep in deps:
+                dep_state = state.get(dep)
+                if dep_state == 2:
+                    continue
+                if dep_state == 1:
+                    path = [n for n, _ in stack]
+                    cycle = path[path.index(dep):] + [dep]
+                    raise CycleError([self._names[n] for n in cycle])
+                sub_order = self._order_cache.get(dep)
+                if sub_order is not None:
+                    # Reaproveita a ordem já calculada da sub-árvore
+                    for sub in sub_order:
+                        if sub not in state:
+                            state[sub] = 2
+                            order.append(sub)
+                    continue
+                state[dep] = 1
+                stack.append((dep, iter(self._edges[dep])))
+                break
+            else:
+                stack.pop()
+                state[node] = 2
+                order.append(node)
+
+        order = tuple(order)
+        self._order_cache[root] = order
+        return order
+
+    def order(self, roots):
+        """
+        Ordem topológica (dependências primeiro) do fecho de roots.
+        """
+        resolved = []
+        seen = set()
+        for name in roots:
+            for node in self._postorder(self.intern(name)):
+                if node not in seen:
+                    seen.add(node)
+                    resolved.append(self._names[node])
+        return resolved
+
+    def closure(self, name):
+        """
+        Fecho transitivo (o próprio pacote e tudo que ele requer), com cache.
+        """
+        node = self.intern(name)
+        cached = self._closure_cache.get(node)
+        if cached is None:
+            marked = {node}
+            stack = [node]
+            while stack:
+                for dep in self._edges[stack.pop()]:
+                    if dep not in marked:
+                        marked.add(dep)
+                        stack.append(dep)
+            cached = frozenset(marked)
+            self._closure_cache[node] = cached
+        return {self._names[n] for n in cached}
@@ -2,34 +2,33 @@ from dependency import DependencyResolver
 from install import Installer
 from remove import Remover
 from logger import Logger
+from hooks import transaction
 
 class GroupManager:
     """
     Gerencia grupos de pacotes no PM.
     """
 
-    def __init__(self, db, logger: Logger = None, hooks=None, install_root="/usr/local"):
+    def __init__(self, db, logger: Logger = None, hooks=None, install_root="/usr/local", manifest=None):
+        """
+        manifest: ManifestDB usado para pular pacotes já instalados e remover arquivos
+        """
         self.db = db
         self.logger = logger
         self.hooks = hooks
         self.dep_resolver = DependencyResolver(db)
-        self.installer = Installer(db, logger=logger, hooks=hooks)
-        self.remover = Remover(db, logger=logger, hooks=hooks, install_root=install_root)
+        self.installer = Installer(db, logger=logger, hooks=hooks, manifest=manifest)
+        self.remover = Remover(db, logger=logger, hooks=hooks, install_root=install_root, manifest=manifest)
 
-    def install_group(self, group_name, use_flags=None, fakeroot=False, destdir=None):
+    def install_group(self, group_name, use_flags=None, fakeroot=False, destdir=None, jobs=None, force=False,
+                      pretend=False):
         """
-        Instala todos os pacotes de um grupo.
+        Instala todos os pacotes de um grupo (um único plano, ver Installer.install_group).
         """
-        group_packages = self.dep_resolver.packages_in_group(group_name)
         if self.logger:
-            self.logger.info(f"Iniciando instalação do grupo '{group_name}' com pacotes: {group_packages}")
-        for pkg_name in group_packages:
-            pkg_recipe = self.db.get(pkg_name)
-            if pkg_recipe:
-                self.installer.install_package(pkg_recipe, use_flags=use_flags, fakeroot=fakeroot, destdir=destdir)
-            else:
-                if self.logger:
-                    self.logger.warning(f"Receita de {pkg_name} não encontrada, pulando.")
+            self.logger.info(f"Iniciando instalação do grupo '{group_name}'")
+        return self.installer.install_group(group_name, use_flags=use_flags, fakeroot=fakeroot, destdir=destdir,
+                                            jobs=jobs, force=force, pretend=pretend)
 
     def remove_group(self, group_name):
         """
@@ -38,11 +37,36 @@ class GroupManager:
         group_packages = self.dep_resolver.packages_in_group(group_name)
         if self.logger:
             self.logger.info(f"Iniciando remoção do grupo '{group_name}' com pacotes: {group_packages}")
-        for pkg_name in group_packages:
-            self.remover.remove_package(pkg_name)
+        with transaction(self.hooks):
+            for pkg_name in group_packages:
+                self.remover.remove_package(pkg_name)
 
     def list_group(self, group_name):
         """
         Retorna a lista de pacotes pertencentes a um grupo.
         """
         return self.dep_resolver.packages_in_group(group_name)
+
+
+def show(group=None, config_path=None):
+    """
+    Exibe os pacotes por grupo (comando `pm groups`), a partir do catálogo.
+    Retorna {grupo: [pacotes]} (com group, só a lista daquele grupo).
+    """
+    from components import load_config, open_catalog
+    catalog = open_catalog(load_config(config_path))
+    try:
+        entries = catalog.entries()
+    finally:
+        catalog.close()
+    groups = {}
+    for name, version, description, grp in entries:
+        if grp:
+            groups.setdefault(grp, []).append(name)
+    if group:
+        packages = groups.get(group, [])
+        print(f"{group}: {' '.join(packages)}")
+        return packages
+    for name, packages in sorted(groups.items()):
+        print(f"{name}: {' '.join(packages)}")
+    return groups
@@ -1,34 +1,174 @@
+import os
+import threading
 import subprocess
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
 from logger import Logger
 
 class Hooks:
     """
     Gerencia a execução de hooks pre e post para download, build, install e remove.
+
+    Um hook pode ser um comando simples (executado para cada pacote) ou um
+    trigger de transação, deduplicado e executado uma única vez ao final da
+    transação (ex.: ldconfig, regeneração de caches de fontes/ícones):
+
+        post_install:
+          - "echo {program} instalado"
+          - name: ldconfig
+            cmd: "ldconfig"
+            transaction: true
+          - name: icons
+            cmd: "gtk-update-icon-cache -q /usr/share/icons/hicolor"
+            transaction: true
+            after: [ldconfig]
+
+    {program} é o pacote que disparou o hook; em triggers, {programs} é a
+    lista de todos os pacotes da transação que o dispararam. Triggers sem
+    'after' entre si rodam em paralelo.
     """
 
-    def __init__(self, hooks_config, logger: Logger = None):
+    def __init__(self, hooks_config, logger: Logger = None, max_parallel=None):
         """
         hooks_config: dicionário com chaves:
             pre_download, post_download,
             pre_build, post_build,
             pre_install, post_install,
             pre_remove, post_remove
+        max_parallel: número máximo de triggers executados ao mesmo tempo
         """
         self.hooks = hooks_config or {}
         self.logger = logger
+        self.max_parallel = max_parallel or os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._pending = {}
+
+    @staticmethod
+    def _normalize(entry):
+        if isinstance(entry, str):
+            return {'cmd': entry, 'transaction': False}
+        hook = dict(entry)
+        hook.setdefault('transaction', False)
+        hook['after'] = list(hook.get('after') or [])
+        return hook
+
+    def _execute(self, cmd, description):
+        try:
+            if self.logger:
+                self.logger.info(f"Executando hook {description}: {cmd}")
+            subprocess.run(cmd, shell=True, check=True)
+        except subprocess.CalledProcessError as e:
+            if self.logger:
+                self.logger.error(f"Hook {description} falhou: {e}")
+            raise
 
     def run(self, hook_type: str, program_name: str):
         """
         Executa os comandos de hook para o tipo especificado.
+        Triggers de transação são apenas enfileirados se houver uma transação aberta.
+        """
+        for entry in self.hooks.get(hook_type, []):
+            hook = self._normalize(entry)
+            if hook['transaction']:
+                self.trigger(hook_type, hook, program_name)
+                continue
+            full_cmd = hook['cmd'].replace("{program}", program_name)
+            self._execute(full_cmd, f"{hook_type} para {program_name}")
+
+    def trigger(self, hook_type, hook, program_name):
+        """
+        Registra um trigger de transação; fora de uma transação executa na hora.
+        """
+        # Deduplicado pelo nome (ou comando): ldconfig roda uma vez mesmo se
+        # disparado por post_install e post_remove na mesma transação
+        key = hook.get('name') or hook['cmd']
+        with self._lock:
+            if self._depth:
+                pending = self._pending.setdefault(key, {'hook': hook, 'type': hook_type, 'programs': []})
+                if program_name not in pending['programs']:
+                    pending['programs'].append(program_name)
+                return
+        self._run_triggers({key: {'hook': hook, 'type': hook_type, 'programs': [program_name]}})
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Agrupa operações (instalações, remoções) para que os triggers
+        disparados durante elas rodem uma única vez ao final.
+        Transações aninhadas são absorvidas pela mais externa.
+        """
+        with self._lock:
+            self._depth += 1
+        failed = False
+        try:
+            yield self
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self._depth -= 1
+                pending = self._pending if self._depth == 0 else {}
+                if self._depth == 0:
+                    self._pending = {}
+            # Mesmo se a transação falhou, os pacotes já instalados precisam dos triggers
+            if pending:
+                try:
+                    self._run_triggers(pending)
+                except subprocess.CalledProcessError:
+                    if not failed:
+                        raise
+
+    def _run_triggers(self, pending):
+        """
+        Executa triggers em ondas: cada onda roda em paralelo os triggers
+        cujas dependências ('after') já terminaram.
         """
-        commands = self.hooks.get(hook_type, [])
-        for cmd in commands:
-            full_cmd = cmd.replace("{program}", program_name)
-            try:
-                if self.logger:
-                    self.logger.info(f"Executando hook {hook_type} para {program_name}: {full_cmd}")
-                subprocess.run(full_cmd, shell=True, check=True)
-            except subprocess.CalledProcessError as e:
-                if self.logger:
-                    self.logger.error(f"Hook {hook_type} falhou para {program_name}: {e}")
-                raise
+        remaining = dict(pending)
+        finished = set()
+        errors = []
+
+        def run_one(key):
+            item = pending[key]
+            programs = item['programs']
+            cmd = item['hook']['cmd'].replace("{programs}", " ".join(programs))
+            cmd = cmd.replace("{program}", programs[-1])
+            self._execute(cmd, f"{item['type']} (trigger, {len(programs)} pacote(s))")
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+            while remaining:
+                ready = [key for key, item in remaining.items()
+                         if all(dep in finished or dep not in pending for dep in item['hook']['after'])]
+                if not ready:
+                    # Dependência circular entre triggers: roda o restante em sequência
+                    ready = list(remaining)[:1]
+                futures = {key: executor.submit(run_one, key) for key in ready}
+                for key, future in futures.items():
+                    try:
+                        future.result()
+                    except subprocess.CalledProcessError as e:
+                        errors.append(e)
+                    finished.add(key)
+                    del remaining[key]
+        if errors:
+            raise errors[0]
+
+
+def transaction(hooks):
+    """
+    Transação de hooks, ou um contexto vazio se não houver hooks configurados.
+    """
+    return hooks.transaction() if hooks else contextlib.nullcontext()
+
+
+def run_hook(hook_type, program_name='', config_path=None):
+    """
+    Executa os hooks de um tipo (comando `pm hooks`), com os triggers
+    de transação rodando uma única vez ao final.
+    """
+    from components import load_config, make_logger, make_hooks
+    config = load_config(config_path)
+    hooks = make_hooks(config, make_logger(config))
+    with hooks.transaction():
+        hooks.run(hook_type, program_name)
@@ -1,58 +1,299 @@
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from build import Builder
-from hooks import Hooks
+from hooks import Hooks, transaction
 from logger import Logger
 from dependency import DependencyResolver
+from scheduler import PipelineScheduler, BuildFailed
+from jobserver import JobServer
 
 class Installer:
     """
     Gerencia a instalação de pacotes no PM.
     """
 
-    def __init__(self, db, logger: Logger = None, hooks: Hooks = None):
+    def __init__(self, db, logger: Logger = None, hooks: Hooks = None, cache=None, world=None, fetcher=None,
+                 manifest=None, stats=None, sandbox_config=None, pipeline_config=None, binrepo=None,
+                 build_config=None):
         """
         db: banco de dados de pacotes (pode ser dict ou interface de DB real)
+        cache: BuildCache opcional para reaproveitar builds idênticos
+        world: World onde os pacotes pedidos explicitamente são registrados
+        fetcher: Fetcher para baixar os fontes antes do build
+        manifest: ManifestDB onde os arquivos instalados são registrados
+        stats: BuildStats onde o tempo e o uso de recursos de cada build são registrados
+        sandbox_config: configuração do Sandbox (ex.: 'work_dir' para builds retomáveis)
+        pipeline_config: limites do pipeline de instalação ('fetch_ahead', 'prepare_ahead')
+        binrepo: BinaryRepo para exportar builds e instalar pacotes binários
+        build_config: seção build do config ('jobs_default', 'jobserver', 'max_load', 'min_free_mb')
         """
         self.db = db
         self.logger = logger
         self.hooks = hooks
+        self.cache = cache
+        self.world = world
+        self.fetcher = fetcher
+        self.manifest = manifest
+        self.stats = stats
+        self.sandbox_config = sandbox_config
+        self.pipeline_config = pipeline_config or {}
+        self.binrepo = binrepo
+        self.build_config = build_config or {}
         self.dep_resolver = DependencyResolver(db)
 
-    def install_package(self, recipe, use_flags=None, fakeroot=False, destdir=None):
+    def plan(self, packages, use_flags=None, force=False, reinstall=()):
+        """
+        Plano único de instalação para vários pacotes: a união das
+        dependências de todos, em ordem topológica, cada pacote uma vez.
+        Pacotes já instalados na versão da receita ficam de fora, a não ser
+        com force ou se estiverem em reinstall.
+        Retorna {pacote: [dependências que também estão no plano]}.
+        """
+        graph = self.dep_resolver.build_graph(packages, use_flags or [])
+        reinstall = set(reinstall)
+        if self.manifest and not force:
+            for pkg in list(graph):
+                recipe = self.db.get(pkg)
+                if pkg in reinstall or not recipe or recipe.get('version') is None:
+                    continue
+                if self.manifest.version(pkg) == str(recipe['version']):
+                    del graph[pkg]
+        return {pkg: [dep for dep in deps if dep in graph] for pkg, deps in graph.items()}
+
+    def describe_plan(self, packages):
+        """
+        Texto do plano para --pretend: um pacote por linha, na ordem de
+        instalação, com a versão da receita e a instalada, e o total.
+        """
+        lines = []
+        for i, pkg in enumerate(packages, 1):
+            version = (self.db.get(pkg) or {}).get('version', '-')
+            installed = self.manifest.version(pkg) if self.manifest else None
+            action = f"{installed} -> {version}" if installed else f"{version} (novo)"
+            lines.append(f"[{i:>4}] {pkg:<24} {action}")
+        lines.append(f"Total: {len(packages)} pacote(s) a construir")
+        return "\n".join(lines)
+
+    def install_package(self, recipe, use_flags=None, fakeroot=False, destdir=None, jobs=None, clean=False,
+                        pretend=False):
         """
         Instala um pacote único, resolvendo dependências.
+        Dependências já instaladas na versão da receita não são reconstruídas.
+        pretend: só monta o plano, sem construir nada
+        Retorna a lista de pacotes construídos (com pretend, os que seriam).
         """
-        use_flags = use_flags or []
-        # Resolve dependências topológicas
-        all_packages = self.dep_resolver.resolve_with_use([recipe['name']], use_flags)
+        graph = self.plan([recipe['name']], use_flags, reinstall=[recipe['name']])
         if self.logger:
-            self.logger.info(f"Pacotes a instalar (resolução de dependências): {all_packages}")
+            self.logger.info(f"Pacotes a instalar (resolução de dependências): {list(graph)}")
+        if pretend:
+            return list(graph)
+        built = self.run_plan(graph, use_flags=use_flags, fakeroot=fakeroot, destdir=destdir, jobs=jobs, clean=clean)
+        if self.world is not None:
+            self.world.add(recipe['name'])
+        return built
+
+    def run_plan(self, graph, use_flags=None, fakeroot=False, destdir=None, jobs=None, clean=False):
+        """
+        Constrói e instala um plano (ver plan) em uma única transação.
+        A instalação roda em pipeline: enquanto um pacote compila, os fontes
+        dos seguintes já são baixados e extraídos. Pacotes independentes
+        entre si são construídos em paralelo, dividindo o orçamento de jobs.
+        jobs: total de jobs de compilação (padrão: build.jobs_default, ou um
+        por CPU); com
+        o jobserver ligado, vale para todos os builds juntos, qualquer que
+        seja o -j das receitas
+        clean: descarta o progresso salvo de builds anteriores
+        Retorna a lista de pacotes construídos.
+        """
+        use_flags = use_flags or []
+        jobs = jobs or self.build_config.get('jobs_default') or os.cpu_count() or 1
+        builders = {}
+        jobserver = None
+        if self.build_config.get('jobserver', True):
+            jobserver = JobServer(jobs, max_load=self.build_config.get('max_load'),
+                                  min_free_mb=self.build_config.get('min_free_mb'), logger=self.logger)
+
+        def fetch_one(pkg_name):
+            pkg_recipe = self.db.get(pkg_name)
+            if not pkg_recipe or not self.fetcher:
+                return None
+            # Build já no cache não precisa dos fontes
+            if self.cache and not clean and self.cache.contains(self.cache.key(pkg_recipe, 'install', use_flags)):
+                return None
+            return self.fetcher.fetch(pkg_recipe)
 
-        # Instala pacote por pacote
-        for pkg_name in all_packages:
+        def prepare_one(pkg_name, tarball):
             pkg_recipe = self.db.get(pkg_name)
             if not pkg_recipe:
                 if self.logger:
                     self.logger.warning(f"Receita de {pkg_name} não encontrada, pulando.")
-                continue
+                return
+            builder = Builder(recipe=pkg_recipe, logger=self.logger, hooks=self.hooks, cache=self.cache,
+                              fetcher=self.fetcher, manifest=self.manifest, stats=self.stats,
+                              sandbox_config=self.sandbox_config, binrepo=self.binrepo, jobserver=jobserver)
+            builder.prepare(stage='install', destdir=destdir, use_flags=use_flags, clean=clean, tarball=tarball)
+            builders[pkg_name] = builder
+
+        def build_one(pkg_name, pkg_jobs):
+            if pkg_name in builders:
+                builders[pkg_name].compile(jobs=pkg_jobs, use_fakeroot=fakeroot)
+
+        def install_one(pkg_name):
+            builder = builders.pop(pkg_name, None)
+            if builder:
+                builder.finish()
+                if self.logger:
+                    self.logger.info(f"{pkg_name} instalado com sucesso.")
 
-            builder = Builder(recipe=pkg_recipe, logger=self.logger, hooks=self.hooks)
-            builder.build(stage='install', use_fakeroot=fakeroot, destdir=destdir)
+        def abort_one(pkg_name):
+            builder = builders.pop(pkg_name, None)
+            if builder:
+                builder.abort()
+
+        scheduler = PipelineScheduler(graph, jobs=jobs, logger=self.logger,
+                                      fetch_workers=self.fetcher.max_workers if self.fetcher else 1,
+                                      fetch_ahead=self.pipeline_config.get('fetch_ahead', 4),
+                                      prepare_ahead=self.pipeline_config.get('prepare_ahead', 2))
+        try:
+            # Triggers (ex.: ldconfig) rodam uma vez ao final, não por pacote
+            with transaction(self.hooks):
+                built = scheduler.run(fetch_one, prepare_one, build_one, install_one, abort_one)
+        except BuildFailed as e:
             if self.logger:
-                self.logger.info(f"{pkg_name} instalado com sucesso.")
+                self.logger.error(f"Instalação interrompida em {e.package}. Pacotes construídos: {e.built}")
+            raise
+        finally:
+            if jobserver:
+                jobserver.close()
+        if self.logger:
+            self.logger.info(f"Pacotes construídos: {built}")
+        return built
 
-    def install_group(self, group_name, use_flags=None, fakeroot=False, destdir=None):
+    def install_binary(self, package, destdir=None, force=False):
         """
-        Instala todos os pacotes de um grupo.
+        Instala um pacote e suas dependências a partir do repositório
+        binário, sem compilar. O sha256 de cada pacote e de cada arquivo é
+        verificado; os próximos pacotes são descompactados em paralelo
+        enquanto o atual é copiado para o sistema.
+        force: reinstala pacotes já instalados na mesma versão
+        Retorna a lista de pacotes instalados.
         """
-        group_packages = self.dep_resolver.packages_in_group(group_name)
+        resolver = DependencyResolver(self.binrepo.packages())
+        order = resolver.resolve([package])
+        if self.manifest:
+            # Já instalados ficam de fora antes de exigir o pacote do repositório
+            # (ex.: uma libc do sistema que o repositório não traz)
+            def needed(pkg):
+                entry = self.binrepo.get(pkg)
+                installed = self.manifest.version(pkg)
+                if entry is None:
+                    return installed is None
+                return force or installed != entry['version']
+
+            order = [pkg for pkg in order if needed(pkg)]
+        missing = [pkg for pkg in order if self.binrepo.get(pkg) is None]
+        if missing:
+            raise KeyError(f"Pacotes binários ausentes no repositório: {missing}")
         if self.logger:
-            self.logger.info(f"Instalando grupo '{group_name}' com pacotes: {group_packages}")
+            self.logger.info(f"Pacotes binários a instalar: {order}")
 
-        for pkg_name in group_packages:
-            pkg_recipe = self.db.get(pkg_name)
-            if not pkg_recipe:
-                if self.logger:
-                    self.logger.warning(f"Receita de {pkg_name} não encontrada, pulando.")
-                continue
+        root = destdir or '/'
+        staging_root = tempfile.mkdtemp(prefix="pm_binpkg_", dir=(self.sandbox_config or {}).get('sandbox_dir'))
+        ahead = self.pipeline_config.get('prepare_ahead', 2)
+        installed = []
+        try:
+            with transaction(self.hooks), ThreadPoolExecutor(max_workers=ahead) as pool:
+                pending = deque()
+                todo = deque(order)
+                while todo or pending:
+                    # Descompacta até 'prepare_ahead' pacotes à frente da instalação
+                    while todo and len(pending) < ahead:
+                        pkg = todo.popleft()
+                        staging = os.path.join(staging_root, pkg)
+                        pending.append((pkg, staging, pool.submit(self.binrepo.unpack, pkg, staging)))
+                    pkg, staging, future = pending.popleft()
+                    info = future.result()
+                    if self.hooks:
+                        self.hooks.run("pre_install", pkg)
+                    if self.manifest:
+                        self.manifest.install(pkg, staging, root=root, version=info['version'])
+                    else:
+                        shutil.copytree(staging, root, symlinks=True, dirs_exist_ok=True)
+                    shutil.rmtree(staging, ignore_errors=True)
+                    if self.hooks:
+                        self.hooks.run("post_install", pkg)
+                    installed.append(pkg)
+                    if self.logger:
+                        self.logger.info(f"{pkg} {info['version'] or ''} instalado do repositório binário.")
+        finally:
+            shutil.rmtree(staging_root, ignore_errors=True)
+
+        if self.world is not None:
+            self.world.add(package)
+        return installed
 
-            self.install_package(pkg_recipe, use_flags=use_flags, fakeroot=fakeroot, destdir=destdir)
+    def install_group(self, group_name, use_flags=None, fakeroot=False, destdir=None, jobs=None, clean=False,
+                      force=False, pretend=False):
+        """
+        Instala todos os pacotes de um grupo com um único plano: dependências
+        comuns a vários membros são construídas uma só vez e pacotes já
+        instalados na versão da receita são pulados (a não ser com force).
+        pretend: só monta o plano, sem construir nada
+        Retorna a lista de pacotes construídos (com pretend, os que seriam).
+        """
+        group_packages = [pkg for pkg in self.dep_resolver.packages_in_group(group_name) if self.db.get(pkg)]
+        graph = self.plan(group_packages, use_flags, force=force)
+        if self.logger:
+            self.logger.info(f"Instalando grupo '{group_name}': {len(group_packages)} pacote(s) no grupo, "
+                             f"{len(graph)} a construir")
+        if pretend:
+            return list(graph)
+        built = self.run_plan(graph, use_flags=use_flags, fakeroot=fakeroot, destdir=destdir, jobs=jobs, clean=clean)
+        if self.world is not None:
+            for pkg in group_packages:
+                self.world.add(pkg)
+        return built
+
+
+def install(package, build_only=False, jobs=None, binary=False, group=False, pretend=False, config_path=None):
+    """
+    Comando `pm install` sem o daemon: monta o Installer a partir do config.
+    build_only: só compila (como `pm build`), sem instalar
+    binary: instala do repositório binário, sem compilar
+    group: package é um grupo, instalado com um único plano
+    pretend: só mostra o plano de instalação
+    Retorna a lista de pacotes instalados (com pretend, os que seriam).
+    """
+    if build_only:
+        from build import build
+        return build(package, jobs=jobs, config_path=config_path)
+    from components import load_config, make_logger, load_db, components
+    config = load_config(config_path)
+    logger = make_logger(config)
+    db = load_db(config, logger)
+    installer_components = components(config, logger)
+    if binary:
+        from binpkg import BinaryRepo
+        installer_components['binrepo'] = BinaryRepo.from_config(config.get('binary'), logger=logger)
+    installer = Installer(db, **installer_components)
+    try:
+        if binary:
+            built = installer.install_binary(package)
+        elif group:
+            built = installer.install_group(package, jobs=jobs, pretend=pretend)
+        else:
+            recipe = db.get(package)
+            if recipe is None:
+                raise KeyError(f"Receita de {package} não encontrada")
+            built = installer.install_package(recipe, jobs=jobs, pretend=pretend)
+        if pretend:
+            print(installer.describe_plan(built))
+        else:
+            print(f"Pacotes instalados: {built}")
+    finally:
+        installer.manifest.close()
+        installer.stats.close()
+    return built
@@ -0,0 +1,157 @@
+import os
+import re
+import select
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from logger import Logger
+
+# -jN, -j N, -j$(nproc) e --jobs=N passados ao make na linha de comando
+_MAKE_JOBS = re.compile(r"(\bmake\b[^;&|]*?)\s+(?:-j\s*(?:\d+|\$\(nproc\)|`nproc`)?|--jobs(?:=\S+)?)(?=\s|$)")
+
+
+def available_memory_mb():
+    """
+    Memória disponível (MemAvailable) em MB, ou None fora do Linux.
+    """
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class JobServer:
+    """
+    Jobserver compatível com o GNU make, compartilhado por todos os builds
+    de uma instalação: um FIFO com uma ficha por job. Cada comando de build
+    segura uma ficha enquanto roda (o job implícito do make) e o make pega as
+    demais do FIFO, então o total de jobs de compilação fica em 'jobs' por
+    mais builds simultâneos que haja e qualquer que seja o -j das receitas.
+    Com max_load ou min_free_mb, fichas são retidas enquanto a carga média
+    estiver alta ou a memória disponível baixa (sempre sobra uma em uso).
+    """
+
+    def __init__(self, jobs, max_load=None, min_free_mb=None, interval=1.0, logger: Logger = None):
+        """
+        jobs: total de jobs de compilação (--jobs)
+        max_load: carga média (1 min) acima da qual novos jobs esperam
+        min_free_mb: memória disponível abaixo da qual novos jobs esperam
+        interval: segundos entre verificações de carga e memória
+        """
+        self.jobs = max(1, int(jobs or 1))
+        self.max_load = max_load or None
+        self.min_free_mb = min_free_mb or None
+        self.interval = interval
+        self.logger = logger
+        self.withheld = 0
+        self._dir = tempfile.mkdtemp(prefix="pm_jobserver_")
+        self.path = os.path.join(self._dir, 'fifo')
+        os.mkfifo(self.path, 0o600)
+        # Descrições separadas: a leitura do pm não bloqueia sem afetar a do make
+        self._read = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+        self._write = os.open(self.path, os.O_WRONLY)
+        child_read = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+        os.set_blocking(child_read, True)
+        self.fds = (child_read, self._write)
+        os.write(self._write, b'+' * self.jobs)
+        self._stop = threading.Event()
+        self._thread = None
+        if self.max_load or self.min_free_mb:
+            self._thread = threading.Thread(target=self._regulate, name="pm-jobserver", daemon=True)
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        for fd in (self._read, self._write, self.fds[0]):
+            os.close(fd)
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+    def acquire(self):
+        """
+        Pega uma ficha do FIFO, esperando até haver uma livre.
+        """
+        while True:
+            select.select([self._read], [], [], 0.5)
+            try:
+                token = os.read(self._read, 1)
+            except BlockingIOError:
+                continue
+            if token:
+                return token
+
+    def release(self, token=b'+'):
+        os.write(self._write, token)
+
+    @contextmanager
+    def slot(self):
+        """
+        Segura uma ficha enquanto um comando de build roda.
+        """
+        token = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(token)
+
+    def environ(self, env):
+        """
+        Ambiente com MAKEFLAGS apontando para o jobserver.
+        """
+        env = dict(env)
+        read_fd, write_fd = self.fds
+        env['MAKEFLAGS'] = f"-j{self.jobs} --jobserver-fds={read_fd},{write_fd} --jobserver-auth={read_fd},{write_fd}"
+        return env
+
+    def command(self, cmd):
+        """
+        Remove o -j das chamadas de make: com -j explícito o make ignora o
+        jobserver e cria o seu próprio.
+        """
+        previous = None
+        while previous != cmd:
+            previous, cmd = cmd, _MAKE_JOBS.sub(r"\1", cmd)
+        return cmd
+
+    def overloaded(self):
+        """
+        Verifica se a carga média ou a memória disponível passaram dos limites.
+        """
+        if self.max_load and os.getloadavg()[0] > self.max_load:
+            return True
+        if self.min_free_mb:
+            available = available_memory_mb()
+            if available is not None and available < self.min_free_mb:
+                return True
+        return False
+
+    def _regulate(self):
+        """
+        Retém uma ficha por verificação enquanto a máquina estiver
+        sobrecarregada e devolve uma por verificação quando normalizar.
+        """
+        while not self._stop.wait(self.interval):
+            if self.overloaded():
+                if self.withheld < self.jobs - 1:
+                    try:
+                        if os.read(self._read, 1):
+                            self.withheld += 1
+                            if self.logger:
+                                self.logger.debug(f"Jobserver: {self.withheld} job(s) retido(s) por carga/memória")
+                    except BlockingIOError:
+                        pass
+            elif self.withheld:
+                self.release()
+                self.withheld -= 1
@@ -1,28 +1,46 @@
 import os
+import json
+import queue
+import atexit
 import datetime
-from colorama import Fore, Style, init
-
-# Inicializa cores no terminal
-init(autoreset=True)
+import threading
 
 class Logger:
     """
     Gerencia logs do PM com cores, persistência em arquivos e integração com DB.
+    As mensagens vão para uma fila consumida por uma thread de escrita, que
+    mantém o arquivo aberto e grava em lotes; o chamador não bloqueia em I/O.
     """
 
     LEVELS = ['DEBUG', 'INFO', 'WARNING', 'ERROR']
     COLORS = {
-        'DEBUG': Fore.CYAN,
-        'INFO': Fore.GREEN,
-        'WARNING': Fore.YELLOW,
-        'ERROR': Fore.RED
+        'DEBUG': 'CYAN',
+        'INFO': 'GREEN',
+        'WARNING': 'YELLOW',
+        'ERROR': 'RED'
     }
 
-    def __init__(self, log_path, level='INFO'):
+    def __init__(self, log_path, level='INFO', fmt='text', color=True, flush_interval=0.5, tail_lines=20):
+        """
+        fmt: 'text' (pm.log) ou 'json' (pm.jsonl, um objeto JSON por linha)
+        flush_interval: intervalo máximo em segundos entre gravações em disco
+        tail_lines: linhas finais do log de build mostradas no terminal em caso de falha
+        """
         self.log_path = log_path
         self.level = level.upper()
+        self.fmt = fmt
+        self.color = color
+        self.flush_interval = flush_interval
+        self.tail_lines = tail_lines
         os.makedirs(log_path, exist_ok=True)
-        self.log_file = os.path.join(log_path, 'pm.log')
+        self.log_file = os.path.join(log_path, 'pm.jsonl' if fmt == 'json' else 'pm.log')
+        self.builds_dir = os.path.join(log_path, 'builds')
+
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="pm-logger", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
 
     def _should_log(self, level):
         """
@@ -30,24 +48,105 @@ class Logger:
         """
         return self.LEVELS.index(level) >= self.LEVELS.index(self.level)
 
-    def log(self, message, level='INFO'):
+    def _format(self, record):
+        if self.fmt == 'json':
+            return json.dumps(record, ensure_ascii=False)
+        return f"[{record['level']}] {record['time']} - {record['message']}"
+
+    def _write_loop(self):
+        """
+        Thread de escrita: agrupa as mensagens da fila e grava em lote
+        no arquivo (aberto uma única vez) e no terminal.
+        """
+        palette = reset = None
+        if self.color:
+            # colorama só é carregado quando há saída colorida
+            from colorama import Fore, Style, init
+            init(autoreset=True)
+            palette = {level: getattr(Fore, name) for level, name in self.COLORS.items()}
+            reset = Style.RESET_ALL
+
+        with open(self.log_file, 'a') as f:
+            while True:
+                try:
+                    batch = [self._queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    continue
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                stop = False
+                lines = []
+                console = []
+                for item in batch:
+                    if item is None:
+                        stop = True
+                        continue
+                    if isinstance(item, threading.Event):
+                        continue
+                    lines.append(self._format(item) + "\n")
+                    if palette:
+                        console.append(f"{palette.get(item['level'], '')}[{item['level']}] "
+                                       f"{item['time']} - {item['message']}{reset}")
+                    else:
+                        console.append(f"[{item['level']}] {item['time']} - {item['message']}")
+
+                if console:
+                    print("\n".join(console), flush=True)
+                f.writelines(lines)
+                f.flush()
+                for item in batch:
+                    if isinstance(item, threading.Event):
+                        item.set()
+                if stop:
+                    return
+
+    def log(self, message, level='INFO', **fields):
         """
         Registra uma mensagem de log.
+        fields: campos extras gravados no formato JSON (ex.: package='gcc')
         """
         level = level.upper()
-        if not self._should_log(level):
+        if not self._should_log(level) or self._closed:
             return
 
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        colored_msg = f"{self.COLORS.get(level, '')}[{level}] {timestamp} - {message}{Style.RESET_ALL}"
-        plain_msg = f"[{level}] {timestamp} - {message}"
+        record = {
+            'time': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'level': level,
+            'message': str(message),
+        }
+        record.update(fields)
+        self._queue.put(record)
 
-        # Exibe no terminal
-        print(colored_msg)
+    def flush(self, timeout=5):
+        """
+        Aguarda até que todas as mensagens enfileiradas tenham sido gravadas.
+        """
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
 
-        # Persiste no arquivo
-        with open(self.log_file, 'a') as f:
-            f.write(plain_msg + "\n")
+    def close(self):
+        """
+        Grava o que estiver pendente e encerra a thread de escrita.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout=5)
+
+    def build_log(self, package):
+        """
+        Caminho do log de build (stdout/stderr dos comandos) de um pacote.
+        """
+        os.makedirs(self.builds_dir, exist_ok=True)
+        return os.path.join(self.builds_dir, f"{package}.log")
 
     def debug(self, message):
         self.log(message, 'DEBUG')
@@ -0,0 +1,253 @@
+import os
+import stat
+import shutil
+import sqlite3
+import threading
+from cache import file_sha256
+from logger import Logger
+
+DEFAULT_MANIFEST_PATH = "/opt/pm/db/manifest.db"
+
+
+class FileConflictError(Exception):
+    """
+    Arquivos do pacote já pertencem a outros pacotes.
+    conflicts: {caminho: dono}
+    """
+
+    def __init__(self, package, conflicts):
+        listed = ", ".join(f"{path} ({owner})" for path, owner in sorted(conflicts.items())[:10])
+        super().__init__(f"{package} sobrescreveria arquivos de outros pacotes: {listed}")
+        self.package = package
+        self.conflicts = conflicts
+
+
+class ManifestDB:
+    """
+    Banco de manifestos (SQLite): quais arquivos cada pacote instalou,
+    com tamanho e sha256. Indexado por caminho (dono de um arquivo)
+    e por pacote (remoção). Guarda também os diretórios que a instalação
+    criou: só eles são removidos junto com o pacote.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            package TEXT NOT NULL,
+            type TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            sha256 TEXT
+        );
+        CREATE INDEX IF NOT EXISTS files_package ON files (package);
+        CREATE TABLE IF NOT EXISTS packages (
+            name TEXT PRIMARY KEY,
+            version TEXT,
+            root TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS dirs (
+            path TEXT NOT NULL,
+            package TEXT NOT NULL,
+            PRIMARY KEY (path, package)
+        );
+    """
+
+    def __init__(self, db_path=DEFAULT_MANIFEST_PATH, logger: Logger = None, max_workers=8):
+        self.db_path = db_path
+        self.logger = logger
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def scan(self, staging_dir, root='/'):
+        """
+        Lista os arquivos de um DESTDIR: [(caminho final, tipo, tamanho, sha256)].
+        Diretórios não entram no manifesto.
+        """
+        entries = []
+        for dirpath, dirnames, filenames in os.walk(staging_dir):
+            names = filenames + [d for d in dirnames if os.path.islink(os.path.join(dirpath, d))]
+            for name in names:
+                src = os.path.join(dirpath, name)
+                rel = os.path.relpath(src, staging_dir)
+                path = os.path.join(os.path.abspath(root), rel)
+                st = os.lstat(src)
+                if stat.S_ISLNK(st.st_mode):
+                    entries.append((path, 'link', 0, os.readlink(src)))
+                else:
+                    entries.append((path, 'file', st.st_size, file_sha256(src)))
+        return entries
+
+    def new_dirs(self, staging_dir, root='/'):
+        """
+        Diretórios do DESTDIR que ainda não existem em root, ou seja, os
+        que a instalação vai criar.
+        """
+        created = []
+        for dirpath, dirnames, filenames in os.walk(staging_dir):
+            for name in dirnames:
+                src = os.path.join(dirpath, name)
+                if os.path.islink(src):
+                    continue
+                path = os.path.join(os.path.abspath(root), os.path.relpath(src, staging_dir))
+                if not os.path.lexists(path):
+                    created.append(path)
+        return created
+
+    def dirs(self, package):
+        return [row[0] for row in
+                self.conn.execute("SELECT path FROM dirs WHERE package = ? ORDER BY path", (package,))]
+
+    def owner(self, path):
+        """
+        Retorna o pacote dono de um arquivo, ou None.
+        """
+        row = self.conn.execute("SELECT package FROM files WHERE path = ?",
+                                (os.path.abspath(path),)).fetchone()
+        return row[0] if row else None
+
+    def files(self, package):
+        return [row[0] for row in
+                self.conn.execute("SELECT path FROM files WHERE package = ? ORDER BY path", (package,))]
+
+    def packages(self):
+        return [row[0] for row in self.conn.execute("SELECT name FROM packages ORDER BY name")]
+
+    def version(self, package):
+        """
+        Versão instalada de um pacote, ou None se não estiver registrado.
+        """
+        row = self.conn.execute("SELECT version FROM packages WHERE name = ?", (package,)).fetchone()
+        return row[0] if row else None
+
+    def conflicts(self, package, entries):
+        """
+        Retorna {caminho: dono} dos arquivos que já pertencem a outro pacote.
+        """
+        found = {}
+        paths = [entry[0] for entry in entries]
+        for i in range(0, len(paths), 500):
+            batch = paths[i:i + 500]
+            marks = ",".join("?" * len(batch))
+            for path, owner in self.conn.execute(
+                    f"SELECT path, package FROM files WHERE path IN ({marks}) AND package != ?",
+                    batch + [package]):
+                found[path] = owner
+        return found
+
+    def record(self, package, entries, version=None, root='/', dirs=()):
+        """
+        Registra o manifesto de um pacote, substituindo o anterior.
+        dirs: diretórios criados por esta instalação (somados aos já registrados)
+        Retorna os caminhos da versão anterior que não existem mais na nova.
+        """
+        with self._lock, self.conn:
+            old = set(self.files(package))
+            self.conn.execute("DELETE FROM files WHERE package = ?", (package,))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO files (path, package, type, size, sha256) VALUES (?, ?, ?, ?, ?)",
+                [(path, package, kind, size, digest) for path, kind, size, digest in entries])
+            self.conn.executemany("INSERT OR IGNORE INTO dirs (path, package) VALUES (?, ?)",
+                                  [(path, package) for path in dirs])
+            self.conn.execute("INSERT OR REPLACE INTO packages (name, version, root) VALUES (?, ?, ?)",
+                              (package, None if version is None else str(version), os.path.abspath(root)))
+        return sorted(old - {entry[0] for entry in entries})
+
+    def install(self, package, staging_dir, root='/', version=None, force=False):
+        """
+        Verifica conflitos, copia o DESTDIR para root e registra o manifesto.
+        Arquivos que a versão anterior instalou e a nova não, são removidos.
+        """
+        entries = self.scan(staging_dir, root)
+        conflicts = self.conflicts(package, entries)
+        if conflicts and not force:
+            raise FileConflictError(package, conflicts)
+
+        created = self.new_dirs(staging_dir, root)
+        os.makedirs(root, exist_ok=True)
+        # copytree não sobrescreve links simbólicos (reinstalação)
+        for path, kind, size, digest in entries:
+            if kind == 'link' and os.path.islink(path):
+                os.unlink(path)
+        shutil.copytree(staging_dir, root, symlinks=True, dirs_exist_ok=True)
+        stale = self.record(package, entries, version=version, root=root, dirs=created)
+        if stale:
+            self.delete_paths(stale, root, self.dirs(package))
+        if self.logger:
+            self.logger.info(f"Manifesto de {package} registrado: {len(entries)} arquivo(s)")
+        return entries
+
+    def _unlink_batch(self, paths):
+        removed = 0
+        for path in paths:
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                if self.logger:
+                    self.logger.warning(f"Não foi possível remover {path}: {e}")
+        return removed
+
+    def delete_paths(self, paths, root='/', dirs=()):
+        """
+        Remove arquivos em lotes paralelos e depois, dos diretórios dirs
+        (os criados pelo pacote), os que ficaram vazios. Diretórios que já
+        existiam antes do pacote, ou fora de root, nunca são removidos.
+        """
+        # Importado aqui: consultas como `pm owns` e `pm search` não precisam de threads
+        from concurrent.futures import ThreadPoolExecutor
+        batches = [paths[i:i + 256] for i in range(0, len(paths), 256)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            removed = sum(pool.map(self._unlink_batch, batches))
+
+        root = os.path.abspath(root)
+        # Mais profundos primeiro: um diretório só esvazia depois dos filhos
+        for directory in sorted({os.path.abspath(d) for d in dirs}, key=len, reverse=True):
+            if directory == root or os.path.commonpath([root, directory]) != root:
+                continue
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
+        return removed
+
+    def remove(self, package):
+        """
+        Remove exatamente os arquivos registrados para o pacote.
+        Retorna o número de arquivos removidos, ou None se não houver manifesto.
+        """
+        row = self.conn.execute("SELECT root FROM packages WHERE name = ?", (package,)).fetchone()
+        if row is None:
+            return None
+        paths = self.files(package)
+        removed = self.delete_paths(paths, row[0], self.dirs(package))
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM files WHERE package = ?", (package,))
+            self.conn.execute("DELETE FROM dirs WHERE package = ?", (package,))
+            self.conn.execute("DELETE FROM packages WHERE name = ?", (package,))
+        if self.logger:
+            self.logger.info(f"{removed} arquivo(s) de {package} removido(s)")
+        return removed
+
+
+def owner_of(path, db_path=None, config_path=None):
+    """
+    Retorna o pacote dono de um arquivo (comando `pm owns`).
+    Sem db_path, usa o manifesto do db_dir do config.
+    """
+    if db_path is None:
+        from components import load_config, paths
+        db_path = paths(load_config(config_path))['manifest_path']
+    if not os.path.exists(db_path):
+        return None
+    manifest = ManifestDB(db_path)
+    try:
+        return manifest.owner(path)
+    finally:
+        manifest.close()
@@ -0,0 +1,92 @@
+import os
+import subprocess
+from logger import Logger
+
+
+class RecipeSync:
+    """
+    Sincroniza recipes_dir com o repositório remoto de receitas (seção
+    recipes do config.yaml). recipes_dir é um clone git do repositório;
+    o catálogo compilado percebe as receitas alteradas pelo mtime.
+    """
+
+    def __init__(self, recipes_dir, repo_url=None, sync_method='git', logger: Logger = None):
+        self.recipes_dir = recipes_dir
+        self.repo_url = repo_url
+        self.sync_method = sync_method
+        self.logger = logger
+
+    @classmethod
+    def from_config(cls, config, logger: Logger = None):
+        """
+        Cria o sincronizador a partir do config.yaml completo.
+        """
+        from components import paths
+        recipes = config.get('recipes') or {}
+        return cls(paths(config)['recipes_dir'], recipes.get('repo_url'), recipes.get('sync_method', 'git'),
+                   logger=logger)
+
+    def _git(self, *args):
+        result = subprocess.run(["git", "-C", self.recipes_dir] + list(args), capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"git {' '.join(args)} falhou: {result.stderr.strip()}")
+        return result.stdout
+
+    def _is_clone(self):
+        return os.path.isdir(os.path.join(self.recipes_dir, '.git'))
+
+    def sync_all(self):
+        """
+        Clona o repositório em recipes_dir (vazio ou inexistente) ou traz as
+        novidades com fast-forward.
+        """
+        if self.sync_method != 'git':
+            raise ValueError(f"Método de sincronização não suportado: {self.sync_method}")
+        if self._is_clone():
+            if self.logger:
+                self.logger.info(f"Atualizando receitas em {self.recipes_dir}")
+            self._git("pull", "--ff-only", "-q")
+            return
+        if not self.repo_url:
+            raise ValueError("recipes.repo_url não configurado")
+        if os.path.isdir(self.recipes_dir) and os.listdir(self.recipes_dir):
+            raise RuntimeError(f"{self.recipes_dir} não está vazio e não é um clone de {self.repo_url}")
+        os.makedirs(self.recipes_dir, exist_ok=True)
+        if self.logger:
+            self.logger.info(f"Clonando receitas de {self.repo_url} em {self.recipes_dir}")
+        self._git("clone", "-q", self.repo_url, ".")
+
+    def sync_recipe(self, name):
+        """
+        Atualiza só a receita de um pacote a partir do repositório remoto.
+        Retorna o caminho da receita no repositório, ou None se não existir lá.
+        """
+        if not self._is_clone():
+            self.sync_all()
+        self._git("fetch", "-q")
+        candidates = {f"{name}.yaml", f"{name}.yml"}
+        for path in self._git("ls-tree", "-r", "--name-only", "@{upstream}").splitlines():
+            if os.path.basename(path) in candidates:
+                self._git("checkout", "@{upstream}", "--", path)
+                if self.logger:
+                    self.logger.info(f"Receita {name} sincronizada ({path})")
+                return path
+        return None
+
+
+def sync_all(config_path=None):
+    """
+    Comando `pm sync-recipes`.
+    """
+    from components import load_config, make_logger
+    config = load_config(config_path)
+    RecipeSync.from_config(config, make_logger(config)).sync_all()
+
+
+def sync_recipe(name, config_path=None):
+    """
+    Comando `pm sync-recipe`. Retorna o caminho da receita, ou None.
+    """
+    from components import load_config, make_logger
+    config = load_config(config_path)
+    return RecipeSync.from_config(config, make_logger(config)).sync_recipe(name)
@@ -1,5 +1,5 @@
 from dependency import DependencyResolver
-from hooks import Hooks
+from hooks import Hooks, transaction
 from logger import Logger
 import shutil
 import os
@@ -9,46 +9,69 @@ class Remover:
     Gerencia a remoção de pacotes no PM.
     """
 
-    def __init__(self, db, logger: Logger = None, hooks: Hooks = None, install_root="/usr/local"):
+    def __init__(self, db, logger: Logger = None, hooks: Hooks = None, install_root="/usr/local", world=None,
+                 manifest=None, installed=None):
         """
         db: banco de dados de pacotes (dict ou interface real)
         install_root: diretório raiz de instalação dos pacotes
+        world: World com os pacotes pedidos explicitamente (usado para detectar órfãos)
+        manifest: ManifestDB com os arquivos instalados por pacote
+        installed: nomes dos pacotes instalados (padrão: os do manifesto); só
+                   eles bloqueiam remoções e podem ser removidos como órfãos
         """
         self.db = db
         self.logger = logger
         self.hooks = hooks
         self.dep_resolver = DependencyResolver(db)
         self.install_root = install_root
+        self.world = world
+        self.manifest = manifest
+        if installed is None and manifest is not None:
+            installed = manifest.packages()
+        self.installed = None if installed is None else set(installed)
 
     def remove_package(self, package_name):
         """
         Remove um pacote individual, verificando dependências invertidas (revdep).
         """
+        if self.installed is not None and package_name not in self.installed:
+            if self.logger:
+                self.logger.warning(f"{package_name} não está instalado.")
+            return False
+
         # Checa revdep
-        reverse_deps = self.dep_resolver.revdep(package_name)
+        reverse_deps = self.dep_resolver.revdep(package_name, self.installed)
         if reverse_deps:
             if self.logger:
                 self.logger.warning(f"Não é possível remover {package_name}, ainda é requerido por: {reverse_deps}")
-            return
+            return False
 
         # Pre-remove hook
         if self.hooks:
             self.hooks.run("pre_remove", package_name)
 
-        # Remove diretório do pacote (exemplo simplificado)
+        # Remove exatamente os arquivos do manifesto; sem manifesto,
+        # remove o diretório próprio do pacote (exemplo simplificado)
         pkg_path = os.path.join(self.install_root, package_name)
-        if os.path.exists(pkg_path):
+        if self.manifest and self.manifest.remove(package_name) is not None:
+            if self.logger:
+                self.logger.info(f"{package_name} removido do sistema.")
+        elif os.path.exists(pkg_path):
             shutil.rmtree(pkg_path)
             if self.logger:
                 self.logger.info(f"{package_name} removido do sistema.")
 
-        # Atualiza DB
-        if package_name in self.db:
-            del self.db[package_name]
+        # Atualiza DB (e o índice inverso do resolver)
+        self.dep_resolver.remove_package(package_name)
+        if self.installed is not None:
+            self.installed.discard(package_name)
+        if self.world is not None:
+            self.world.discard(package_name)
 
         # Post-remove hook
         if self.hooks:
             self.hooks.run("post_remove", package_name)
+        return True
 
     def remove_group(self, group_name):
         """
@@ -57,20 +80,54 @@ class Remover:
         group_packages = self.dep_resolver.packages_in_group(group_name)
         if self.logger:
             self.logger.info(f"Removendo grupo '{group_name}' com pacotes: {group_packages}")
-        for pkg in group_packages:
-            self.remove_package(pkg)
+        with transaction(self.hooks):
+            for pkg in group_packages:
+                self.remove_package(pkg)
 
-    def remove_orphans(self):
+    def remove_orphans(self, world=None):
         """
-        Remove pacotes órfãos que não são dependência de nenhum outro pacote.
+        Remove pacotes órfãos: os que não são alcançáveis a partir do
+        conjunto "world" (mark-and-sweep sobre o grafo de dependências).
         """
-        orphans = []
-        for pkg in list(self.db.keys()):
-            if not self.dep_resolver.revdep(pkg):
-                orphans.append(pkg)
+        world = world if world is not None else self.world
+        if world is None:
+            if self.logger:
+                self.logger.warning("Conjunto world não definido, detecção de órfãos ignorada.")
+            return []
+        if self.installed and not getattr(world, 'exists', lambda: True)():
+            # Sem arquivo world, tudo que está instalado pareceria órfão
+            if self.logger:
+                self.logger.warning("Arquivo world inexistente com pacotes instalados, detecção de órfãos ignorada.")
+            return []
 
+        orphans = self.dep_resolver.orphans(world, self.installed)
         if self.logger:
             self.logger.info(f"Pacotes órfãos detectados: {orphans}")
 
-        for orphan in orphans:
-            self.remove_package(orphan)
+        # Dependentes vêm antes das dependências, então revdep já está vazio
+        with transaction(self.hooks):
+            for orphan in orphans:
+                self.remove_package(orphan)
+        return orphans
+
+
+def remove(package, remove_orphans=False, config_path=None):
+    """
+    Comando `pm remove` sem o daemon: monta o Remover a partir do config.
+    remove_orphans: depois remove os pacotes fora do alcance do world
+    Retorna True se o pacote foi removido.
+    """
+    from components import load_config, make_logger, load_db, make_hooks, open_manifest, open_world
+    config = load_config(config_path)
+    logger = make_logger(config)
+    manifest = open_manifest(config, logger)
+    try:
+        remover = Remover(load_db(config, logger), logger=logger, hooks=make_hooks(config, logger),
+                          world=open_world(config, manifest), manifest=manifest)
+        removed = remover.remove_package(package)
+        print(f"{package} removido" if removed else f"{package} não removido (ainda é requerido)")
+        if remove_orphans:
+            print(f"Órfãos removidos: {remover.remove_orphans()}")
+    finally:
+        manifest.close()
+    return removed
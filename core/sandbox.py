@@ -1,27 +1,161 @@
 import os
 import shutil
 import tempfile
+import threading
 import subprocess
 
+
+class TmpfsBudget:
+    """
+    Contabiliza o espaço reservado por sandboxes simultâneos em cada
+    diretório tmpfs, para não passar do orçamento de memória configurado.
+    """
+
+    _lock = threading.Lock()
+    _used = {}
+
+    @classmethod
+    def reserve(cls, tmpfs_dir, budget_mb, size_mb):
+        """
+        Reserva size_mb no tmpfs se couber no orçamento e no espaço livre.
+        """
+        with cls._lock:
+            used = cls._used.get(tmpfs_dir, 0)
+            if used + size_mb > budget_mb:
+                return False
+            try:
+                st = os.statvfs(tmpfs_dir)
+            except OSError:
+                return False
+            if st.f_bavail * st.f_frsize < size_mb * 1024 * 1024:
+                return False
+            cls._used[tmpfs_dir] = used + size_mb
+            return True
+
+    @classmethod
+    def release(cls, tmpfs_dir, size_mb):
+        with cls._lock:
+            cls._used[tmpfs_dir] = max(0, cls._used.get(tmpfs_dir, 0) - size_mb)
+
+    @classmethod
+    def used(cls, tmpfs_dir):
+        with cls._lock:
+            return cls._used.get(tmpfs_dir, 0)
+
+
+def sandbox_config(config):
+    """
+    Monta o sandbox_config a partir do config.yaml completo
+    (seção sandbox + directories.sandbox_dir).
+    """
+    merged = dict(config.get('sandbox') or {})
+    sandbox_dir = (config.get('directories') or {}).get('sandbox_dir')
+    if sandbox_dir:
+        merged.setdefault('sandbox_dir', sandbox_dir)
+    return merged
+
+
+def disk_usage(path):
+    """
+    Espaço ocupado (em bytes) por uma árvore de diretórios.
+    """
+    total = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_blocks * 512
+            except OSError:
+                pass
+    return total
+
+
 class Sandbox:
     """
     Gerencia a criação, execução e limpeza de ambientes isolados para builds.
     """
 
     def __init__(self, config, use_fakeroot=False, keep=False):
-        self.config = config
+        """
+        config: dicionário de configuração:
+            work_dir: diretórios de trabalho persistentes por pacote
+            sandbox_dir: diretório em disco para os sandboxes
+            tmpfs_dir / tmpfs_budget_mb: diretório em RAM e quanto dele os
+            sandboxes simultâneos podem ocupar
+        """
+        self.config = config or {}
         self.use_fakeroot = use_fakeroot
         self.keep = keep
         self.base_path = None
+        self.persistent = False
+        self.on_tmpfs = False
+        self.reserved_mb = 0
+
+    def _reserve_tmpfs(self, size_mb):
+        """
+        Tenta reservar espaço no tmpfs para um build de size_mb estimados.
+        """
+        tmpfs_dir = self.config.get('tmpfs_dir')
+        if not tmpfs_dir or not size_mb:
+            return False
+        try:
+            os.makedirs(tmpfs_dir, exist_ok=True)
+        except OSError:
+            return False
+        if TmpfsBudget.reserve(tmpfs_dir, self.config.get('tmpfs_budget_mb', 0), size_mb):
+            self.on_tmpfs = True
+            self.reserved_mb = size_mb
+            return True
+        return False
 
-    def create(self):
+    def create(self, name=None, fresh=False, size_mb=None):
         """
         Cria um diretório temporário para o sandbox.
+        Com 'work_dir' no config e name, usa <work_dir>/<name>, que sobrevive
+        a builds que falharam para que possam ser retomados.
+        fresh: descarta o conteúdo de um diretório persistente existente
+        size_mb: tamanho estimado do build; se couber no orçamento do tmpfs,
+        o sandbox fica em RAM, senão vai para sandbox_dir em disco
         """
-        self.base_path = tempfile.mkdtemp(prefix="pm_sandbox_")
+        tmpfs_dir = self.config.get('tmpfs_dir')
+        work_dir = self.config.get('work_dir')
+        if work_dir and name:
+            self.persistent = True
+            tmpfs_path = os.path.join(tmpfs_dir, 'work', name) if tmpfs_dir else None
+            disk_path = os.path.join(work_dir, name)
+            if fresh:
+                for path in filter(None, (tmpfs_path, disk_path)):
+                    shutil.rmtree(path, ignore_errors=True)
+            # Retoma onde o build anterior ficou (RAM ou disco)
+            if tmpfs_path and os.path.isdir(tmpfs_path):
+                self.base_path = tmpfs_path
+                self._reserve_tmpfs(size_mb)
+            elif os.path.isdir(disk_path):
+                self.base_path = disk_path
+            elif tmpfs_path and self._reserve_tmpfs(size_mb):
+                self.base_path = tmpfs_path
+            else:
+                self.base_path = disk_path
+            os.makedirs(self.base_path, exist_ok=True)
+        else:
+            self.persistent = False
+            if self._reserve_tmpfs(size_mb):
+                parent = tmpfs_dir
+            else:
+                parent = self.config.get('sandbox_dir')
+                if parent:
+                    os.makedirs(parent, exist_ok=True)
+            self.base_path = tempfile.mkdtemp(prefix="pm_sandbox_", dir=parent)
         os.chmod(self.base_path, 0o700)
         return self.base_path
 
+    def usage_mb(self):
+        """
+        Espaço realmente ocupado pelo sandbox, em MB.
+        """
+        if not self.base_path:
+            return 0
+        return disk_usage(self.base_path) / (1024 * 1024)
+
     def run(self, cmd, cwd=None, check=True):
         """
         Executa um comando dentro do sandbox.
@@ -59,3 +193,13 @@ class Sandbox:
         """
         if not self.keep and self.base_path:
             shutil.rmtree(self.base_path, ignore_errors=True)
+        self.release()
+
+    def release(self):
+        """
+        Devolve ao orçamento do tmpfs o espaço reservado por este sandbox.
+        """
+        if self.on_tmpfs and self.reserved_mb:
+            TmpfsBudget.release(self.config.get('tmpfs_dir'), self.reserved_mb)
+        self.on_tmpfs = False
+        self.reserved_mb = 0
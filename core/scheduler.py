@@ -0,0 +1,275 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from logger import Logger
+
+
+class BuildFailed(Exception):
+    """
+    Erro de build dentro do scheduler. Guarda o pacote que falhou
+    e os pacotes que chegaram a ser construídos antes da falha.
+    """
+
+    def __init__(self, package, built, cause):
+        super().__init__(f"Build de {package} falhou: {cause}")
+        self.package = package
+        self.built = built
+        self.cause = cause
+
+
+class BuildScheduler:
+    """
+    Executa builds em paralelo seguindo o grafo de dependências (DAG).
+    Um pacote só é iniciado quando todas as suas dependências terminaram.
+    """
+
+    def __init__(self, graph, jobs=1, logger: Logger = None):
+        """
+        graph: {pacote: [dependências]} (ver DependencyResolver.build_graph)
+        jobs: orçamento total de jobs, dividido entre os builds simultâneos
+        """
+        self.graph = graph
+        self.jobs = max(1, int(jobs or 1))
+        self.logger = logger
+
+    def _dependents(self):
+        """
+        Monta o índice inverso {dependência: [pacotes que dependem dela]}.
+        """
+        dependents = {pkg: [] for pkg in self.graph}
+        for pkg, deps in self.graph.items():
+            for dep in deps:
+                dependents.setdefault(dep, []).append(pkg)
+        return dependents
+
+    def _share(self, free, waiting):
+        """
+        Divide os jobs livres entre os pacotes prontos para iniciar.
+        """
+        return max(1, free // max(1, min(waiting, free)))
+
+    def run(self, build_fn):
+        """
+        Executa build_fn(pacote, jobs) para cada pacote do grafo.
+        Na primeira falha não inicia novos builds, aguarda os que estão
+        em andamento e levanta BuildFailed.
+        Retorna a lista de pacotes construídos, na ordem de término.
+        """
+        remaining = {pkg: len(deps) for pkg, deps in self.graph.items()}
+        dependents = self._dependents()
+        ready = [pkg for pkg, count in remaining.items() if count == 0]
+        built = []
+        running = {}
+        in_use = 0
+        failure = None
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while ready or running:
+                while ready and failure is None and in_use < self.jobs:
+                    pkg = ready.pop(0)
+                    share = self._share(self.jobs - in_use, len(ready) + 1)
+                    in_use += share
+                    if self.logger:
+                        self.logger.info(f"Iniciando build de {pkg} com {share} job(s)")
+                    running[pool.submit(build_fn, pkg, share)] = (pkg, share)
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pkg, share = running.pop(future)
+                    in_use -= share
+                    error = future.exception()
+                    if error is not None:
+                        if failure is None:
+                            failure = (pkg, error)
+                            if self.logger:
+                                self.logger.error(f"Build de {pkg} falhou, aguardando builds em andamento: {error}")
+                        continue
+                    built.append(pkg)
+                    for child in dependents.get(pkg, []):
+                        remaining[child] -= 1
+                        if remaining[child] == 0:
+                            ready.append(child)
+
+        if failure is not None:
+            pkg, error = failure
+            raise BuildFailed(pkg, built, error) from error
+
+        pending = [pkg for pkg in self.graph if pkg not in built]
+        if pending:
+            # Só acontece com ciclos no grafo
+            raise BuildFailed(pending[0], built, f"dependências não satisfeitas: {pending}")
+        return built
+
+
+class PipelineScheduler(BuildScheduler):
+    """
+    Instalação em pipeline: download -> verificação/extração -> build -> instalação.
+    Cada etapa tem suas próprias threads, então os fontes do pacote N+1 são
+    baixados e extraídos enquanto o pacote N compila. Filas limitadas
+    (fetch_ahead, prepare_ahead) seguram as etapas iniciais para que o
+    espaço em disco ocupado por fontes ainda não compilados fique limitado.
+    """
+
+    def __init__(self, graph, jobs=1, logger: Logger = None, fetch_workers=4, fetch_ahead=4, prepare_ahead=2):
+        """
+        fetch_workers: downloads simultâneos
+        fetch_ahead: pacotes baixados (ou baixando) ainda não extraídos
+        prepare_ahead: pacotes extraídos aguardando o build
+        """
+        super().__init__(graph, jobs=jobs, logger=logger)
+        self.fetch_workers = max(1, fetch_workers)
+        self.fetch_ahead = max(1, fetch_ahead)
+        self.prepare_ahead = max(1, prepare_ahead)
+
+    def run(self, fetch_fn, prepare_fn, build_fn, install_fn, abort_fn=None):
+        """
+        Para cada pacote, na ordem topológica do grafo:
+            fetch_fn(pacote) -> tarball
+            prepare_fn(pacote, tarball)
+            build_fn(pacote, jobs)
+            install_fn(pacote)  (uma instalação por vez)
+        Um pacote só compila depois que suas dependências foram instaladas.
+        Na primeira falha as etapas param, os builds e instalações em
+        andamento terminam, abort_fn(pacote) é chamado para os pacotes já
+        preparados e BuildFailed é levantado.
+        Retorna a lista de pacotes instalados, na ordem de término.
+        """
+        order = list(self.graph)
+        remaining = {pkg: len(deps) for pkg, deps in self.graph.items()}
+        dependents = self._dependents()
+        events = queue.Queue()
+        stop = threading.Event()
+        fetch_slots = threading.Semaphore(self.fetch_ahead)
+        prepare_slots = threading.Semaphore(self.prepare_ahead)
+        fetched = {}
+        fetched_ready = threading.Condition()
+
+        def acquire(slot):
+            while not stop.is_set():
+                if slot.acquire(timeout=0.1):
+                    return True
+            return False
+
+        def fetch_stage(pool):
+            for pkg in order:
+                if not acquire(fetch_slots):
+                    return
+                with fetched_ready:
+                    fetched[pkg] = pool.submit(fetch_fn, pkg)
+                    fetched_ready.notify_all()
+
+        def prepare_stage():
+            for pkg in order:
+                if not acquire(prepare_slots):
+                    return
+                with fetched_ready:
+                    while pkg not in fetched and not stop.is_set():
+                        fetched_ready.wait(0.1)
+                if stop.is_set():
+                    return
+                try:
+                    tarball = fetched[pkg].result()
+                    prepare_fn(pkg, tarball)
+                except Exception as error:
+                    events.put(('prepared', pkg, error))
+                    return
+                finally:
+                    fetch_slots.release()
+                events.put(('prepared', pkg, None))
+
+        prepared = []
+        installed = []
+        running = {}
+        installing = 0
+        in_use = 0
+        failure = None
+
+        with ThreadPoolExecutor(max_workers=self.fetch_workers) as fetch_pool, \
+                ThreadPoolExecutor(max_workers=self.jobs) as build_pool, \
+                ThreadPoolExecutor(max_workers=1) as install_pool:
+            stages = [threading.Thread(target=fetch_stage, args=(fetch_pool,), name="pm-fetch", daemon=True),
+                      threading.Thread(target=prepare_stage, name="pm-prepare", daemon=True)]
+            for thread in stages:
+                thread.start()
+
+            def report(kind, pkg, future):
+                events.put((kind, pkg, future.exception()))
+
+            while len(installed) < len(order):
+                # Inicia os builds cujas dependências já estão instaladas
+                while failure is None and in_use < self.jobs:
+                    ready = [pkg for pkg in prepared if remaining[pkg] == 0]
+                    if not ready:
+                        break
+                    pkg = ready[0]
+                    prepared.remove(pkg)
+                    prepare_slots.release()
+                    share = self._share(self.jobs - in_use, len(ready))
+                    in_use += share
+                    if self.logger:
+                        self.logger.info(f"Iniciando build de {pkg} com {share} job(s)")
+                    future = build_pool.submit(build_fn, pkg, share)
+                    running[pkg] = share
+                    future.add_done_callback(lambda f, pkg=pkg: report('built', pkg, f))
+
+                if failure is not None and not running and not installing:
+                    break
+                # A preparação para de vez ao terminar a ordem ou quando todas as
+                # vagas de prepare_ahead estão com pacotes que não podem compilar
+                preparing = stages[1].is_alive() and len(prepared) < self.prepare_ahead
+                if not running and not installing and events.empty() and not preparing:
+                    # Nada em andamento e nada mais a preparar: só acontece com ciclos no grafo
+                    pending = [pkg for pkg in order if pkg not in installed]
+                    failure = (pending[0], RuntimeError(f"dependências não satisfeitas: {pending}"))
+                    break
+
+                kind, pkg, error = events.get()
+                if kind == 'built':
+                    in_use -= running.pop(pkg)
+                if kind == 'installed':
+                    installing -= 1
+                if error is not None:
+                    if failure is None:
+                        failure = (pkg, error)
+                        stop.set()
+                        if self.logger:
+                            self.logger.error(f"Pacote {pkg} falhou ({kind}), aguardando etapas em andamento: {error}")
+                    continue
+
+                if kind == 'prepared':
+                    if failure is None:
+                        prepared.append(pkg)
+                    elif abort_fn:
+                        abort_fn(pkg)
+                elif kind == 'built':
+                    # Builds que terminaram depois de uma falha também são instalados
+                    installing += 1
+                    future = install_pool.submit(install_fn, pkg)
+                    future.add_done_callback(lambda f, pkg=pkg: report('installed', pkg, f))
+                elif kind == 'installed':
+                    installed.append(pkg)
+                    for child in dependents.get(pkg, []):
+                        remaining[child] -= 1
+
+            stop.set()
+            for thread in stages:
+                thread.join()
+            for future in fetched.values():
+                future.cancel()
+
+        # Descarta os preparados que não chegaram a ser compilados
+        while not events.empty():
+            kind, pkg, error = events.get()
+            if kind == 'prepared' and error is None:
+                prepared.append(pkg)
+        if abort_fn:
+            for pkg in prepared:
+                abort_fn(pkg)
+
+        if failure is not None:
+            pkg, error = failure
+            raise BuildFailed(pkg, installed, error) from error
+        return installed
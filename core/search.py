@@ -0,0 +1,154 @@
+import os
+from catalog import RecipeCatalog, trigrams, word_trigrams, words
+from manifest import ManifestDB, DEFAULT_MANIFEST_PATH
+
+
+def installed_packages(manifest_path=DEFAULT_MANIFEST_PATH):
+    """
+    Nomes dos pacotes registrados no banco de manifestos.
+    """
+    if not os.path.exists(manifest_path):
+        return set()
+    manifest = ManifestDB(manifest_path)
+    try:
+        return set(manifest.packages())
+    finally:
+        manifest.close()
+
+
+# Similaridade mínima de trigramas para um resultado aproximado
+FUZZY_WORD = 0.25
+FUZZY_DESCRIPTION = 0.6
+
+
+def similarity(query_grams, text):
+    """
+    Maior similaridade (Jaccard de trigramas) entre a consulta e uma
+    das palavras do texto.
+    """
+    best = 0.0
+    for word in words(text):
+        grams = word_trigrams(word)
+        shared = len(query_grams & grams)
+        if shared:
+            best = max(best, shared / (len(query_grams) + len(grams) - shared))
+    return best
+
+
+def score(entry, query):
+    """
+    Pontua uma entrada que contém a consulta, ou None:
+    nome exato > prefixo do nome > trecho do nome > trecho da descrição.
+    """
+    name = entry[0].lower()
+    if name == query:
+        return 100.0
+    if name.startswith(query):
+        return 80.0 + 10.0 * len(query) / len(name)
+    if query in name:
+        return 60.0 + 10.0 * len(query) / len(name)
+    if query in (entry[2] or '').lower():
+        return 40.0
+    return None
+
+
+def fuzzy_score(entry, query_grams):
+    """
+    Pontua uma entrada parecida com a consulta (erros de digitação), ou None.
+    """
+    name, version, description, grp = entry
+    name_sim = similarity(query_grams, name)
+    if name_sim >= FUZZY_WORD:
+        return 20.0 + 10.0 * name_sim
+    desc_sim = similarity(query_grams, description)
+    # Consultas de várias palavras: fração dos trigramas presentes na receita
+    cover = len(query_grams & trigrams(f"{name} {description or ''}")) / len(query_grams)
+    if desc_sim >= FUZZY_WORD or cover >= FUZZY_DESCRIPTION:
+        return 10.0 * max(desc_sim, cover)
+    return None
+
+
+def rank(entries, query):
+    """
+    Ordena as entradas que casam com a consulta, melhores primeiro.
+    Resultados aproximados só aparecem quando nada contém a consulta.
+    """
+    query = query.lower()
+    scored = []
+    for entry in entries:
+        points = score(entry, query)
+        if points is not None:
+            scored.append((-points, entry[0], entry))
+    query_grams = trigrams(query)
+    if not scored and query_grams:
+        for entry in entries:
+            points = fuzzy_score(entry, query_grams)
+            if points is not None:
+                scored.append((-points, entry[0], entry))
+    scored.sort()
+    return [entry for _, _, entry in scored]
+
+
+def find(catalog, query='', group=None):
+    """
+    Busca no catálogo pelo índice de trigramas: só as receitas que
+    compartilham trigramas suficientes com a consulta são pontuadas.
+    """
+    query = (query or '').strip()
+    query_grams = trigrams(query)
+    if len(query) < 3 or not query_grams:
+        # Sem consulta, ou curta demais para trigramas: varre o catálogo
+        return match(catalog.entries(), query, group)
+    # Trechos e parecidos compartilham pelo menos 1/4 dos trigramas da consulta
+    min_hits = max(1, len(query_grams) // 4)
+    return rank(catalog.candidates(query_grams, min_hits, group), query)
+
+
+def match(entries, query='', group=None):
+    """
+    Filtra e ordena entradas (nome, versão, descrição, grupo) sem índice.
+    """
+    query = (query or '').strip()
+    entries = [entry for entry in entries if not group or entry[3] == group]
+    return rank(entries, query) if query else entries
+
+
+def format_results(results, installed):
+    """
+    Linhas de saída do `pm search`; instalados aparecem com [✔].
+    """
+    if not results:
+        return "Nenhum pacote encontrado."
+    lines = []
+    for name, version, description, grp in results:
+        mark = "[✔]" if name in installed else "[ ]"
+        lines.append(f"{mark} {name:<24} {version or '-':<12} {description or ''}")
+    return "\n".join(lines)
+
+
+def search(query='', group=None, recipes_dir=None, catalog_path=None, manifest_path=None, names_only=False,
+           config_path=None):
+    """
+    Busca pacotes no catálogo compilado pelo nome ou descrição
+    (comando `pm search`), tolerando erros de digitação.
+    names_only imprime só os nomes (para completar no shell).
+    Caminhos não informados vêm da seção directories do config.
+    Retorna os nomes encontrados, do mais para o menos relevante.
+    """
+    if None in (recipes_dir, catalog_path, manifest_path):
+        from components import load_config, paths
+        found = paths(load_config(config_path))
+        recipes_dir = recipes_dir or found['recipes_dir']
+        catalog_path = catalog_path or found['catalog_path']
+        manifest_path = manifest_path or found['manifest_path']
+    catalog = RecipeCatalog(recipes_dir, catalog_path)
+    try:
+        results = find(catalog, query, group)
+    finally:
+        catalog.close()
+    names = [entry[0] for entry in results]
+    if names_only:
+        print("\n".join(names))
+    else:
+        print(format_results(results, installed_packages(manifest_path)))
+    return names
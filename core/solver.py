@@ -0,0 +1,435 @@
+import re
+from functools import lru_cache
+from graph import CycleError
+
+# Tipos de aresta
+BUILD, RUNTIME = 0, 1
+
+# Chaves de dependência das receitas: (chave, tipo da aresta)
+DEPENDENCY_KEYS = [('dependencies', BUILD), ('dependencias_build', BUILD), ('dependencias_runtime', RUNTIME)]
+
+_SPEC = re.compile(r"^\s*([^<>=!\s]+)\s*(.*?)\s*$")
+_CONSTRAINT = re.compile(r"^(<=|>=|==|!=|<|>|=)\s*(\S+)$")
+_OPERATOR = re.compile(r"[<>=!]")
+_VERSION_PART = re.compile(r"\d+|[A-Za-z]+")
+
+_NO_FLAGS = frozenset()
+
+_COMPARE = {
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+    '==': lambda a, b: a == b,
+    '=': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+}
+
+
+class ResolutionError(ValueError):
+    """
+    Não existe escolha de versões/alternativas que satisfaça todas as
+    dependências. conflicts lista os motivos, ex.:
+    ['zlib 1.2.13 não satisfaz >=1.3 (exigido por openssl)'].
+    """
+
+    def __init__(self, packages, conflicts):
+        listed = "; ".join(conflicts[:8]) or "sem candidatos"
+        super().__init__(f"Não foi possível resolver dependências de {', '.join(packages)}: {listed}")
+        self.packages = packages
+        self.conflicts = conflicts
+
+
+def parse_version(version):
+    """
+    Chave de comparação de versões: partes numéricas comparadas como
+    números ("1.10" > "1.9"), letras vêm antes de números ("1.0rc1" < "1.0.1").
+    """
+    return tuple((1, int(part), '') if part.isdigit() else (0, 0, part.lower())
+                 for part in _VERSION_PART.findall(str(version or '')))
+
+
+class Spec:
+    """
+    Uma exigência de pacote, ex.: "openssl>=3.0,<4" -> nome e restrições.
+    """
+
+    __slots__ = ('name', 'constraints', 'text')
+
+    def __init__(self, text):
+        self.constraints = []
+        if not _OPERATOR.search(text):
+            self.text = self.name = text.strip()
+            return
+        match = _SPEC.match(text)
+        if not match:
+            raise ValueError(f"Dependência inválida: {text!r}")
+        self.text = text.strip()
+        self.name = match.group(1)
+        rest = match.group(2)
+        if rest:
+            for part in rest.split(','):
+                constraint = _CONSTRAINT.match(part.strip())
+                if not constraint:
+                    raise ValueError(f"Restrição de versão inválida em {text!r}: {part.strip()!r}")
+                self.constraints.append((constraint.group(1), parse_version(constraint.group(2))))
+
+    def allows(self, version):
+        if not self.constraints:
+            return True
+        if version is None:
+            return False
+        key = parse_version(version)
+        return all(_COMPARE[op](key, bound) for op, bound in self.constraints)
+
+    def __repr__(self):
+        return self.text
+
+
+@lru_cache(maxsize=65536)
+def parse_requirement(text):
+    """
+    "flag? a>=1 | b" -> (flag, negada, (Spec(a>=1), Spec(b))).
+    Sem condição, flag é None. O texto de cada exigência é lido uma vez só.
+    """
+    text = str(text).strip()
+    flag, negated = None, False
+    if '?' in text:
+        condition, text = text.split('?', 1)
+        condition = condition.strip()
+        negated = condition.startswith('!')
+        flag = condition.lstrip('!')
+    return flag, negated, tuple(Spec(alt) for alt in text.split('|') if alt.strip())
+
+
+def declared_flags(data):
+    """
+    Flags USE de uma receita: {flag: ligada por padrão}.
+    flags_USE aceita "+flag" para ligada por padrão; 'use' (formato antigo)
+    declara flags desligadas por padrão.
+    """
+    flags = {}
+    for flag in data.get('use') or []:
+        flags[flag] = False
+    for flag in data.get('flags_USE') or []:
+        flag = str(flag)
+        flags[flag.lstrip('+-')] = flag.startswith('+')
+    return flags
+
+
+def effective_flags(data, enabled=()):
+    """
+    Flags USE efetivas de um pacote: as padrão da receita mais as habilitadas
+    globalmente ("-flag" desliga), restritas às que a receita declara.
+    """
+    if not data.get('use') and not data.get('flags_USE'):
+        return _NO_FLAGS
+    enabled = set(enabled or ())
+    result = set()
+    for flag, default in declared_flags(data).items():
+        if flag in enabled or (default and f"-{flag}" not in enabled):
+            result.add(flag)
+    return frozenset(result)
+
+
+def dependency_names(data, flags=frozenset(), known=None):
+    """
+    Nomes das dependências (build e runtime) de uma receita para um conjunto
+    de flags, usando a primeira alternativa de cada exigência.
+    """
+    names = []
+    for key, kind in DEPENDENCY_KEYS:
+        for text in data.get(key) or ():
+            flag, negated, alternatives = parse_requirement(text)
+            if flag is None or (flag in flags) != negated:
+                names.append(alternatives[0].name)
+    for flag in data.get('use') or ():
+        if flag in flags and (known is None or flag in known):
+            names.append(flag)
+    return names
+
+
+def requirements(data, flags=frozenset(), known=None):
+    """
+    Exigências de uma receita com as condições de flag já avaliadas:
+    [((Spec alternativas), BUILD | RUNTIME)].
+    known: nomes de pacotes existentes (para as flags do formato antigo)
+    """
+    result = []
+    for key, kind in DEPENDENCY_KEYS:
+        for text in data.get(key) or []:
+            flag, negated, alternatives = parse_requirement(text)
+            if flag is None or (flag in flags) != negated:
+                result.append((alternatives, kind))
+    # Formato antigo: flag USE com o nome de um pacote puxa o pacote
+    for flag in data.get('use') or []:
+        if flag in flags and (known is None or flag in known):
+            result.append(((Spec(flag),), BUILD))
+    return result
+
+
+class Solution:
+    """
+    Resultado do Solver: versões, flags e arestas de build/runtime de cada
+    pacote escolhido, e a ordem de instalação.
+    """
+
+    def __init__(self, order, versions, flags, build, runtime, external, reused):
+        self.order = order
+        self.versions = versions
+        self.flags = flags
+        self.build = build
+        self.runtime = runtime
+        self.external = external
+        self.reused = reused
+
+    @property
+    def graph(self):
+        """
+        {pacote: [dependências]} na ordem de instalação, acíclico
+        (ver DependencyResolver.build_graph e os schedulers).
+        """
+        position = {pkg: i for i, pkg in enumerate(self.order)}
+        graph = {}
+        for pkg in self.order:
+            deps = []
+            for dep in self.build.get(pkg, []) + self.runtime.get(pkg, []):
+                # Arestas de runtime que fechariam um ciclo foram descartadas na ordenação
+                if position[dep] < position[pkg] and dep not in deps:
+                    deps.append(dep)
+            graph[pkg] = deps
+        return graph
+
+
+class Solver:
+    """
+    Resolve dependências com flags USE condicionais, arestas de build e
+    runtime separadas e restrições de versão ("zlib>=1.3", "a | b").
+    Quando uma escolha (alternativa, ou versão instalada x versão da
+    receita) gera conflito mais adiante, volta atrás e tenta a próxima.
+    As exigências de cada (pacote, flags efetivas) são memorizadas, assim
+    como as soluções completas, até o db mudar (clear).
+    """
+
+    def __init__(self, db, installed=None, max_backtracks=10000):
+        """
+        db: {nome: receita}
+        installed: {nome: versão instalada}; a versão instalada é preferida
+                   quando satisfaz as restrições (o pacote não é reconstruído)
+        """
+        self.db = db
+        self.installed = installed or {}
+        self.max_backtracks = max_backtracks
+        self._effective = {}
+        self._expanded = {}
+        self._candidates = {}
+        self._solutions = {}
+
+    def clear(self):
+        self._effective.clear()
+        self._candidates.clear()
+        self._expanded.clear()
+        self._solutions.clear()
+
+    def expand(self, name, enabled=frozenset()):
+        """
+        (flags efetivas, exigências) de um pacote, memorizado por (pacote, flags efetivas).
+        Exigências: [(alternativas, BUILD | RUNTIME)].
+        """
+        flags = self._effective.get((name, enabled))
+        if flags is None:
+            flags = effective_flags(self.db.get(name) or {}, enabled)
+            self._effective[(name, enabled)] = flags
+        reqs = self._expanded.get((name, flags))
+        if reqs is None:
+            reqs = requirements(self.db.get(name) or {}, flags, self.db)
+            self._expanded[(name, flags)] = reqs
+        return flags, reqs
+
+    def candidates(self, name):
+        """
+        Versões possíveis de um pacote, na ordem de preferência: a instalada
+        (se houver) e a da receita.
+        """
+        result = self._candidates.get(name)
+        if result is None:
+            recipe = self.db.get(name)
+            result = []
+            if name in self.installed:
+                result.append(self.installed[name])
+            if recipe is not None:
+                version = recipe.get('version')
+                version = None if version is None else str(version)
+                if version not in result:
+                    result.append(version)
+            self._candidates[name] = result
+        return result
+
+    def solve(self, packages, use_flags=None):
+        """
+        Resolve os pacotes pedidos (nomes ou exigências, ex.: "gcc>=13").
+        Retorna uma Solution; levanta ResolutionError explicando os
+        conflitos, ou CycleError se as dependências de build formarem ciclo.
+        """
+        enabled = frozenset(use_flags or ())
+        key = (tuple(packages), enabled)
+        solution = self._solutions.get(key)
+        if solution is None:
+            solution = self._search(list(packages), enabled)
+            self._solutions[key] = solution
+        return solution
+
+    def _search(self, packages, enabled):
+        # Agenda de exigências: (alternativas, BUILD | RUNTIME, quem exige)
+        agenda = [(parse_requirement(pkg)[2], BUILD, None) for pkg in packages]
+        selected = {}     # nome -> versão escolhida
+        edges = {}        # nome -> ([build], [runtime])
+        flags_of = {}
+        trail = []        # desfazer: nome selecionado | (pai, aresta); só depois do 1º ponto de escolha
+        choices = []      # pontos de escolha: (i, alternativa, versão, len(trail), len(agenda))
+        conflicts = []
+        backtracks = 0
+        i = 0
+        start_alt, start_ver = 0, 0
+
+        def select(name, version):
+            selected[name] = version
+            if choices:
+                trail.append(name)
+            flags, reqs = self.expand(name, enabled)
+            flags_of[name] = flags
+            edges[name] = ([], [])
+            agenda.extend([(dep_alternatives, dep_slot, name) for dep_alternatives, dep_slot in reqs])
+
+        while i < len(agenda):
+            alternatives, slot, parent = agenda[i]
+            if len(alternatives) == 1 and not start_ver:
+                # Caso comum: sem alternativas e com uma única versão possível
+                spec = alternatives[0]
+                name = spec.name
+                if name in selected:
+                    version = selected[name]
+                else:
+                    options = self.candidates(name)
+                    version = options[0] if len(options) == 1 else False
+                if version is not False and (not spec.constraints or spec.allows(version)):
+                    if name not in selected:
+                        select(name, version)
+                    if parent is not None:
+                        edges[parent][slot].append(name)
+                        if choices:
+                            trail.append((parent, slot))
+                    i += 1
+                    continue
+
+            placed = False
+            for a in range(start_alt, len(alternatives)):
+                spec = alternatives[a]
+                name = spec.name
+                new = name not in selected
+                options = self.candidates(name) if new else [selected[name]]
+                if not options and len(alternatives) == 1 and not spec.constraints:
+                    # Sem receita: tratado como externo, como antes
+                    options = [None]
+                if not options:
+                    conflicts.append(f"{name} não existe (exigido por {parent or 'pedido'})")
+                for v in range(start_ver if a == start_alt else 0, len(options)):
+                    version = options[v]
+                    if spec.constraints and not spec.allows(version):
+                        conflicts.append(f"{name} {version} não satisfaz {spec.text} (exigido por {parent or 'pedido'})")
+                        continue
+                    if len(alternatives) > 1 or len(options) > 1:
+                        choices.append((i, a, v, len(trail), len(agenda)))
+                    if new:
+                        select(name, version)
+                    if parent is not None:
+                        edges[parent][slot].append(name)
+                        trail.append((parent, slot))
+                    placed = True
+                    break
+                if placed:
+                    break
+            start_alt, start_ver = 0, 0
+            if placed:
+                i += 1
+                continue
+
+            # Conflito: volta ao último ponto de escolha e tenta a opção seguinte
+            if not choices or backtracks >= self.max_backtracks:
+                raise ResolutionError([str(pkg) for pkg in packages], list(dict.fromkeys(conflicts)))
+            backtracks += 1
+            i, start_alt, start_ver, mark, agenda_len = choices.pop()
+            start_ver += 1
+            while len(trail) > mark:
+                action = trail.pop()
+                if isinstance(action, tuple):
+                    edges[action[0]][action[1]].pop()
+                else:
+                    del selected[action]
+                    del edges[action]
+                    del flags_of[action]
+            del agenda[agenda_len:]
+
+        roots = []
+        for alternatives, kind, parent in agenda[:len(packages)]:
+            for spec in alternatives:
+                if spec.name in selected and spec.name not in roots:
+                    roots.append(spec.name)
+                    break
+        order = self._order(roots, edges)
+        build = {pkg: deps[0] for pkg, deps in edges.items()}
+        runtime = {pkg: deps[1] for pkg, deps in edges.items()}
+        external = {pkg for pkg in selected if pkg not in self.db}
+        reused = {pkg for pkg, version in selected.items()
+                  if pkg in self.installed and version == self.installed[pkg]}
+        return Solution(order, dict(selected), flags_of, build, runtime, external, reused)
+
+    def _order(self, roots, edges):
+        """
+        Ordem de instalação: dependências de build sempre antes; dependências
+        de runtime antes quando possível. Um ciclo que passa por alguma
+        aresta de runtime é quebrado nela (o pacote do outro lado vem
+        depois); só ciclos feitos apenas de arestas de build são erro.
+        """
+        order = []
+        state = {}
+        pending = list(roots)
+        while pending:
+            root = pending.pop(0)
+            if root in state:
+                continue
+            state[root] = 1
+            # Cada frame guarda o tipo da aresta pela qual o nó foi alcançado
+            stack = [(root, iter(self._deps(root, edges)), None)]
+            while stack:
+                node, deps, _ = stack[-1]
+                for dep, kind in deps:
+                    dep_state = state.get(dep)
+                    if dep_state == 2:
+                        continue
+                    if dep_state == 1:
+                        if kind == RUNTIME:
+                            continue
+                        start = next(i for i, frame in enumerate(stack) if frame[0] == dep)
+                        cut = [i for i in range(start + 1, len(stack)) if stack[i][2] == RUNTIME]
+                        if not cut:
+                            raise CycleError([frame[0] for frame in stack[start:]] + [dep])
+                        # Quebra na aresta de runtime mais funda: o ramo volta a
+                        # ficar pendente e é visitado depois, sem essa aresta
+                        for frame in stack[cut[-1]:]:
+                            del state[frame[0]]
+                        pending.append(stack[cut[-1]][0])
+                        del stack[cut[-1]:]
+                        break
+                    state[dep] = 1
+                    stack.append((dep, iter(self._deps(dep, edges)), kind))
+                    break
+                else:
+                    stack.pop()
+                    state[node] = 2
+                    order.append(node)
+        return order
+
+    def _deps(self, node, edges):
+        build, runtime = edges.get(node, ((), ()))
+        return [(dep, BUILD) for dep in build] + [(dep, RUNTIME) for dep in runtime]
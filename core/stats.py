@@ -0,0 +1,141 @@
+import os
+import sqlite3
+import datetime
+import threading
+
+DEFAULT_STATS_PATH = "/opt/pm/db/stats.db"
+
+
+class BuildStats:
+    """
+    Histórico de builds (SQLite): duração de cada build e, por fase,
+    tempo de parede, CPU user/sys, pico de memória e blocos lidos/gravados.
+    """
+
+    FIELDS = ['wall', 'utime', 'stime', 'maxrss_kb', 'inblock', 'oublock']
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS builds (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            package TEXT NOT NULL,
+            version TEXT,
+            stage TEXT,
+            started REAL NOT NULL,
+            wall REAL NOT NULL,
+            status TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS builds_package ON builds (package, version, stage);
+        CREATE TABLE IF NOT EXISTS phases (
+            build_id INTEGER NOT NULL REFERENCES builds (id) ON DELETE CASCADE,
+            phase TEXT NOT NULL,
+            wall REAL NOT NULL,
+            utime REAL NOT NULL,
+            stime REAL NOT NULL,
+            maxrss_kb INTEGER NOT NULL,
+            inblock INTEGER NOT NULL,
+            oublock INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS phases_build ON phases (build_id);
+    """
+
+    def __init__(self, db_path=DEFAULT_STATS_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def record(self, package, version, stage, started, wall, status, timings):
+        """
+        Registra um build e as medições de cada fase ({fase: {campo: valor}}).
+        """
+        with self._lock, self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO builds (package, version, stage, started, wall, status) VALUES (?, ?, ?, ?, ?, ?)",
+                (package, None if version is None else str(version), stage, started, wall, status))
+            self.conn.executemany(
+                "INSERT INTO phases (build_id, phase, wall, utime, stime, maxrss_kb, inblock, oublock) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(cur.lastrowid, phase) + tuple(values[field] for field in self.FIELDS)
+                 for phase, values in timings.items()])
+            return cur.lastrowid
+
+    def slowest_packages(self, limit=10):
+        """
+        Último build bem-sucedido (não vindo do cache) de cada pacote, do mais lento ao mais rápido.
+        """
+        return self.conn.execute("""
+            SELECT package, version, stage, wall, started FROM builds b
+            WHERE status = 'ok' AND id = (
+                SELECT MAX(id) FROM builds WHERE package = b.package AND stage IS b.stage AND status = 'ok')
+            ORDER BY wall DESC LIMIT ?""", (limit,)).fetchall()
+
+    def slowest_phases(self, limit=10, package=None):
+        """
+        Tempo médio de cada fase por pacote, das mais lentas às mais rápidas.
+        """
+        return self.conn.execute("""
+            SELECT b.package, p.phase, AVG(p.wall), AVG(p.utime + p.stime), COUNT(*)
+            FROM phases p JOIN builds b ON b.id = p.build_id
+            WHERE b.status = 'ok' AND (? IS NULL OR b.package = ?)
+            GROUP BY b.package, p.phase ORDER BY AVG(p.wall) DESC LIMIT ?""",
+                                 (package, package, limit)).fetchall()
+
+    def trend(self, package):
+        """
+        Duração média, melhor e pior build de um pacote por versão e stage.
+        """
+        return self.conn.execute("""
+            SELECT version, stage, COUNT(*), AVG(wall), MIN(wall), MAX(wall), MIN(started)
+            FROM builds WHERE package = ? AND status = 'ok'
+            GROUP BY version, stage ORDER BY MIN(started)""", (package,)).fetchall()
+
+    def peak_memory(self, limit=10):
+        """
+        Maior pico de memória (max RSS) observado por pacote e fase.
+        """
+        return self.conn.execute("""
+            SELECT b.package, p.phase, MAX(p.maxrss_kb)
+            FROM phases p JOIN builds b ON b.id = p.build_id
+            GROUP BY b.package ORDER BY MAX(p.maxrss_kb) DESC LIMIT ?""", (limit,)).fetchall()
+
+
+def _duration(seconds):
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}h{minutes:02d}m{secs:02d}s" if hours else f"{minutes}m{secs:02d}s"
+
+
+def show(package=None, limit=10, db_path=DEFAULT_STATS_PATH):
+    """
+    Exibe o relatório do comando `pm stats`.
+    """
+    stats = BuildStats(db_path)
+    try:
+        if package:
+            print(f"Histórico de {package} por versão:")
+            for version, stage, count, avg, best, worst, first in stats.trend(package):
+                day = datetime.date.fromtimestamp(first).isoformat()
+                print(f"  {version or '-':<12} {stage or '-':<10} {count:>3} build(s)  média {_duration(avg)}  "
+                      f"melhor {_duration(best)}  pior {_duration(worst)}  desde {day}")
+        else:
+            print("Pacotes mais lentos (último build):")
+            for pkg, version, stage, wall, _ in stats.slowest_packages(limit):
+                print(f"  {pkg:<24} {version or '-':<12} {stage or '-':<10} {_duration(wall)}")
+
+        print("Fases mais lentas (média):")
+        for pkg, phase, wall, cpu, count in stats.slowest_phases(limit, package):
+            print(f"  {pkg:<24} {phase:<12} {_duration(wall)}  CPU {_duration(cpu)}  ({count} build(s))")
+
+        if not package:
+            print("Pico de memória:")
+            for pkg, phase, rss in stats.peak_memory(limit):
+                print(f"  {pkg:<24} {phase:<12} {rss / 1024:.0f} MB")
+    finally:
+        stats.close()
@@ -9,56 +9,149 @@ class Updater:
     Gerencia atualizações de pacotes usando VersionTracker e Installer.
     """
 
-    def __init__(self, db, config_path, logger: Logger = None, hooks=None):
+    def __init__(self, db, config_path, logger: Logger = None, hooks=None, manifest=None, installer: Installer = None):
+        """
+        manifest: ManifestDB com os pacotes instalados (sem ele, todo o db conta como instalado)
+        installer: Installer usado nas reconstruções (senão um só com logger, hooks e manifest)
+        """
         self.db = db
         self.logger = logger
         self.hooks = hooks
+        self.manifest = manifest
         self.version_tracker = VersionTracker(config_path, db, logger)
-        self.installer = Installer(db, logger=logger, hooks=hooks)
+        self.installer = installer or Installer(db, logger=logger, hooks=hooks, manifest=manifest)
         self.dep_resolver = DependencyResolver(db)
-        self.group_manager = GroupManager(db, logger=logger, hooks=hooks)
+        self.group_manager = GroupManager(db, logger=logger, hooks=hooks, manifest=manifest)
 
-    def update_package(self, package_name):
+    def plan_updates(self, updates, packages=None):
         """
-        Atualiza um pacote individual se houver nova versão e não for crítico.
+        Monta o plano de atualização a partir de uma única checagem de versões
+        (updates, ver VersionTracker.check_updates): os pacotes com versão nova,
+        menos os críticos, mais os dependentes diretos instalados, que precisam
+        ser reconstruídos contra a nova versão, e as dependências pendentes.
+        packages: limita as atualizações a estes pacotes (ex.: um grupo)
+        Retorna {pacote: [dependências no plano]} em ordem topológica.
         """
-        updates = self.version_tracker.check_updates()
-        if package_name not in updates:
-            if self.logger:
-                self.logger.info(f"{package_name} já está na versão mais recente.")
-            return
+        critical = set(self.version_tracker.config.get('critical_programs', []))
+        packages = set(packages) if packages is not None else None
+        upgrade = []
+        for pkg, info in updates.items():
+            if packages is not None and pkg not in packages:
+                continue
+            if info['critical']:
+                if self.logger:
+                    self.logger.warning(f"{pkg} é crítico. Apenas avisando nova versão {info['latest']}.")
+                continue
+            if not self.db.get(pkg):
+                if self.logger:
+                    self.logger.warning(f"Receita de {pkg} não encontrada. Atualização ignorada.")
+                continue
+            upgrade.append(pkg)
 
-        info = updates[package_name]
-        if info['critical']:
-            if self.logger:
-                self.logger.warning(f"{package_name} é crítico. Apenas avisando nova versão {info['latest']}.")
-            return
+        installed = set(self.manifest.packages()) if self.manifest else set(self.db)
+        rebuild = []
+        for pkg in upgrade:
+            for dependent in self.dep_resolver.revdep(pkg):
+                if dependent not in installed or dependent in upgrade or dependent in rebuild:
+                    continue
+                if dependent in critical:
+                    if self.logger:
+                        self.logger.warning(f"{dependent} é crítico e não será reconstruído contra {pkg}.")
+                    continue
+                rebuild.append(dependent)
+        if rebuild and self.logger:
+            self.logger.info(f"Dependentes a reconstruir: {rebuild}")
 
-        pkg_recipe = self.db.get(package_name)
-        if not pkg_recipe:
-            if self.logger:
-                self.logger.warning(f"Receita de {package_name} não encontrada. Atualização ignorada.")
-            return
+        targets = upgrade + rebuild
+        return self.installer.plan(targets, reinstall=targets)
 
-        self.installer.install_package(pkg_recipe)
+    def update(self, packages=None, pretend=False, jobs=None, updates=None):
+        """
+        Checa as versões uma vez e atualiza tudo em um único build ordenado
+        e uma única transação de hooks.
+        pretend: só monta o plano, sem construir nada
+        updates: resultado de uma checagem já feita (evita uma nova)
+        Retorna a lista de pacotes construídos (com pretend, os que seriam).
+        """
+        if updates is None:
+            updates = self.version_tracker.check_updates()
+        graph = self.plan_updates(updates, packages)
+        if not graph:
+            if self.logger:
+                self.logger.info("Nenhum pacote a atualizar.")
+            return []
+        if pretend:
+            return list(graph)
+        built = self.installer.run_plan(graph, jobs=jobs)
         if self.logger:
-            self.logger.info(f"{package_name} atualizado de {info['current']} para {info['latest']}.")
+            for pkg in built:
+                if pkg in updates:
+                    self.logger.info(f"{pkg} atualizado de {updates[pkg]['current']} para {updates[pkg]['latest']}.")
+        return built
+
+    def update_package(self, package_name, pretend=False, jobs=None):
+        """
+        Atualiza um pacote individual se houver nova versão e não for crítico,
+        reconstruindo seus dependentes.
+        """
+        return self.update([package_name], pretend=pretend, jobs=jobs)
 
-    def update_group(self, group_name):
+    def update_group(self, group_name, pretend=False, jobs=None):
         """
         Atualiza todos os pacotes de um grupo.
         """
         group_packages = self.dep_resolver.packages_in_group(group_name)
         if self.logger:
             self.logger.info(f"Iniciando atualização do grupo '{group_name}'")
-        for pkg in group_packages:
-            self.update_package(pkg)
+        return self.update(group_packages, pretend=pretend, jobs=jobs)
 
-    def update_all(self):
+    def update_all(self, pretend=False, jobs=None):
         """
         Atualiza todos os pacotes não críticos com novas versões.
         """
-        updates = self.version_tracker.check_updates()
-        for pkg, info in updates.items():
-            if not info['critical']:
-                self.update_package(pkg)
+        return self.update(pretend=pretend, jobs=jobs)
+
+
+def _run(update, pretend=False, config_path=None):
+    """
+    Monta o Updater a partir do config (com os mesmos componentes do
+    `pm install`), roda update(updater) e mostra o plano ou o resultado.
+    """
+    from components import config_path as find_config, load_config, make_logger, load_db, components
+    path = find_config(config_path)
+    config = load_config(path)
+    logger = make_logger(config)
+    db = load_db(config, logger)
+    installer = Installer(db, **components(config, logger))
+    updater = Updater(db, path, logger, hooks=installer.hooks, manifest=installer.manifest, installer=installer)
+    try:
+        built = update(updater)
+        if pretend:
+            print(installer.describe_plan(built))
+        else:
+            print(f"Pacotes atualizados: {built}")
+    finally:
+        installer.manifest.close()
+        installer.stats.close()
+    return built
+
+
+def update_all(pretend=False, jobs=None, config_path=None):
+    """
+    Comando `pm update`: atualiza todos os pacotes não críticos.
+    """
+    return _run(lambda updater: updater.update_all(pretend=pretend, jobs=jobs), pretend, config_path)
+
+
+def update_group(group_name, pretend=False, jobs=None, config_path=None):
+    """
+    Comando `pm update --group`: atualiza os pacotes de um grupo.
+    """
+    return _run(lambda updater: updater.update_group(group_name, pretend=pretend, jobs=jobs), pretend, config_path)
+
+
+def update_package(package_name, pretend=False, jobs=None, config_path=None):
+    """
+    Comando `pm version-update`: atualiza um pacote e seus dependentes.
+    """
+    return _run(lambda updater: updater.update_package(package_name, pretend=pretend, jobs=jobs), pretend, config_path)
@@ -1,13 +1,28 @@
-import requests
-import datetime
-import yaml
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 from logger import Logger
 
+DEFAULT_STATE_PATH = "/opt/pm/db/version_tracker.json"
+
+
 class VersionTracker:
     """
     Rastreia versões de pacotes instalados e verifica atualizações.
+    As consultas são concorrentes, reaproveitam conexões por host e usam
+    um cache persistente (ETag/Last-Modified e data da última checagem por pacote).
     """
 
+    # Exemplo simplificado: supomos que existe um arquivo online com versão
+    UPSTREAM_URLS = {
+        'gcc': 'https://ftp.gnu.org/gnu/gcc/gcc-latest-version.txt',
+        'vim': 'https://raw.githubusercontent.com/vim/vim/master/version.txt',
+        # Adicione outros pacotes conforme necessário (ou em 'urls' no config)
+    }
+
     def __init__(self, config_path, db, logger: Logger = None):
         """
         config_path: caminho para o arquivo YAML de configuração do tracker
@@ -18,61 +33,156 @@ class VersionTracker:
         self.logger = logger
         self.config_path = config_path
         self.config = self.load_config()
-        self.last_checked = datetime.datetime.now() - datetime.timedelta(days=self.config.get('check_interval_days', 7))
+        self.state_path = self.config.get('state_file', DEFAULT_STATE_PATH)
+        self.state = self.load_state()
+        self._state_lock = threading.Lock()
+        self._hosts = {}
+        self._hosts_lock = threading.Lock()
+        self.session = self._make_session()
 
     def load_config(self):
-        with open(self.config_path, 'r') as f:
-            return yaml.safe_load(f)
+        """
+        Configuração do tracker: a seção version_tracker do config.yaml
+        (ou o arquivo inteiro, se for um YAML só do tracker).
+        """
+        from components import load_config
+        config = load_config(self.config_path)
+        return config.get('version_tracker', config)
+
+    def load_state(self):
+        """
+        Carrega o cache persistente {pacote: {latest, etag, last_modified, last_checked}}.
+        """
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_state(self):
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        tmp = self.state_path + '.tmp'
+        with self._state_lock:
+            with open(tmp, 'w') as f:
+                json.dump(self.state, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.state_path)
+
+    def _make_session(self):
+        """
+        Sessão HTTP compartilhada: o urllib3 mantém um pool de conexões por host.
+        """
+        import requests
+        per_host = self.config.get('connections_per_host', 4)
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=32, pool_maxsize=per_host, pool_block=True)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _host_slot(self, url):
+        """
+        Semáforo por host, para não abrir mais conexões que o pool comporta.
+        """
+        host = urlsplit(url).netloc
+        with self._hosts_lock:
+            slot = self._hosts.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.config.get('connections_per_host', 4))
+                self._hosts[host] = slot
+            return slot
 
-    def check_updates(self):
+    def upstream_url(self, package):
+        urls = dict(self.UPSTREAM_URLS)
+        urls.update(self.config.get('urls') or {})
+        return urls.get(package)
+
+    def _is_due(self, package):
+        """
+        Verifica se o intervalo de checagem do pacote já passou.
+        """
+        entry = self.state.get(package)
+        if not entry or 'last_checked' not in entry:
+            return True
+        interval = self.config.get('check_interval_days', 7) * 86400
+        return time.time() - entry['last_checked'] >= interval
+
+    def check_updates(self, force=False):
         """
         Verifica atualizações de todos os pacotes instalados.
+        Pacotes checados dentro de check_interval_days usam a versão em cache.
         """
-        updates = {}
-        now = datetime.datetime.now()
-        interval = self.config.get('check_interval_days', 7)
-        if (now - self.last_checked).days < interval:
-            return updates  # Não precisa checar ainda
+        packages = list(self.db)
+        due = [pkg for pkg in packages if force or self._is_due(pkg)]
+        if due:
+            workers = max(1, min(self.config.get('max_concurrency', 16), len(due)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(self.get_latest_version, due))
+            self.save_state()
 
-        for pkg, data in self.db.items():
-            latest_version = self.get_latest_version(pkg)
+        updates = {}
+        critical_programs = self.config.get('critical_programs', [])
+        for pkg in packages:
+            data = self.db[pkg]
+            latest_version = self.state.get(pkg, {}).get('latest')
             if latest_version and latest_version != data['version']:
                 updates[pkg] = {
                     'current': data['version'],
                     'latest': latest_version,
-                    'critical': pkg in self.config.get('critical_programs', [])
+                    'critical': pkg in critical_programs
                 }
                 if self.logger:
-                    if pkg in self.config.get('critical_programs', []):
+                    if pkg in critical_programs:
                         self.logger.warning(f"{pkg} possui nova versão: {latest_version} (CRÍTICO)")
                     elif self.config.get('auto_update', False):
                         self.logger.info(f"{pkg} será atualizado automaticamente para {latest_version}")
 
-        self.last_checked = now
         return updates
 
     def get_latest_version(self, package):
         """
         Busca a versão mais recente de um pacote.
         Pode ser via API ou scraping simples (exemplo HTTP).
+        Envia If-None-Match/If-Modified-Since; em 304 usa a versão em cache.
         """
-        # Exemplo simplificado: supomos que existe um arquivo online com versão
-        urls = {
-            'gcc': 'https://ftp.gnu.org/gnu/gcc/gcc-latest-version.txt',
-            'vim': 'https://raw.githubusercontent.com/vim/vim/master/version.txt',
-            # Adicione outros pacotes conforme necessário
-        }
-        url = urls.get(package)
+        import requests
+        url = self.upstream_url(package)
         if not url:
             return None
+        with self._state_lock:
+            entry = dict(self.state.get(package) or {})
+        headers = {}
+        if entry.get('url') == url:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
         try:
-            resp = requests.get(url, timeout=5)
-            if resp.status_code == 200:
-                return resp.text.strip()
+            with self._host_slot(url):
+                resp = self.session.get(url, headers=headers, timeout=self.config.get('timeout', 5))
         except requests.RequestException:
             if self.logger:
                 self.logger.error(f"Falha ao buscar versão de {package}")
-        return None
+            return entry.get('latest')
+
+        if resp.status_code == 304:
+            latest = entry.get('latest')
+        elif resp.status_code == 200:
+            latest = resp.text.strip()
+            entry.update({
+                'url': url,
+                'latest': latest,
+                'etag': resp.headers.get('ETag'),
+                'last_modified': resp.headers.get('Last-Modified'),
+            })
+        else:
+            return entry.get('latest')
+
+        entry['last_checked'] = time.time()
+        with self._state_lock:
+            self.state[package] = entry
+        return latest
 
     def auto_update_packages(self, pm_interface):
         """
@@ -84,3 +194,37 @@ class VersionTracker:
                 pm_interface.update_package(pkg)  # Deve ser implementado no PM
                 if self.logger:
                     self.logger.info(f"{pkg} atualizado automaticamente de {info['current']} para {info['latest']}")
+
+
+def display_updates(force=False, config_path=None):
+    """
+    Comando `pm version-check`: consulta as versões upstream dos pacotes
+    instalados (com o cache e os limites da seção version_tracker) e
+    mostra os que têm versão nova.
+    Retorna {pacote: {current, latest, critical}}.
+    """
+    from components import config_path as find_config, load_config, make_logger, open_manifest
+    path = find_config(config_path)
+    config = load_config(path)
+    logger = make_logger(config)
+    manifest = open_manifest(config, logger)
+    try:
+        installed = {pkg: {'version': manifest.version(pkg)} for pkg in manifest.packages()}
+    finally:
+        manifest.close()
+    updates = VersionTracker(path, installed, logger).check_updates(force=force)
+    if not updates:
+        print("Todos os pacotes estão atualizados.")
+    for pkg, info in sorted(updates.items()):
+        critical = " (crítico)" if info['critical'] else ""
+        print(f"{pkg:<24} {info['current']} -> {info['latest']}{critical}")
+    return updates
+
+
+def update_package(package, pretend=False, jobs=None, config_path=None):
+    """
+    Comando `pm version-update`: atualiza um pacote (e reconstrói seus
+    dependentes) se houver versão nova e ele não for crítico.
+    """
+    from updater import update_package as update
+    return update(package, pretend=pretend, jobs=jobs, config_path=config_path)
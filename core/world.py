@@ -0,0 +1,60 @@
+import os
+import threading
+
+DEFAULT_WORLD_PATH = "/opt/pm/db/world"
+
+
+class World:
+    """
+    Conjunto "world": pacotes pedidos explicitamente pelo usuário.
+    Tudo que não é alcançável a partir dele é considerado órfão.
+    Persistido como um nome de pacote por linha.
+    """
+
+    def __init__(self, path=DEFAULT_WORLD_PATH, installed=None):
+        """
+        installed: pacotes já instalados; se o arquivo ainda não existe, eles
+                   formam o world inicial (instalações feitas antes do world
+                   não podem virar órfãs)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self.packages = self.load()
+        if installed and not self.exists():
+            self.packages = set(installed)
+            self.save()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, 'r') as f:
+            return {line.strip() for line in f if line.strip() and not line.startswith('#')}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            for pkg in sorted(self.packages):
+                f.write(pkg + "\n")
+        os.replace(tmp, self.path)
+
+    def add(self, package):
+        with self._lock:
+            if package not in self.packages:
+                self.packages.add(package)
+                self.save()
+
+    def discard(self, package):
+        with self._lock:
+            if package in self.packages:
+                self.packages.discard(package)
+                self.save()
+
+    def __contains__(self, package):
+        return package in self.packages
+
+    def __iter__(self):
+        return iter(sorted(self.packages))
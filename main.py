@@ -1,18 +1,34 @@
 #!/usr/bin/env python3
+import os
+import sys
 import argparse
-from core import (
-    install,
-    remove,
-    build,
-    search,
-    groups,
-    hooks,
-    dependency,
-    updater,
-    version_tracker,
-    recipe_sync,
-    logger,
-)
+import importlib
+
+CORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "core")
+
+
+def load(module):
+    """
+    Importa um módulo do core só quando o subcomando precisa dele, para
+    que `pm --help` e comandos simples não paguem por requests, yaml etc.
+    """
+    if CORE_DIR not in sys.path:
+        sys.path.insert(0, CORE_DIR)
+    return importlib.import_module(module)
+
+
+def via_daemon(cmd, **args):
+    """
+    Encaminha o comando ao `pm daemon`, se estiver rodando.
+    Retorna True se o daemon atendeu.
+    """
+    response = load("client").request(cmd, **args)
+    if response is None:
+        return False
+    if response.get("output"):
+        print(response["output"])
+    return True
+
 
 def main():
     parser = argparse.ArgumentParser(prog="pm", description="Gerenciador de pacotes completo PM")
@@ -20,9 +36,12 @@ def main():
 
     # ----------------- INSTALL -----------------
     p_install = sub.add_parser("install", aliases=["i"], help="Instala um pacote")
-    p_install.add_argument("package", help="Nome do pacote")
+    p_install.add_argument("package", help="Nome do pacote (ou do grupo, com --group)")
     p_install.add_argument("-b", "--build-only", action="store_true", help="Baixa e compila, não instala")
-    p_install.add_argument("-j", "--jobs", type=int, default=1, help="Número de jobs para compilação")
+    p_install.add_argument("-j", "--jobs", type=int, default=None, help="Total de jobs de compilação (padrão: build.jobs_default)")
+    p_install.add_argument("--binary", action="store_true", help="Instala do repositório binário, sem compilar")
+    p_install.add_argument("-g", "--group", action="store_true", help="Instala todos os pacotes do grupo em um único plano")
+    p_install.add_argument("-p", "--pretend", action="store_true", help="Só mostra o plano de instalação e seu tamanho")
 
     # ----------------- REMOVE -----------------
     p_remove = sub.add_parser("remove", aliases=["rm"], help="Remove um pacote")
@@ -32,13 +51,15 @@ def main():
     # ----------------- BUILD -----------------
     p_build = sub.add_parser("build", aliases=["b"], help="Compila pacotes")
     p_build.add_argument("package", nargs="?", default=None, help="Nome do pacote (ou todos)")
-    p_build.add_argument("-j", "--jobs", type=int, default=1, help="Número de jobs para compilação")
+    p_build.add_argument("-j", "--jobs", type=int, default=None, help="Total de jobs de compilação (padrão: build.jobs_default)")
     p_build.add_argument("--clean", action="store_true", help="Limpa diretórios de trabalho antes de compilar")
+    p_build.add_argument("--export", action="store_true", help="Exporta o resultado como pacote binário para o repositório")
 
     # ----------------- SEARCH -----------------
     p_search = sub.add_parser("search", aliases=["s"], help="Busca pacotes")
     p_search.add_argument("query", nargs="?", default="", help="Nome ou parte do nome")
     p_search.add_argument("-g", "--group", help="Filtra por grupo")
+    p_search.add_argument("--names", action="store_true", help="Mostra só os nomes (completar no shell)")
 
     # ----------------- GROUPS -----------------
     p_groups = sub.add_parser("groups", aliases=["gr"], help="Mostra pacotes por grupo")
@@ -47,6 +68,7 @@ def main():
     # ----------------- HOOKS -----------------
     p_hooks = sub.add_parser("hooks", aliases=["hk"], help="Executa hooks")
     p_hooks.add_argument("type", choices=["pre_build", "post_build", "pre_install", "post_install", "post_remove"], help="Tipo de hook")
+    p_hooks.add_argument("package", nargs="?", default="", help="Pacote passado aos hooks como {program}")
 
     # ----------------- REVDEP -----------------
     p_revdep = sub.add_parser("revdep", aliases=["rd"], help="Ver dependentes de um pacote")
@@ -55,6 +77,8 @@ def main():
     # ----------------- UPDATER -----------------
     p_update = sub.add_parser("update", aliases=["up"], help="Atualiza pacotes opcionais")
     p_update.add_argument("--group", help="Atualiza todos os pacotes de um grupo")
+    p_update.add_argument("-p", "--pretend", action="store_true", help="Só mostra o plano de atualização")
+    p_update.add_argument("-j", "--jobs", type=int, default=None, help="Total de jobs de compilação (padrão: build.jobs_default)")
 
     # ----------------- VERSION TRACKER -----------------
     p_vercheck = sub.add_parser("version-check", aliases=["vc"], help="Mostra pacotes com nova versão")
@@ -70,43 +94,107 @@ def main():
     p_dep = sub.add_parser("dep", aliases=["d"], help="Mostra ordem de build topológica")
     p_dep.add_argument("packages", nargs="+", help="Pacotes para ordenação")
 
+    # ----------------- OWNS -----------------
+    p_owns = sub.add_parser("owns", aliases=["ow"], help="Mostra o pacote dono de um arquivo")
+    p_owns.add_argument("path", help="Caminho do arquivo")
+
+    # ----------------- DAEMON -----------------
+    p_daemon = sub.add_parser("daemon", help="Mantém índices em memória e atende o CLI por um socket Unix")
+    p_daemon.add_argument("-c", "--config", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.yaml"),
+                          help="Arquivo de configuração")
+    p_daemon.add_argument("--socket", default=None, help="Caminho do socket (padrão: daemon.socket do config)")
+    p_daemon.add_argument("--status", action="store_true", help="Mostra o estado do daemon em execução")
+
+    # ----------------- STATS -----------------
+    p_stats = sub.add_parser("stats", aliases=["st"], help="Mostra tempos e uso de recursos dos builds")
+    p_stats.add_argument("package", nargs="?", default=None, help="Histórico de um pacote por versão")
+    p_stats.add_argument("-n", "--limit", type=int, default=10, help="Número de linhas por tabela")
+
     args = parser.parse_args()
 
+    try:
+        return dispatch(parser, args)
+    except load("client").DaemonError as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+
+
+def dispatch(parser, args):
+    """
+    Executa o subcomando, importando só os módulos que ele usa.
+    """
     if args.cmd in ["install", "i"]:
-        install.install(args.package, build_only=args.build_only, jobs=args.jobs)
+        if args.build_only or not via_daemon("install", package=args.package, jobs=args.jobs, binary=args.binary,
+                                             group=args.group, pretend=args.pretend):
+            install = load("install")
+            install.install(args.package, build_only=args.build_only, jobs=args.jobs, binary=args.binary,
+                            group=args.group, pretend=args.pretend)
     elif args.cmd in ["remove", "rm"]:
-        remove.remove(args.package, remove_orphans=args.orphans)
+        if not via_daemon("remove", package=args.package, orphans=args.orphans):
+            remove = load("remove")
+            remove.remove(args.package, remove_orphans=args.orphans)
     elif args.cmd in ["build", "b"]:
-        build.build(args.package, jobs=args.jobs, clean=args.clean)
+        build = load("build")
+        build.build(args.package, jobs=args.jobs, clean=args.clean, export=args.export)
     elif args.cmd in ["search", "s"]:
-        search.search(query=args.query, group=args.group)
+        if not via_daemon("search", query=args.query, group=args.group, names_only=args.names):
+            search = load("search")
+            search.search(query=args.query, group=args.group, names_only=args.names)
     elif args.cmd in ["groups", "gr"]:
-        groups.show(args.group)
+        if not via_daemon("groups", group=args.group):
+            groups = load("groups")
+            groups.show(args.group)
     elif args.cmd in ["hooks", "hk"]:
-        hooks.run_hook(args.type)
+        hooks = load("hooks")
+        hooks.run_hook(args.type, args.package)
     elif args.cmd in ["revdep", "rd"]:
-        dependents = dependency.revdep(args.package)
-        print(f"Pacotes que dependem de {args.package}: {dependents}")
+        if not via_daemon("revdep", package=args.package):
+            dependency = load("dependency")
+            dependents = dependency.revdep(args.package)
+            print(f"Pacotes que dependem de {args.package}: {dependents}")
     elif args.cmd in ["update", "up"]:
+        updater = load("updater")
         if args.group:
-            updater.update_group(args.group)
+            updater.update_group(args.group, pretend=args.pretend, jobs=args.jobs)
         else:
-            updater.check_updates()
+            updater.update_all(pretend=args.pretend, jobs=args.jobs)
     elif args.cmd in ["version-check", "vc"]:
+        version_tracker = load("version_tracker")
         version_tracker.display_updates()
     elif args.cmd in ["version-update", "vu"]:
+        version_tracker = load("version_tracker")
         version_tracker.update_package(args.package)
     elif args.cmd in ["sync-recipes", "sr"]:
+        recipe_sync = load("recipe_sync")
         recipe_sync.sync_all()
     elif args.cmd in ["sync-recipe", "sro"]:
-        recipe = database.find_recipe(args.package)
-        if recipe:
-            recipe_sync.sync_recipe(recipe)
-        else:
-            logger.warn(f"Receita {args.package} não encontrada")
+        if not load("recipe_sync").sync_recipe(args.package):
+            print(f"Receita {args.package} não encontrada no repositório", file=sys.stderr)
+            return 1
     elif args.cmd in ["dep", "d"]:
-        order = dependency.topological_sort(args.packages)
-        print("Ordem de build:", order)
+        if not via_daemon("dep", packages=args.packages):
+            dependency = load("dependency")
+            order = dependency.topological_sort(args.packages)
+            print("Ordem de build:", order)
+    elif args.cmd in ["owns", "ow"]:
+        if not via_daemon("owns", path=os.path.abspath(args.path)):
+            manifest = load("manifest")
+            owner = manifest.owner_of(args.path)
+            if owner:
+                print(f"{args.path} pertence a {owner}")
+            else:
+                print(f"{args.path} não pertence a nenhum pacote")
+    elif args.cmd == "daemon":
+        if args.status:
+            if not via_daemon("status"):
+                print("pm daemon não está rodando")
+                return 1
+        else:
+            daemon = load("daemon")
+            daemon.run(config_path=args.config, socket_path=args.socket)
+    elif args.cmd in ["stats", "st"]:
+        stats = load("stats")
+        stats.show(package=args.package, limit=args.limit)
     else:
         parser.print_help()
 
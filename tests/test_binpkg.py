@@ -0,0 +1,103 @@
+import io
+import os
+import tarfile
+import pytest
+from binpkg import BinaryRepo, PackageVerifyError, create_package, read_info
+from install import Installer
+from manifest import ManifestDB
+
+
+def make_destdir(tmp_path, name, content=None):
+    destdir = tmp_path / "destdir" / name
+    (destdir / "usr" / "bin").mkdir(parents=True)
+    (destdir / "usr" / "bin" / name).write_text(content or f"#!/bin/sh\necho {name}\n")
+    os.symlink(name, destdir / "usr" / "bin" / f"{name}-link")
+    return str(destdir)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """
+    app -> lib -> base, e app depende também de libc (do sistema, fora do repositório).
+    """
+    repo = BinaryRepo(str(tmp_path / "repo"))
+    recipes = {
+        'base': {'name': 'base', 'version': '1.0', 'dependencies': []},
+        'lib': {'name': 'lib', 'version': '2.0', 'dependencies': ['base']},
+        'app': {'name': 'app', 'version': '3.0', 'dependencies': ['lib', 'libc']},
+    }
+    for name, recipe in recipes.items():
+        repo.add(create_package(recipe, make_destdir(tmp_path, name), str(tmp_path / "out")))
+    return repo
+
+
+def installer(repo, tmp_path):
+    manifest = ManifestDB(str(tmp_path / "manifest.db"))
+    return Installer({}, binrepo=repo, manifest=manifest, sandbox_config={'sandbox_dir': str(tmp_path)})
+
+
+def install_system_libc(manifest, tmp_path):
+    staging = tmp_path / "libc"
+    (staging / "lib").mkdir(parents=True)
+    (staging / "lib" / "libc.so").write_text("libc")
+    manifest.install('libc', str(staging), root=str(tmp_path / "root"), version='2.38')
+
+
+def test_package_roundtrip(repo, tmp_path):
+    entry = repo.get('lib')
+    info = read_info(os.path.join(repo.repo_dir, entry['file']))
+    assert info['version'] == '2.0' and info['dependencies'] == ['base']
+    unpacked = repo.unpack('lib', str(tmp_path / "staging"))
+    assert unpacked['name'] == 'lib'
+    assert os.readlink(tmp_path / "staging" / "usr" / "bin" / "lib-link") == "lib"
+    # O índice reconstruído a partir do diretório é o mesmo
+    before = dict(repo.packages())
+    repo.reindex()
+    assert {name: e['sha256'] for name, e in repo.packages().items()} == \
+           {name: e['sha256'] for name, e in before.items()}
+
+
+def test_package_sha256_mismatch(repo, tmp_path):
+    path = os.path.join(repo.repo_dir, repo.get('base')['file'])
+    with open(path, 'ab') as f:
+        f.write(b"lixo")
+    with pytest.raises(PackageVerifyError):
+        repo.unpack('base', str(tmp_path / "staging"))
+
+
+def test_file_sha256_mismatch(repo, tmp_path):
+    # Reempacota com um arquivo alterado e o .PKGINFO original
+    path = os.path.join(repo.repo_dir, repo.get('base')['file'])
+    members = []
+    with tarfile.open(path, 'r:xz') as tar:
+        for member in tar:
+            data = tar.extractfile(member).read() if member.isfile() else None
+            if member.name.endswith("usr/bin/base"):
+                data = b"alterado\n"
+                member.size = len(data)
+            members.append((member, data))
+    with tarfile.open(path, 'w:xz') as tar:
+        for member, data in members:
+            tar.addfile(member, io.BytesIO(data) if data is not None else None)
+    repo.add(path)
+    with pytest.raises(PackageVerifyError, match="usr/bin/base"):
+        repo.unpack('base', str(tmp_path / "staging"))
+
+
+def test_install_binary_order_and_installed_dependency(repo, tmp_path):
+    inst = installer(repo, tmp_path)
+    install_system_libc(inst.manifest, tmp_path)
+    root = str(tmp_path / "root")
+    assert inst.install_binary('app', destdir=root) == ['base', 'lib', 'app']
+    assert os.path.exists(os.path.join(root, "usr", "bin", "app"))
+    assert inst.manifest.version('lib') == '2.0'
+    # Tudo instalado na versão do repositório: nada a fazer
+    assert inst.install_binary('app', destdir=root) == []
+    assert inst.install_binary('app', destdir=root, force=True) == ['base', 'lib', 'app']
+
+
+def test_install_binary_missing_dependency(repo, tmp_path):
+    inst = installer(repo, tmp_path)
+    with pytest.raises(KeyError, match="libc"):
+        inst.install_binary('app', destdir=str(tmp_path / "root"))
+    assert inst.manifest.packages() == []
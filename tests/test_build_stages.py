@@ -0,0 +1,62 @@
+import os
+import shutil
+import tarfile
+import pytest
+from build import Builder
+
+pytestmark = pytest.mark.skipif(not shutil.which("make"), reason="make não disponível")
+
+CONFIGURE = """#!/bin/sh
+for a in "$@"; do case $a in --prefix=*) P=${a#--prefix=};; esac; done
+SRC=$(cd "$(dirname "$0")" && pwd)
+cat > Makefile <<MK
+all:
+\t@echo "PATH=\\$$PATH" > built.txt
+\t@cat $SRC/VERSION >> built.txt
+install:
+\tmkdir -p \\$(DESTDIR)$P/bin && cp built.txt \\$(DESTDIR)$P/bin/
+MK
+"""
+
+
+@pytest.fixture
+def tarball(tmp_path):
+    # Como os tarballs reais: tudo dentro de um diretório de topo
+    src = tmp_path / "src" / "gcc-1.0"
+    src.mkdir(parents=True)
+    (src / "configure").write_text(CONFIGURE)
+    (src / "configure").chmod(0o755)
+    (src / "VERSION").write_text("1.0\n")
+    path = tmp_path / "gcc-1.0.tar.gz"
+    with tarfile.open(path, "w:gz") as tar:
+        tar.add(src, arcname="gcc-1.0")
+    return str(path)
+
+
+def stage(prefix, **extra):
+    return dict({'config_cmd': f"./configure --prefix={prefix}", 'build_cmd': "make -j$(nproc)",
+                 'install_cmd': "make install", 'build_dir': f"build-{prefix.strip('/').replace('/', '-')}"}, **extra)
+
+
+def test_stages_share_tree_with_top_level_dir(tmp_path, tarball):
+    recipe = {'name': 'gcc', 'version': '1.0', 'tarball': tarball,
+              'stages': {'stage1': stage('/mnt/stage1'), 'stage2': stage('/usr')}}
+    dest = tmp_path / "dest"
+    builder = Builder(recipe, sandbox_config={'sandbox_dir': str(tmp_path / "sb")})
+    builder.build(destdir=str(dest), jobs=2)
+
+    built = (dest / "usr" / "bin" / "built.txt").read_text()
+    assert "1.0" in built
+    # O stage1 entra no PATH do stage2 pelo seu prefixo
+    assert os.path.join("stage-root", "stage1", "mnt", "stage1", "bin") in built
+    # Só o último stage vai para o DESTDIR do pacote
+    assert not (dest / "mnt").exists()
+    assert {'stage1/configure', 'stage2/install'} <= set(builder.timings)
+
+
+def test_source_dir_overrides_detection(tmp_path, tarball):
+    recipe = {'name': 'gcc', 'version': '1.0', 'tarball': tarball, 'source_dir': "gcc-1.0",
+              'stages': {'only': stage('/usr')}}
+    dest = tmp_path / "dest"
+    Builder(recipe, sandbox_config={'sandbox_dir': str(tmp_path / "sb")}).build(destdir=str(dest))
+    assert (dest / "usr" / "bin" / "built.txt").exists()
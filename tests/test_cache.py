@@ -0,0 +1,56 @@
+import os
+from cache import BuildCache
+
+SHA = "a" * 64
+
+
+def recipe(**extra):
+    return dict({'name': 'hello', 'version': '1.0', 'sha256': SHA}, **extra)
+
+
+def test_key_covers_build_inputs(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"))
+    patch = tmp_path / "fix.patch"
+    patch.write_text("--- a\n+++ b\n")
+    base = cache.key(recipe(patches=[{'file': str(patch)}]), use_flags=['ssl', 'zlib'])
+    # Mesmas entradas: mesma chave, qualquer que seja a ordem das flags
+    assert cache.key(recipe(patches=[{'file': str(patch)}]), use_flags=['zlib', 'ssl']) == base
+    variants = [
+        cache.key(recipe(version='1.1', patches=[{'file': str(patch)}]), use_flags=['ssl', 'zlib']),
+        cache.key(recipe(sha256="b" * 64, patches=[{'file': str(patch)}]), use_flags=['ssl', 'zlib']),
+        cache.key(recipe(patches=[{'file': str(patch)}]), use_flags=['ssl']),
+        cache.key(recipe(patches=[{'file': str(patch)}]), stage='install', use_flags=['ssl', 'zlib']),
+    ]
+    patch.write_text("--- a\n+++ b\n@@ outro @@\n")
+    # O conteúdo do patch entra na chave, não só o nome do arquivo
+    variants.append(cache.key(recipe(patches=[{'file': str(patch)}]), use_flags=['ssl', 'zlib']))
+    assert len(set(variants + [base])) == len(variants) + 1
+
+
+def test_key_hashes_tarball_without_sha256(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"))
+    tarball = tmp_path / "hello-1.0.tar.gz"
+    tarball.write_bytes(b"um")
+    first = cache.key({'name': 'hello', 'tarball': str(tarball)})
+    tarball.write_bytes(b"dois")
+    assert cache.key({'name': 'hello', 'tarball': str(tarball)}) != first
+
+
+def test_lru_eviction(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"))
+    destdir = tmp_path / "destdir"
+    destdir.mkdir()
+    (destdir / "data").write_bytes(os.urandom(64 * 1024))
+    cache.store('old', str(destdir), package='old')
+    cache.store('used', str(destdir), package='used')
+    entries = cache.index['entries']
+    entries['old']['last_used'], entries['used']['last_used'] = 1, 2
+    assert cache.lookup('old')
+    # Cabem dois artefatos: o menos usado recentemente ('used') sai
+    cache.max_size = entries['old']['size'] * 2 + entries['old']['size'] // 2
+    cache.store('new', str(destdir), package='new')
+    assert sorted(cache.index['entries']) == ['new', 'old']
+    assert not os.path.exists(cache._archive_path('used'))
+    restored = tmp_path / "restored"
+    assert cache.restore('old', str(restored)) and (restored / "data").exists()
+    assert cache.stats()['hits'] == 2
@@ -0,0 +1,63 @@
+import tarfile
+import subprocess
+import pytest
+from build import Builder
+
+
+@pytest.fixture
+def recipe(tmp_path):
+    src = tmp_path / "src" / "hello-1.0"
+    src.mkdir(parents=True)
+    (src / "README").write_text("hello\n")
+    tarball = tmp_path / "hello-1.0.tar.gz"
+    with tarfile.open(tarball, "w:gz") as tar:
+        tar.add(src, arcname="hello-1.0")
+    log = tmp_path / "phases.log"
+    return {'name': 'hello', 'version': '1.0', 'tarball': str(tarball),
+            'config_cmd': f"echo configure >> {log}",
+            'build_cmd': f"test -f {tmp_path / 'ok'} && echo compile >> {log}",
+            # O pm acrescenta DESTDIR=... ao install_cmd
+            'install_cmd': f"echo install >> {log} && true"}
+
+
+def phases(tmp_path):
+    log = tmp_path / "phases.log"
+    lines = log.read_text().split()
+    log.write_text("")
+    return lines
+
+
+def test_resume_after_failed_phase(tmp_path, recipe):
+    config = {'sandbox_dir': str(tmp_path / "sb"), 'work_dir': str(tmp_path / "work")}
+    with pytest.raises(subprocess.CalledProcessError):
+        Builder(recipe, sandbox_config=config).build(destdir=str(tmp_path / "dest"))
+    assert phases(tmp_path) == ["configure"]
+    stamps = tmp_path / "work" / "hello-1.0" / ".pm-stamps"
+    assert sorted(p.name for p in stamps.iterdir()) == ["configured", "extracted", "patched"]
+
+    # A nova tentativa começa na fase que falhou
+    (tmp_path / "ok").touch()
+    Builder(recipe, sandbox_config=config).build(destdir=str(tmp_path / "dest"))
+    assert phases(tmp_path) == ["compile", "install"]
+    # Build concluído: o diretório de trabalho é removido
+    assert not (tmp_path / "work" / "hello-1.0").exists()
+
+
+def test_changed_inputs_invalidate_later_phases(tmp_path, recipe):
+    config = {'sandbox_dir': str(tmp_path / "sb"), 'work_dir': str(tmp_path / "work")}
+    recipe['install_cmd'] = "false"
+    (tmp_path / "ok").touch()
+    with pytest.raises(subprocess.CalledProcessError):
+        Builder(recipe, sandbox_config=config).build(destdir=str(tmp_path / "dest"))
+    assert phases(tmp_path) == ["configure", "compile"]
+
+    # Um build_cmd diferente refaz a compilação, mas não a configuração
+    recipe['build_cmd'] += " && true"
+    with pytest.raises(subprocess.CalledProcessError):
+        Builder(recipe, sandbox_config=config).build(destdir=str(tmp_path / "dest"))
+    assert phases(tmp_path) == ["compile"]
+
+    # clean descarta todo o progresso salvo
+    with pytest.raises(subprocess.CalledProcessError):
+        Builder(recipe, sandbox_config=config).build(destdir=str(tmp_path / "dest"), clean=True)
+    assert phases(tmp_path) == ["configure", "compile"]
@@ -0,0 +1,157 @@
+import os
+import sys
+import shutil
+import tarfile
+import pytest
+import yaml
+from binpkg import BinaryRepo
+from manifest import ManifestDB
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main  # noqa: E402
+
+pytestmark = pytest.mark.skipif(not shutil.which("make"), reason="make não disponível")
+
+# Instala num caminho absoluto dentro do tmp_path: o merge em / não sai do teste
+MAKEFILE = """all:
+\techo hello > hello
+\techo "$$MAKEFLAGS" > makeflags
+install:
+\tmkdir -p $(DESTDIR){prefix} && cp hello makeflags $(DESTDIR){prefix}/
+"""
+
+
+@pytest.fixture
+def pm(tmp_path, monkeypatch):
+    """
+    Roda `pm <args>` sem daemon, com um config.yaml próprio do teste
+    e uma receita hello cujo tarball está em tmp_path.
+    """
+    src = tmp_path / "src" / "hello-1.0"
+    src.mkdir(parents=True)
+    (src / "Makefile").write_text(MAKEFILE.format(prefix=tmp_path / "root"))
+    tarball = tmp_path / "hello-1.0.tar.gz"
+    with tarfile.open(tarball, "w:gz") as tar:
+        tar.add(src, arcname="hello-1.0")
+    recipes = tmp_path / "recipes"
+    recipes.mkdir()
+    (recipes / "hello.yaml").write_text(f"name: hello\nversion: '1.0'\ngroup: demo\ntarball: {tarball}\n"
+                                        "build_cmd: make -j8\n")
+    config = {
+        'directories': {name: str(tmp_path / name) for name in ('packages_dir', 'logs_dir', 'sandbox_dir', 'db_dir')},
+        'binary': {'repo_dir': str(tmp_path / "binrepo")},
+        'cache': {'enable': False},
+        'build': {'jobs_default': 2},
+    }
+    config['directories']['recipes_dir'] = str(recipes)
+    config_path = tmp_path / "config.yaml"
+    monkeypatch.setenv("PM_CONFIG", str(config_path))
+    monkeypatch.setenv("PM_SOCKET", str(tmp_path / "pm.sock"))
+
+    def run(*args):
+        config_path.write_text(yaml.safe_dump(run.config))
+        monkeypatch.setattr(sys, "argv", ["pm", *args])
+        return main.main()
+    run.config = config
+    return run
+
+
+def test_build_export_then_install_binary(pm, tmp_path, capsys):
+    pm("build", "hello", "--export")
+    assert "Pacotes compilados: ['hello']" in capsys.readouterr().out
+    assert (tmp_path / "packages_dir" / "built" / "hello-1.0" / str(tmp_path / "root").lstrip("/") / "hello").exists()
+    assert BinaryRepo(str(tmp_path / "binrepo")).get('hello')['version'] == '1.0'
+    # Nada foi instalado pelo build
+    assert not (tmp_path / "root").exists()
+
+    pm("install", "--binary", "hello")
+    assert "Pacotes instalados: ['hello']" in capsys.readouterr().out
+    assert (tmp_path / "root" / "hello").read_text() == "hello\n"
+    assert ManifestDB(str(tmp_path / "db_dir" / "manifest.db")).version('hello') == '1.0'
+
+
+def test_install_from_source(pm, tmp_path, capsys):
+    pm("install", "hello")
+    assert "Pacotes instalados: ['hello']" in capsys.readouterr().out
+    assert (tmp_path / "root" / "hello").exists()
+
+
+def test_install_pretend_shows_plan(pm, tmp_path, capsys):
+    pm("install", "hello", "--pretend")
+    out = capsys.readouterr().out
+    assert "hello" in out and "1.0 (novo)" in out and "Total: 1 pacote(s)" in out
+    assert not (tmp_path / "root").exists()
+
+
+def test_install_group(pm, tmp_path, capsys):
+    pm("install", "--group", "demo", "--pretend")
+    assert "Total: 1 pacote(s)" in capsys.readouterr().out
+    assert not (tmp_path / "root").exists()
+    pm("install", "--group", "demo")
+    assert "Pacotes instalados: ['hello']" in capsys.readouterr().out
+    assert (tmp_path / "root" / "hello").exists()
+    # Já instalado na versão da receita: o plano fica vazio
+    pm("install", "-g", "demo", "-p")
+    assert "Total: 0 pacote(s)" in capsys.readouterr().out
+
+
+def test_update_rebuilds_package_with_new_version(pm, tmp_path, http_server, capsys):
+    http_server.routes["/hello"] = lambda headers: (200, {}, b"2.0\n")
+    pm.config['version_tracker'] = {'state_file': str(tmp_path / "tracker.json"),
+                                    'urls': {'hello': http_server.url("/hello")}}
+    pm("install", "hello")
+    capsys.readouterr()
+
+    pm("update", "--pretend")
+    out = capsys.readouterr().out
+    assert "hello" in out and "Total: 1 pacote(s)" in out
+    pm("update", "--group", "other", "-p")
+    assert "Total: 0 pacote(s)" in capsys.readouterr().out
+
+    (tmp_path / "root" / "hello").unlink()
+    pm("update", "--group", "demo")
+    assert "Pacotes atualizados: ['hello']" in capsys.readouterr().out
+    assert (tmp_path / "root" / "hello").exists()
+    # A checagem de versões é feita uma vez por intervalo
+    assert http_server.hits("/hello") == 1
+
+
+@pytest.mark.parametrize("args, jobs", [(("build", "hello"), 2), (("build", "hello", "-j", "3"), 3),
+                                        (("install", "hello"), 2), (("install", "hello", "-j", "3"), 3)])
+def test_jobs_reach_make_through_jobserver(pm, tmp_path, args, jobs):
+    pm(*args)
+    prefix = tmp_path / "root"
+    if args[0] == "build":
+        prefix = tmp_path / "packages_dir" / "built" / "hello-1.0" / str(prefix).lstrip("/")
+    # O -j8 da receita dá lugar ao jobserver do pm
+    flags = (prefix / "makeflags").read_text().split()
+    assert f"-j{jobs}" in flags and "-j8" not in flags
+
+
+def test_version_check_and_update(pm, tmp_path, http_server, capsys):
+    http_server.routes["/hello"] = lambda headers: (200, {"ETag": '"v2"'}, b"2.0\n")
+    pm.config['version_tracker'] = {'state_file': str(tmp_path / "tracker.json"), 'max_concurrency': 2,
+                                    'urls': {'hello': http_server.url("/hello")}}
+    pm("version-check")
+    assert "Todos os pacotes estão atualizados." in capsys.readouterr().out
+    assert http_server.hits("/hello") == 0
+
+    pm("install", "hello")
+    capsys.readouterr()
+    pm("vc")
+    assert any(line.split() == ["hello", "1.0", "->", "2.0"] for line in capsys.readouterr().out.splitlines())
+    assert (tmp_path / "tracker.json").exists()
+
+    pm("vu", "hello")
+    assert "Pacotes atualizados: ['hello']" in capsys.readouterr().out
+    # O resultado da checagem anterior foi reaproveitado do state_file
+    assert http_server.hits("/hello") == 1
+
+
+def test_jobs_default_zero_uses_one_job_per_cpu(pm, tmp_path):
+    pm.config['build'] = {'jobs_default': 0}
+    pm("build", "hello")
+    prefix = tmp_path / "packages_dir" / "built" / "hello-1.0" / str(tmp_path / "root").lstrip("/")
+    assert f"-j{os.cpu_count()}" in (prefix / "makeflags").read_text().split()
+    # O build não abre o banco de manifestos
+    assert not (tmp_path / "db_dir" / "manifest.db").exists()
@@ -0,0 +1,125 @@
+import os
+import sys
+import shutil
+import subprocess
+import pytest
+import yaml
+from manifest import ManifestDB
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main  # noqa: E402
+
+RECIPES = {
+    'hello': "name: hello\nversion: '1.0'\ngroup: demo\ndescription: saudação\ndependencies: [zlib]\n",
+    'zlib': "name: zlib\nversion: '1.3'\ngroup: libs\ndescription: compressão\n",
+}
+
+
+@pytest.fixture
+def pm(tmp_path, monkeypatch):
+    """
+    Roda `pm <args>` sem daemon com um config.yaml temporário ($PM_CONFIG);
+    nenhum caminho padrão (/opt/pm) é usado.
+    """
+    recipes = tmp_path / "recipes"
+    recipes.mkdir()
+    for name, text in RECIPES.items():
+        (recipes / f"{name}.yaml").write_text(text)
+    config = {'directories': {'recipes_dir': str(recipes), 'db_dir': str(tmp_path / "db"),
+                              'logs_dir': str(tmp_path / "logs")}}
+    config_path = tmp_path / "config.yaml"
+    monkeypatch.setenv("PM_CONFIG", str(config_path))
+    monkeypatch.setenv("PM_SOCKET", str(tmp_path / "pm.sock"))
+
+    def run(*args):
+        config_path.write_text(yaml.safe_dump(run.config))
+        monkeypatch.setattr(sys, "argv", ["pm", *args])
+        return main.main()
+    run.config = config
+    return run
+
+
+def install(tmp_path, name):
+    staging = tmp_path / "staging" / name
+    (staging / "usr" / "lib").mkdir(parents=True)
+    (staging / "usr" / "lib" / f"lib{name}.so").write_text(name)
+    manifest = ManifestDB(str(tmp_path / "db" / "manifest.db"))
+    manifest.install(name, str(staging), root=str(tmp_path / "root"), version='1')
+    manifest.close()
+
+
+def test_search_and_dep_use_config(pm, tmp_path, capsys):
+    pm("search", "hel")
+    out = capsys.readouterr().out
+    assert "hello" in out and "Nenhum pacote encontrado." not in out
+    assert (tmp_path / "db" / "catalog.db").exists()
+    pm("dep", "hello")
+    assert capsys.readouterr().out.strip() == "Ordem de build: ['zlib', 'hello']"
+
+
+def test_owns(pm, tmp_path, capsys):
+    pm("owns", str(tmp_path / "root" / "usr" / "lib" / "libzlib.so"))
+    assert "não pertence a nenhum pacote" in capsys.readouterr().out
+    assert not (tmp_path / "db" / "manifest.db").exists()
+    install(tmp_path, 'zlib')
+    pm("owns", str(tmp_path / "root" / "usr" / "lib" / "libzlib.so"))
+    assert capsys.readouterr().out.strip().endswith("pertence a zlib")
+
+
+def test_revdep_only_lists_installed(pm, tmp_path, capsys):
+    install(tmp_path, 'zlib')
+    pm("revdep", "zlib")
+    assert capsys.readouterr().out.strip() == "Pacotes que dependem de zlib: []"
+    install(tmp_path, 'hello')
+    pm("rd", "zlib")
+    assert capsys.readouterr().out.strip() == "Pacotes que dependem de zlib: ['hello']"
+
+
+def test_groups(pm, capsys):
+    pm("groups")
+    assert capsys.readouterr().out.splitlines() == ["demo: hello", "libs: zlib"]
+    pm("groups", "libs")
+    assert capsys.readouterr().out.strip() == "libs: zlib"
+
+
+def test_hooks(pm, tmp_path):
+    out = tmp_path / "hooks.txt"
+    pm.config['hooks'] = {'post_install': [f"echo {{program}} >> {out}",
+                                           {'name': 'ldconfig', 'cmd': f"echo trigger >> {out}",
+                                            'transaction': True}]}
+    pm("hooks", "post_install", "hello")
+    assert out.read_text().splitlines() == ["hello", "trigger"]
+
+
+@pytest.mark.skipif(not shutil.which("git"), reason="git não disponível")
+def test_sync_recipes(pm, tmp_path, capsys):
+    def git(*args, cwd):
+        subprocess.run(["git", "-c", "user.name=pm", "-c", "user.email=pm@localhost", *args],
+                       cwd=cwd, check=True, capture_output=True)
+
+    remote = tmp_path / "remote"
+    remote.mkdir()
+    (remote / "gzip.yaml").write_text("name: gzip\nversion: '1.0'\n")
+    (remote / "tar.yaml").write_text("name: tar\nversion: '1.0'\n")
+    git("init", "-q", cwd=remote)
+    git("add", ".", cwd=remote)
+    git("commit", "-qm", "receitas", cwd=remote)
+    recipes = tmp_path / "synced"
+    pm.config['directories']['recipes_dir'] = str(recipes)
+    pm.config['recipes'] = {'sync_method': 'git', 'repo_url': str(remote)}
+
+    pm("sync-recipes")
+    assert (recipes / "gzip.yaml").exists()
+    pm("search", "gzip")
+    assert "gzip" in capsys.readouterr().out
+
+    for name in ("gzip", "tar"):
+        (remote / f"{name}.yaml").write_text(f"name: {name}\nversion: '2.0'\n")
+    git("commit", "-qam", "versão 2", cwd=remote)
+    pm("sync-recipe", "gzip")
+    # Só a receita pedida é atualizada
+    assert "2.0" in (recipes / "gzip.yaml").read_text()
+    assert "1.0" in (recipes / "tar.yaml").read_text()
+    assert pm("sro", "inexistente") == 1
+    pm("sr")
+    assert "2.0" in (recipes / "tar.yaml").read_text()
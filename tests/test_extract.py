@@ -0,0 +1,43 @@
+import io
+import tarfile
+import pytest
+from extract import Extractor, UnsafeArchiveError
+
+
+def member(name, kind=tarfile.REGTYPE, linkname=''):
+    info = tarfile.TarInfo(name)
+    info.type = kind
+    info.linkname = linkname
+    return info
+
+
+@pytest.mark.parametrize("name", ["../escape", "src/../../escape", "/etc/passwd"])
+def test_check_member_refuses_paths_outside_dest(tmp_path, name):
+    with pytest.raises(UnsafeArchiveError):
+        Extractor()._check_member(member(name), str(tmp_path.resolve()))
+
+
+@pytest.mark.parametrize("kind, linkname", [(tarfile.SYMTYPE, "/etc/passwd"), (tarfile.SYMTYPE, "../../etc"),
+                                            (tarfile.LNKTYPE, "../outside")])
+def test_check_member_refuses_links_outside_dest(tmp_path, kind, linkname):
+    with pytest.raises(UnsafeArchiveError):
+        Extractor()._check_member(member("src/link", kind, linkname), str(tmp_path.resolve()))
+
+
+def test_check_member_accepts_paths_inside_dest(tmp_path):
+    extractor = Extractor()
+    for info in (member("src/./a/../b"), member("src/link", tarfile.SYMTYPE, "../src/b"),
+                 member("src/hard", tarfile.LNKTYPE, "src/b")):
+        extractor._check_member(info, str(tmp_path.resolve()))
+
+
+def test_unsafe_archive_is_not_extracted(tmp_path):
+    data = io.BytesIO()
+    with tarfile.open(fileobj=data, mode="w:gz") as tar:
+        tar.addfile(member("../escape"), io.BytesIO())
+    archive = tmp_path / "evil.tar.gz"
+    archive.write_bytes(data.getvalue())
+    dest = tmp_path / "dest"
+    with pytest.raises(UnsafeArchiveError):
+        Extractor(threaded=False).extract(str(archive), str(dest))
+    assert not (tmp_path / "escape").exists()
@@ -0,0 +1,54 @@
+import hashlib
+import pytest
+from fetch import Fetcher, ChecksumError
+
+BODY = b"conteudo do tarball" * 100
+
+
+class Warnings:
+    def __init__(self):
+        self.messages = []
+
+    def warning(self, message):
+        self.messages.append(message)
+
+    def info(self, message):
+        pass
+
+
+@pytest.fixture
+def server(http_server):
+    http_server.routes['/pkg-1.0.tar.gz'] = lambda headers: (200, {}, BODY)
+    return http_server
+
+
+def recipe(server, sha256):
+    return {'name': 'pkg', 'urls': {'tarball': server.url('/pkg-1.0.tar.gz')}, 'sha256': sha256}
+
+
+def test_without_checksum_reuses_distfile_and_warns(server, tmp_path):
+    logger = Warnings()
+    fetcher = Fetcher(str(tmp_path / "distfiles"), logger=logger, verify_sha256=False)
+    first = fetcher.fetch(recipe(server, "<sha256-do-tarball>"))
+    second = fetcher.fetch(recipe(server, "<sha256-do-tarball>"))
+    assert first == second
+    assert open(first, 'rb').read() == BODY
+    assert server.hits('/pkg-1.0.tar.gz') == 1
+    assert logger.messages and "sem sha256" in logger.messages[0]
+
+
+def test_without_checksum_fails_when_verification_required(server, tmp_path):
+    fetcher = Fetcher(str(tmp_path / "distfiles"), verify_sha256=True)
+    with pytest.raises(ChecksumError):
+        fetcher.fetch(recipe(server, "<sha256-do-tarball>"))
+    assert server.hits('/pkg-1.0.tar.gz') == 0
+
+
+def test_with_checksum_downloads_once(server, tmp_path):
+    fetcher = Fetcher(str(tmp_path / "distfiles"))
+    sha = hashlib.sha256(BODY).hexdigest()
+    fetcher.fetch(recipe(server, sha))
+    fetcher.fetch(recipe(server, sha))
+    assert server.hits('/pkg-1.0.tar.gz') == 1
+    with pytest.raises(ChecksumError):
+        Fetcher(str(tmp_path / "other")).fetch(recipe(server, "0" * 64))
@@ -0,0 +1,35 @@
+from hooks import Hooks
+
+
+def make_hooks(out):
+    ldconfig = {'name': 'ldconfig', 'cmd': f"sleep 0.2; echo ldconfig {{programs}} >> {out}", 'transaction': True}
+    return Hooks({
+        'post_install': [
+            f"echo pacote {{program}} >> {out}",
+            ldconfig,
+            {'name': 'icons', 'cmd': f"echo icons >> {out}", 'transaction': True, 'after': ['ldconfig']},
+            {'name': 'fonts', 'cmd': f"echo fonts >> {out}", 'transaction': True},
+        ],
+        'post_remove': [ldconfig],
+    }, max_parallel=2)
+
+
+def test_triggers_run_once_per_transaction_in_waves(tmp_path):
+    out = tmp_path / "hooks.txt"
+    hooks = make_hooks(out)
+    with hooks.transaction():
+        hooks.run('post_install', 'a')
+        with hooks.transaction():
+            hooks.run('post_install', 'b')
+            hooks.run('post_remove', 'c')
+        # A transação aninhada não dispara os triggers
+        assert out.read_text().splitlines() == ["pacote a", "pacote b"]
+    # ldconfig uma vez para os três pacotes; fonts roda em paralelo com ele
+    # e icons só depois dele
+    assert out.read_text().splitlines() == ["pacote a", "pacote b", "fonts", "ldconfig a b c", "icons"]
+
+
+def test_trigger_outside_transaction_runs_immediately(tmp_path):
+    out = tmp_path / "hooks.txt"
+    make_hooks(out).run('post_remove', 'c')
+    assert out.read_text().splitlines() == ["ldconfig c"]
@@ -0,0 +1,39 @@
+import os
+from manifest import ManifestDB
+
+
+def stage(tmp_path, files):
+    staging = tmp_path / "staging"
+    for path in files:
+        (staging / path).parent.mkdir(parents=True, exist_ok=True)
+        (staging / path).write_text(path)
+    return str(staging)
+
+
+def test_remove_keeps_directories_the_package_did_not_create(tmp_path):
+    root = tmp_path / "root"
+    # Diretório de sistema vazio que já existia antes do pacote
+    (root / "usr" / "share" / "man" / "man5").mkdir(parents=True)
+    manifest = ManifestDB(str(tmp_path / "manifest.db"))
+    manifest.install('foo', stage(tmp_path, ["usr/share/foo/data/a.txt", "usr/share/man/man5/foo.5"]),
+                     root=str(root), version='1')
+    assert manifest.dirs('foo') == [str(root / "usr/share/foo"), str(root / "usr/share/foo/data")]
+
+    manifest.remove('foo')
+    assert not (root / "usr" / "share" / "foo").exists()
+    assert (root / "usr" / "share" / "man" / "man5").is_dir()
+    assert manifest.dirs('foo') == []
+    manifest.close()
+
+
+def test_delete_paths_stays_inside_root(tmp_path):
+    root = tmp_path / "usr" / "local"
+    sibling = tmp_path / "usr" / "local2" / "lib"
+    sibling.mkdir(parents=True)
+    (root / "lib").mkdir(parents=True)
+    manifest = ManifestDB(str(tmp_path / "manifest.db"))
+    manifest.delete_paths([], str(root), [str(sibling), str(root), str(root / "lib")])
+    # /usr/local2 não está dentro de /usr/local, e o próprio root fica
+    assert sibling.is_dir() and root.is_dir()
+    assert not (root / "lib").exists()
+    manifest.close()
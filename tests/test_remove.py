@@ -0,0 +1,119 @@
+import os
+import pytest
+import yaml
+import remove
+import dependency
+from daemon import PMDaemon
+from manifest import ManifestDB
+from remove import Remover
+from world import World
+
+# c depende de a, mas só a e b estão instalados
+RECIPES = {
+    'a': "name: a\nversion: '1'\n",
+    'b': "name: b\nversion: '1'\n",
+    'c': "name: c\nversion: '1'\ndependencies: [a]\n",
+}
+
+
+def install(manifest, tmp_path, name):
+    staging = tmp_path / "staging" / name
+    (staging / "usr" / "share" / name).mkdir(parents=True)
+    (staging / "usr" / "share" / name / "README").write_text(name)
+    manifest.install(name, str(staging), root=str(tmp_path / "root"), version='1')
+
+
+def system(tmp_path, world=('b',)):
+    """
+    Receitas a, b e c com a e b instalados; world=None não cria o arquivo world.
+    Retorna o config.
+    """
+    recipes = tmp_path / "recipes"
+    recipes.mkdir()
+    for name, text in RECIPES.items():
+        (recipes / f"{name}.yaml").write_text(text)
+    db_dir = tmp_path / "db"
+    manifest = ManifestDB(str(db_dir / "manifest.db"))
+    for name in ('a', 'b'):
+        install(manifest, tmp_path, name)
+    manifest.close()
+    if world is not None:
+        for name in world:
+            World(str(db_dir / "world")).add(name)
+    return {'directories': {'recipes_dir': str(recipes), 'db_dir': str(db_dir), 'logs_dir': str(tmp_path / "logs"),
+                            'packages_dir': str(tmp_path / "packages"), 'sandbox_dir': str(tmp_path / "sb")},
+            'cache': {'enable': False}}
+
+
+def write_config(tmp_path, config):
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.safe_dump(config))
+    return str(path)
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    pm = PMDaemon(system(tmp_path), socket_path=str(tmp_path / "pm.sock"))
+    yield pm
+    pm.shutdown()
+
+
+def test_uninstalled_dependent_does_not_block_removal(daemon, tmp_path):
+    response = daemon.handle('remove', {'package': 'a'})
+    assert response['ok'] and response['result'] is True
+    assert not (tmp_path / "root" / "usr" / "share" / "a").exists()
+
+
+def test_orphan_sweep_only_sees_installed_packages(daemon, tmp_path):
+    # a não está no world nem é dependência de b; c nunca foi instalado
+    response = daemon.handle('remove', {'package': 'b', 'orphans': True})
+    assert response['ok'] and response['result'] is True
+    assert response['output'].endswith("Órfãos removidos: ['a']")
+    assert daemon.state.installed == set()
+
+
+def test_remover_uses_manifest_as_installed_set(tmp_path):
+    manifest = ManifestDB(str(tmp_path / "manifest.db"))
+    install(manifest, tmp_path, 'a')
+    db = {name: {'name': name, 'dependencies': ['a'] if name == 'c' else []} for name in RECIPES}
+    remover = Remover(db, world=set(), manifest=manifest, install_root=str(tmp_path / "root"))
+    assert remover.remove_orphans() == ['a']
+    assert remover.remove_package('c') is False
+    manifest.close()
+
+
+def test_remove_entry_point(tmp_path, capsys):
+    config_path = write_config(tmp_path, system(tmp_path))
+    assert remove.remove('a', config_path=config_path) is True
+    assert "a removido" in capsys.readouterr().out.splitlines()
+    assert remove.remove('a', config_path=config_path) is False
+    assert remove.remove('b', remove_orphans=True, config_path=config_path) is True
+    assert "Órfãos removidos: []" in capsys.readouterr().out.splitlines()
+    assert not (tmp_path / "root" / "usr" / "share" / "b").exists()
+
+
+def test_missing_world_is_seeded_from_manifest(tmp_path, capsys):
+    # Instalações feitas antes de existir o arquivo world não viram órfãs
+    config_path = write_config(tmp_path, system(tmp_path, world=None))
+    assert remove.remove('b', remove_orphans=True, config_path=config_path) is True
+    assert "Órfãos removidos: []" in capsys.readouterr().out.splitlines()
+    assert (tmp_path / "root" / "usr" / "share" / "a").exists()
+    assert set(World(str(tmp_path / "db" / "world"))) == {'a'}
+
+
+def test_orphan_sweep_refused_without_world_file(tmp_path):
+    manifest = ManifestDB(str(tmp_path / "manifest.db"))
+    install(manifest, tmp_path, 'a')
+    db = {'a': {'name': 'a', 'dependencies': []}}
+    remover = Remover(db, world=World(str(tmp_path / "world")), manifest=manifest)
+    assert remover.remove_orphans() == []
+    assert manifest.packages() == ['a']
+    manifest.close()
+
+
+def test_daemon_revdep_matches_cli(daemon, tmp_path, capsys):
+    # c depende de a, mas não está instalado
+    response = daemon.handle('revdep', {'package': 'a'})
+    assert response['ok'] and response['result'] == []
+    config_path = write_config(tmp_path, daemon.config)
+    assert dependency.revdep('a', config_path=config_path) == []
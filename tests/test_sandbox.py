@@ -0,0 +1,34 @@
+import os
+from sandbox import Sandbox, TmpfsBudget
+
+
+def test_spills_to_disk_when_budget_is_used(tmp_path):
+    # Um diretório comum faz o papel do tmpfs: só o orçamento importa
+    config = {'tmpfs_dir': str(tmp_path / "tmpfs"), 'tmpfs_budget_mb': 100, 'sandbox_dir': str(tmp_path / "disk")}
+    first, second, third = Sandbox(config), Sandbox(config), Sandbox(config)
+    first.create(size_mb=60)
+    assert first.on_tmpfs and os.path.dirname(first.base_path) == config['tmpfs_dir']
+    # 60 + 60 passa do orçamento: o segundo vai para o disco
+    second.create(size_mb=60)
+    assert not second.on_tmpfs and os.path.dirname(second.base_path) == config['sandbox_dir']
+    assert TmpfsBudget.used(config['tmpfs_dir']) == 60
+
+    # Liberada a reserva do primeiro, o próximo volta a caber em RAM
+    first.clean()
+    assert not os.path.exists(first.base_path)
+    third.create(size_mb=60)
+    assert third.on_tmpfs and TmpfsBudget.used(config['tmpfs_dir']) == 60
+    second.clean()
+    third.clean()
+    assert TmpfsBudget.used(config['tmpfs_dir']) == 0
+
+
+def test_persistent_work_dir_resumes_where_it_was(tmp_path):
+    config = {'tmpfs_dir': str(tmp_path / "tmpfs"), 'tmpfs_budget_mb': 50, 'work_dir': str(tmp_path / "work")}
+    sandbox = Sandbox(config)
+    # Não cabe no tmpfs: o diretório de trabalho fica em disco
+    assert sandbox.create('big-1.0', size_mb=80) == os.path.join(config['work_dir'], 'big-1.0')
+    sandbox.release()
+    # Mesmo cabendo agora, a retomada continua no disco, onde está o progresso
+    assert Sandbox(config).create('big-1.0', size_mb=10) == os.path.join(config['work_dir'], 'big-1.0')
+    assert TmpfsBudget.used(config['tmpfs_dir']) == 0
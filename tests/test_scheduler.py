@@ -0,0 +1,103 @@
+import threading
+import time
+import pytest
+from scheduler import BuildScheduler, PipelineScheduler, BuildFailed
+
+
+def run_in_thread(fn):
+    """
+    Roda fn numa thread daemon: um scheduler travado não trava a suíte.
+    """
+    result = {}
+
+    def target():
+        try:
+            result['value'] = fn()
+        except Exception as error:
+            result['error'] = error
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread, result
+
+
+def test_dag_order_and_parallel_jobs():
+    graph = {'app': ['libb', 'libc'], 'libb': ['liba'], 'libc': ['liba'], 'liba': [], 'tool': []}
+    started, lock = [], threading.Lock()
+
+    def build(pkg, jobs):
+        with lock:
+            started.append((pkg, jobs))
+        time.sleep(0.05)
+    built = BuildScheduler(graph, jobs=4).run(build)
+    assert sorted(built) == sorted(graph)
+    for pkg, deps in graph.items():
+        assert all(built.index(dep) < built.index(pkg) for dep in deps)
+    # Os dois pacotes prontos no início dividem o orçamento de jobs
+    assert sorted(started[:2]) == [('liba', 2), ('tool', 2)]
+
+
+def test_failure_drains_running_builds():
+    graph = {'bad': [], 'slow': [], 'after_bad': ['bad'], 'after_slow': ['slow']}
+    built = []
+
+    def build(pkg, jobs):
+        if pkg == 'bad':
+            raise RuntimeError("erro de compilação")
+        time.sleep(0.2)
+        built.append(pkg)
+    with pytest.raises(BuildFailed) as failure:
+        BuildScheduler(graph, jobs=2).run(build)
+    # O build em andamento termina; nenhum build novo é iniciado depois da falha
+    assert failure.value.package == 'bad' and failure.value.built == ['slow']
+    assert built == ['slow']
+
+
+def test_pipeline_back_pressure():
+    graph = {'a': [], 'b': ['a'], 'c': ['b'], 'd': ['c'], 'e': ['d']}
+    fetched, installed = [], []
+    gate = threading.Event()
+
+    def build(pkg, jobs):
+        if pkg == 'a':
+            gate.wait(5)
+    scheduler = PipelineScheduler(graph, jobs=1, fetch_ahead=1, prepare_ahead=1)
+    thread, result = run_in_thread(lambda: scheduler.run(lambda pkg: fetched.append(pkg), lambda pkg, tarball: None,
+                                                         build, installed.append))
+    deadline = time.monotonic() + 5
+    while len(fetched) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.2)
+    # a compila, b espera preparado (prepare_ahead) e c espera baixado (fetch_ahead)
+    assert fetched == ['a', 'b', 'c']
+    gate.set()
+    thread.join(5)
+    assert result['value'] == installed == ['a', 'b', 'c', 'd', 'e']
+
+
+def test_pipeline_failure_aborts_prepared():
+    graph = {'a': [], 'b': [], 'c': [], 'd': []}
+    prepared, built, installed, aborted = [], [], [], []
+
+    def build(pkg, jobs):
+        built.append(pkg)
+        if pkg == 'a':
+            raise RuntimeError("falhou")
+    scheduler = PipelineScheduler(graph, jobs=1, prepare_ahead=2)
+    with pytest.raises(BuildFailed) as failure:
+        scheduler.run(lambda pkg: pkg, lambda pkg, tarball: prepared.append(pkg), build, installed.append,
+                      abort_fn=aborted.append)
+    assert failure.value.package == 'a' and 'a' not in installed
+    # Todo pacote preparado é compilado ou descartado com abort_fn, nunca os dois
+    assert sorted(built + aborted) == sorted(prepared)
+
+
+def test_pipeline_cycle_with_full_prepare_queue_fails():
+    # a e b ocupam as vagas de prepare_ahead e nunca podem compilar; c fica esperando vaga
+    graph = {'a': ['b'], 'b': ['a'], 'c': []}
+    scheduler = PipelineScheduler(graph, jobs=1, prepare_ahead=2)
+    thread, result = run_in_thread(lambda: scheduler.run(lambda pkg: pkg, lambda pkg, tarball: None,
+                                                         lambda pkg, jobs: None, lambda pkg: None))
+    thread.join(5)
+    assert not thread.is_alive()
+    assert isinstance(result['error'], BuildFailed)
+    assert "dependências não satisfeitas" in str(result['error'])
@@ -0,0 +1,47 @@
+import pytest
+from catalog import RecipeCatalog
+from search import find, match
+
+RECIPES = {
+    'gcc': ("devel", "GNU compiler collection"),
+    'gcc-libs': ("libs", "Bibliotecas de runtime do GCC"),
+    'libgcc': ("libs", "Runtime mínimo"),
+    'clang': ("devel", "Compilador C compatível com gcc"),
+    'firefox': ("www", "Navegador web"),
+    'zlib': ("libs", "Biblioteca de compressão"),
+}
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    recipes = tmp_path / "recipes"
+    recipes.mkdir()
+    for name, (group, description) in RECIPES.items():
+        (recipes / f"{name}.yaml").write_text(f"name: {name}\nversion: '1.0'\ngroup: {group}\n"
+                                              f"description: {description}\n")
+    catalog = RecipeCatalog(str(recipes), str(tmp_path / "catalog.db"))
+    yield catalog
+    catalog.close()
+
+
+def names(results):
+    return [entry[0] for entry in results]
+
+
+def test_ranking(catalog):
+    # Nome exato > prefixo > trecho do nome > descrição
+    assert names(find(catalog, "gcc")) == ['gcc', 'gcc-libs', 'libgcc', 'clang']
+    assert names(find(catalog, "gcc", group="libs")) == ['gcc-libs', 'libgcc']
+
+
+def test_typos_only_when_nothing_matches(catalog):
+    assert names(find(catalog, "firefx")) == ['firefox']
+    assert names(find(catalog, "navegadr")) == ['firefox']
+    assert find(catalog, "xyzzy") == []
+    # Com algum resultado contendo a consulta, os parecidos não entram
+    assert names(find(catalog, "runtime")) == ['gcc-libs', 'libgcc']
+
+
+@pytest.mark.parametrize("query", ["gcc", "lib", "compil", "firefx", "runtime do", "ab"])
+def test_index_matches_full_scan(catalog, query):
+    assert find(catalog, query) == match(catalog.entries(), query)
@@ -0,0 +1,84 @@
+import pytest
+from graph import CycleError
+from solver import Solver, ResolutionError, parse_version
+
+
+def recipe(build=(), runtime=()):
+    return {'version': '1', 'dependencias_build': list(build), 'dependencias_runtime': list(runtime)}
+
+
+@pytest.mark.parametrize("roots", [['a'], ['b'], ['a', 'b'], ['b', 'a']])
+def test_cycle_through_runtime_edge_is_broken_for_any_root(roots):
+    # a -runtime-> b -build-> a: a precisa vir antes de b
+    db = {'a': recipe(runtime=['b']), 'b': recipe(build=['a'])}
+    solution = Solver(db).solve(roots)
+    assert solution.order == ['a', 'b']
+    assert solution.graph == {'a': [], 'b': ['a']}
+
+
+def test_toolchain_cycle_keeps_build_order():
+    db = {'gcc': recipe(runtime=['libc']), 'libc': recipe(build=['gcc']), 'app': recipe(build=['gcc'])}
+    order = Solver(db).solve(['app']).order
+    assert set(order) == {'gcc', 'libc', 'app'}
+    assert order.index('gcc') < order.index('libc')
+    assert order.index('gcc') < order.index('app')
+
+
+@pytest.mark.parametrize("roots", [['x'], ['y']])
+def test_build_only_cycle_raises(roots):
+    db = {'x': recipe(build=['y']), 'y': recipe(build=['x'])}
+    with pytest.raises(CycleError):
+        Solver(db).solve(roots)
+
+
+def test_version_constraints():
+    assert parse_version("1.10") > parse_version("1.9")
+    assert parse_version("1.0rc1") < parse_version("1.0.1")
+    db = {'openssl': {'version': '3.1', 'dependencies': ['zlib>=1.2,<2']}, 'zlib': {'version': '1.3'}}
+    solution = Solver(db).solve(['openssl>=3'])
+    assert solution.order == ['zlib', 'openssl'] and solution.versions['zlib'] == '1.3'
+    with pytest.raises(ResolutionError):
+        Solver(db).solve(['openssl<3'])
+
+
+def test_backtracks_from_installed_to_recipe_version():
+    db = {'openssl': {'version': '3.1', 'dependencies': ['zlib>=1.3']}, 'zlib': {'version': '1.3'}}
+    installed = {'zlib': '1.2.13'}
+    # Sem restrição, a versão instalada é reaproveitada
+    assert Solver(db, installed).solve(['zlib']).reused == {'zlib'}
+    # zlib é escolhido antes com a versão instalada; openssl obriga a voltar atrás
+    solution = Solver(db, installed).solve(['zlib', 'openssl'])
+    assert solution.versions == {'zlib': '1.3', 'openssl': '3.1'}
+    assert solution.reused == set()
+
+
+def test_conditional_dependencies_follow_use_flags():
+    db = {'app': {'version': '1', 'flags_USE': ['+ssl', 'gtk'],
+                  'dependencies': ['ssl? openssl', '!ssl? gnutls', 'gtk? gtk3']},
+          'openssl': {'version': '3'}, 'gnutls': {'version': '3'}, 'gtk3': {'version': '3'}}
+    solver = Solver(db)
+    assert solver.solve(['app']).graph['app'] == ['openssl']
+    assert solver.solve(['app'], use_flags=['-ssl', 'gtk']).graph['app'] == ['gnutls', 'gtk3']
+    assert solver.solve(['app'], use_flags=['-ssl']).flags['app'] == frozenset()
+
+
+def test_alternatives_take_first_that_resolves():
+    db = {'app': {'version': '1', 'dependencies': ['mta | postfix']},
+          'mta': {'version': '1', 'dependencies': ['libc>=2']}, 'postfix': {'version': '3'},
+          'libc': {'version': '1'}}
+    solution = Solver(db).solve(['app'])
+    assert solution.graph == {'postfix': [], 'app': ['postfix']}
+    db['libc']['version'] = '2'
+    assert Solver(db).solve(['app']).graph['app'] == ['mta']
+
+
+def test_conflicts_are_explained():
+    db = {'openssl': {'version': '3.1', 'dependencies': ['zlib>=1.3']}, 'zlib': {'version': '1.2'},
+          'app': {'version': '1', 'dependencies': ['qt | gtk']}}
+    with pytest.raises(ResolutionError) as error:
+        Solver(db).solve(['openssl'])
+    assert error.value.conflicts == ['zlib 1.2 não satisfaz zlib>=1.3 (exigido por openssl)']
+    assert error.value.packages == ['openssl']
+    with pytest.raises(ResolutionError) as error:
+        Solver(db).solve(['app'])
+    assert error.value.conflicts == ['qt não existe (exigido por app)', 'gtk não existe (exigido por app)']
@@ -0,0 +1,67 @@
+import pytest
+import yaml
+from version_tracker import VersionTracker
+
+DB = {'hello': {'version': '1.0'}, 'world': {'version': '1.0'}}
+# Porta sem servidor: a conexão é recusada
+DOWN_URL = "http://127.0.0.1:9/down"
+
+
+@pytest.fixture
+def tracker(tmp_path, http_server):
+    """
+    Cria trackers que consultam o servidor local, com o mesmo state_file.
+    """
+    config_path = tmp_path / "config.yaml"
+    urls = {name: http_server.url(f"/{name}") for name in DB}
+    urls['down'] = DOWN_URL
+    config_path.write_text(yaml.safe_dump({'version_tracker': {
+        'state_file': str(tmp_path / "tracker.json"),
+        'urls': urls,
+    }}))
+    return lambda db=DB: VersionTracker(str(config_path), db)
+
+
+def versioned(version, etag):
+    def route(headers):
+        if headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, b""
+        return 200, {"ETag": etag}, version.encode()
+    return route
+
+
+def test_not_modified_uses_cache(tracker, http_server):
+    http_server.routes["/hello"] = versioned("2.0", '"v2"')
+    http_server.routes["/world"] = versioned("1.0", '"v1"')
+    first = tracker()
+    assert first.check_updates()['hello']['latest'] == '2.0'
+    # Mesma instância, checagem forçada: o servidor responde 304
+    assert first.check_updates(force=True)['hello']['latest'] == '2.0'
+    hello = [headers for path, headers in http_server.requests if path == "/hello"]
+    assert len(hello) == 2 and hello[1]["If-None-Match"] == '"v2"'
+    assert 'world' not in first.check_updates(force=True)
+
+
+def test_cache_persists_across_instances(tracker, http_server):
+    http_server.routes["/hello"] = versioned("2.0", '"v2"')
+    http_server.routes["/world"] = versioned("1.0", '"v1"')
+    tracker().check_updates()
+    # Dentro do intervalo de checagem: nenhuma consulta nova
+    assert tracker().check_updates() == {'hello': {'current': '1.0', 'latest': '2.0', 'critical': False}}
+    assert http_server.hits("/hello") == 1
+    # Forçada, a consulta reaproveita o ETag salvo pela instância anterior
+    assert tracker().check_updates(force=True)['hello']['latest'] == '2.0'
+    hello = [headers for path, headers in http_server.requests if path == "/hello"]
+    assert len(hello) == 2 and hello[1]["If-None-Match"] == '"v2"'
+
+
+def test_failing_upstream_does_not_abort_others(tracker, http_server):
+    http_server.routes["/hello"] = lambda headers: (500, {}, b"erro")
+    http_server.routes["/world"] = versioned("3.0", '"v3"')
+    db = dict(DB, down={'version': '1.0'})
+    updates = tracker(db).check_updates()
+    assert list(updates) == ['world'] and updates['world']['latest'] == '3.0'
+    # Os pacotes que falharam continuam pendentes para a próxima checagem
+    state = tracker(db).state
+    assert 'last_checked' in state['world']
+    assert 'hello' not in state and 'down' not in state